@@ -0,0 +1,31 @@
+import os
+import time
+import pandas as pd
+from colorama import Fore, init
+from configs import settings
+from src.backtest.engine import BacktestEngine
+from src.data.candle_store import CandleStore
+from src.strategies.registry import available_strategies
+
+init(autoreset=True)
+
+def _ms(value: str):
+    return int(pd.Timestamp(value).value // 1_000_000) if value else None
+
+def run():
+    # Walks the local candle store; fill it by running the live loop or any OHLCV download into CandleStore
+    symbols = [s.strip() for s in os.getenv("SYMBOLS", ",".join(settings.symbols)).split(",") if s.strip()]
+    keys = [s.strip() for s in os.getenv("STRATEGIES", "conservative,aggressive,price_action").split(",") if s.strip()]
+    start, end = _ms(os.getenv("START")), _ms(os.getenv("END"))
+    store = CandleStore(settings.data["candle_store_dir"])
+    for key in keys:
+        strategy = available_strategies[key]
+        t0 = time.perf_counter()
+        results = BacktestEngine().run_store(store, strategy, symbols, settings.timeframes, "15m", start, end)
+        print(Fore.CYAN + f"[{strategy.name}] {time.perf_counter() - t0:.2f}s")
+        for symbol, r in results.items():
+            st = r["stats"]
+            print(Fore.WHITE + f"{symbol}: trades={st['trades']} return={st.get('return_pct', 0) * 100:.1f}% maxDD={st.get('max_drawdown_pct', 0) * 100:.1f}% win={st.get('win_rate', 0) * 100:.0f}% rejected={r['rejected']}")
+
+if __name__ == "__main__":
+    run()
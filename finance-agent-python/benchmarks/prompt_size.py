@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data.aggregator import summarize
+from src.data.candles import to_payload
+from src.core.prompt import estimate_tokens
+from src.strategies.base import BaseStrategy
+from src.strategies.registry import available_strategies
+
+TIMEFRAMES = {"15m": "15min", "1h": "1h", "4h": "4h", "1d": "1D"}
+
+def synthetic_context(bars: int = 200, seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+    multi = {}
+    for tf, freq in TIMEFRAMES.items():
+        close = 60000 + np.cumsum(rng.normal(0, 80, bars))
+        df = pd.DataFrame({
+            "timestamp": pd.date_range("2024-01-01", periods=bars, freq=freq),
+            "open": close + rng.normal(0, 20, bars),
+            "high": close + np.abs(rng.normal(0, 60, bars)),
+            "low": close - np.abs(rng.normal(0, 60, bars)),
+            "close": close,
+            "volume": np.abs(rng.normal(150, 40, bars))
+        })
+        multi[tf] = summarize(df)
+    return {"multi": multi, "price": float(multi["15m"]["current"]["price"]), "symbol": "BTC/USDT"}
+
+def legacy_content(strategy, mc: dict, portfolio: dict, news: str) -> str:
+    # What build_user_content produced before the encoder: Python str() of the record payload
+    if type(strategy).build_user_content is BaseStrategy.build_user_content:
+        return "{" + f"\"market\": {to_payload(mc)}, " + f"\"portfolio\": {portfolio}, " + f"\"news\": \"{news}\"" + "}"
+    payload = {"market": {"features": strategy.features(mc), "price": mc.get("price")}, "portfolio": portfolio, "news": news}
+    return str(to_payload(payload))
+
+def main():
+    mc = synthetic_context()
+    portfolio = {"cash": 1000.0, "positions": {}, "equity": 1000.0}
+    news = "ETF inflows continue; funding neutral."
+    print(f"{'strategy':<20}{'legacy tok':>12}{'compact tok':>13}{'budget':>8}{'saved':>8}{'encode ms':>11}")
+    for key, strategy in available_strategies.items():
+        legacy = legacy_content(strategy, mc, portfolio, news)
+        start = time.perf_counter()
+        compact = strategy.build_user_content(mc, portfolio, news)
+        ms = (time.perf_counter() - start) * 1000
+        lt, ct = estimate_tokens(legacy), estimate_tokens(compact)
+        print(f"{key:<20}{lt:>12}{ct:>13}{strategy.token_budget:>8}{1 - ct / lt:>8.0%}{ms:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configs import settings
+from src.data.aggregator import summarize, build_multi_timeframe, build_multi_snapshot
+from src.data.candle_store import DTYPE
+from src.data.fetch_pool import FetchPool
+from src.data.indicators import IndicatorEngine
+from src.data.okx_client import OKXClient
+from src.execution.risk import RiskManager
+from src.sim.exchange import SimExchange
+from src.strategies.features import feature_cache, primitive_cache
+from src.strategies.registry import available_strategies
+
+# Fixed synthetic data and an offline exchange; nothing here touches the network.
+# BENCH_BARS / BENCH_SYMBOLS pick the scaling points, BENCH_CASES filters cases by substring,
+# BENCH_SAVE=1 writes the baseline, BENCH_TOLERANCE is the allowed slowdown before a case is flagged.
+TIMEFRAMES = ["15m", "1h", "4h", "1d"]
+BASELINE = os.getenv("BENCH_BASELINE", "data/bench_baseline.json")
+STEP_MS = 15 * 60 * 1000
+
+def frame(bars: int, seed: int = 7) -> pd.DataFrame:
+    # Every timeframe uses 15m spacing so 100k-bar daily frames stay inside the datetime range
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 80, bars))
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(1704067200000 + np.arange(bars, dtype=np.int64) * STEP_MS, unit="ms"),
+        "open": close + rng.normal(0, 20, bars),
+        "high": close + np.abs(rng.normal(0, 60, bars)),
+        "low": close - np.abs(rng.normal(0, 60, bars)),
+        "close": close,
+        "volume": np.abs(rng.normal(150, 40, bars))
+    })
+
+def context(bars: int, symbol: str = "BTC/USDT") -> dict:
+    multi = {tf: summarize(frame(bars, seed=i)) for i, tf in enumerate(TIMEFRAMES)}
+    return {"multi": multi, "price": float(multi["15m"]["current"]["price"]), "symbol": symbol}
+
+def sim_exchange(symbols: list, bars: int = 200) -> SimExchange:
+    sim = SimExchange(symbols=symbols)
+    for i, s in enumerate(symbols):
+        df = frame(bars, seed=i)
+        rows = np.zeros(bars, dtype=DTYPE)
+        rows["timestamp"] = df["timestamp"].to_numpy().astype("datetime64[ms]").astype(np.int64)
+        for f in ("open", "high", "low", "close", "volume"):
+            rows[f] = df[f].to_numpy()
+        for tf in TIMEFRAMES:
+            sim.load_candles(s, tf, rows)
+        sim.set_price(s, float(rows["close"][-1]))
+    return sim
+
+def symbol_names(n: int) -> list:
+    return ["BTC/USDT"] + [f"S{i}/USDT" for i in range(1, n)]
+
+def clear_caches():
+    feature_cache.clear()
+    primitive_cache.clear()
+
+def risk_manager() -> RiskManager:
+    return RiskManager(**settings.risk)
+
+# Each case maps (bars, symbols) to (fn, extra); fn is timed cold (feature caches cleared before every run)
+
+def case_summarize(bars, symbols):
+    df = frame(bars)
+    return lambda: summarize(df), {}
+
+def case_multi_timeframe(bars, symbols):
+    names = symbol_names(symbols)
+    okx = OKXClient(exchange=sim_exchange(names))
+    engine = IndicatorEngine()
+    run = lambda: [build_multi_timeframe(okx, s, TIMEFRAMES, engine=engine) for s in names]
+    run()
+    return run, {}
+
+def case_multi_snapshot(bars, symbols):
+    names = symbol_names(symbols)
+    okx = OKXClient(exchange=sim_exchange(names))
+    engine = IndicatorEngine()
+    pool = FetchPool(max_workers=settings.fetch["max_workers"], rate_per_sec=1e9, burst=10 ** 6)
+    run = lambda: build_multi_snapshot(okx, names, TIMEFRAMES, pool, engine=engine)
+    run()
+    return run, {}
+
+def strategy_cases(key):
+    strategy = available_strategies[key]
+    portfolio = {"cash": 1000.0, "positions": {}, "equity": 1000.0}
+    decision = {"action": "BUY", "amount_usd": 100.0, "leverage": 20}
+
+    def features(bars, symbols):
+        mc = context(bars)
+        return lambda: strategy._compute_features(mc), {}
+
+    def position_size(bars, symbols):
+        mc = context(bars)
+        return lambda: strategy.position_size(decision, mc, portfolio), {}
+
+    def user_content(bars, symbols):
+        mc = context(bars)
+        content = strategy.build_user_content(mc, portfolio, "ETF inflows continue; funding neutral.")
+        return lambda: strategy.build_user_content(mc, portfolio, "ETF inflows continue; funding neutral."), {"bytes": len(content.encode("utf-8"))}
+
+    return {f"{key}._compute_features": (features, "bars"), f"{key}.position_size": (position_size, "bars"), f"{key}.build_user_content": (user_content, "bars")}
+
+def case_validate(bars, symbols):
+    risk = risk_manager()
+    decisions = [
+        {"action": "BUY", "amount_usd": 100.0 + i, "leverage": 20 + i % 40, "stop_loss": 1.0, "risk_reward": 2 + i % 3}
+        for i in range(1000)
+    ]
+    return lambda: [risk.validate(d, 10000.0, 8000.0, now=0) for d in decisions], {"calls": len(decisions)}
+
+class QuietNews:
+    def headlines(self, query: str, limit: int = 5) -> list:
+        return []
+
+    def summarize(self, headlines: list) -> str:
+        return ""
+
+def import_main():
+    # main pulls in the DuckDuckGo client at import time; the case swaps NewsEngine out anyway, so stand in for it when ddgs is missing
+    try:
+        import src.data.news
+    except ImportError:
+        stub = types.ModuleType("src.data.news")
+        stub.NewsEngine = QuietNews
+        sys.modules["src.data.news"] = stub
+    import main
+    return main
+
+def case_main_run(bars, symbols):
+    # One full tick of main.run against SimExchange with the mock LLM
+    main = import_main()
+    names = symbol_names(symbols)
+    workdir = tempfile.mkdtemp(prefix="bench-main-")
+    env = {"SYMBOLS": ",".join(names), "MAX_TICKS": "1", "TICK_SECONDS": "0", "DEEPSEEK_API_KEY": "", "LIVE_TRADING": "false", "STREAMING": "false", "STRATEGIES": "conservative,aggressive"}
+
+    def run():
+        saved = {k: os.environ.get(k) for k in env}
+        cwd = os.getcwd()
+        patched = (main.NewsEngine, main.sim_from_env, settings.fetch)
+        sim = sim_exchange(names)
+        main.NewsEngine = QuietNews
+        main.sim_from_env = lambda: sim
+        # Same as case_multi_snapshot: lift the request limiter so the symbol axis times the code, not the throttle
+        settings.fetch = dict(settings.fetch, rate_per_sec=1e9, burst=10 ** 6)
+        os.environ.update(env)
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                main.run()
+        finally:
+            os.chdir(cwd)
+            main.NewsEngine, main.sim_from_env, settings.fetch = patched
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+    return run, {}
+
+CASES = {
+    "aggregator.summarize": (case_summarize, "bars"),
+    "aggregator.build_multi_timeframe": (case_multi_timeframe, "symbols"),
+    "aggregator.build_multi_snapshot": (case_multi_snapshot, "symbols"),
+    **strategy_cases("smc"),
+    **strategy_cases("price_action"),
+    "RiskManager.validate": (case_validate, None),
+    "main.run": (case_main_run, "symbols")
+}
+
+def points(axis: str, bars: list, symbols: list) -> list:
+    if axis == "bars":
+        return [(b, 1) for b in bars]
+    if axis == "symbols":
+        return [(200, s) for s in symbols]
+    return [(200, 1)]
+
+def measure(fn, repeat: int) -> list:
+    times = []
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+def compare(results: dict, baseline: dict, tolerance: float, floor: float = 0.0005) -> list:
+    # Flag a case only when it is both relatively and absolutely slower, so sub-millisecond noise is ignored
+    flagged = []
+    for key, r in results.items():
+        b = baseline.get(key)
+        if not b:
+            continue
+        slower = r["median"] > b["median"] * (1 + tolerance) and r["median"] - b["median"] > floor
+        bigger = "bytes" in r and "bytes" in b and r["bytes"] > b["bytes"] * (1 + tolerance)
+        if slower or bigger:
+            flagged.append(key)
+    return flagged
+
+def main():
+    bars = [int(x) for x in os.getenv("BENCH_BARS", "200,10000,100000").split(",") if x.strip()]
+    symbols = [int(x) for x in os.getenv("BENCH_SYMBOLS", "1,10,100").split(",") if x.strip()]
+    repeat = int(os.getenv("BENCH_REPEAT", "5"))
+    tolerance = float(os.getenv("BENCH_TOLERANCE", "0.25"))
+    only = os.getenv("BENCH_CASES", "")
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+    results = {}
+    failed = []
+    print(f"{'case':<36}{'bars':>8}{'symbols':>9}{'median ms':>12}{'base ms':>10}{'change':>9}")
+    for name, (build, axis) in CASES.items():
+        if only and not any(o.strip() and o.strip() in name for o in only.split(",")):
+            continue
+        for b, s in points(axis, bars, symbols):
+            key = f"{name}|bars={b}|symbols={s}"
+            try:
+                fn, extra = build(b, s)
+                # One untimed call warms imports and lazy state that a live tick would already have
+                fn()
+                times = measure(fn, repeat)
+            except ImportError as e:
+                # A case that can't even import is a broken benchmark, not one to quietly leave out
+                print(f"{name:<36}{b:>8}{s:>9}  FAILED: {e}")
+                failed.append(key)
+                break
+            results[key] = dict(extra, median=statistics.median(times), min=min(times))
+            base = baseline.get(key, {}).get("median")
+            change = f"{results[key]['median'] / base - 1:>+8.0%}" if base else f"{'-':>8}"
+            base_ms = f"{base * 1000:>10.2f}" if base else f"{'-':>10}"
+            size = f"  {extra['bytes']} bytes" if "bytes" in extra else ""
+            print(f"{name:<36}{b:>8}{s:>9}{results[key]['median'] * 1000:>12.2f}{base_ms} {change}{size}")
+    flagged = compare(results, baseline, tolerance)
+    if os.getenv("BENCH_SAVE", "").lower() in ("1", "true", "yes") or not baseline:
+        os.makedirs(os.path.dirname(BASELINE) or ".", exist_ok=True)
+        with open(BASELINE, "w") as f:
+            json.dump(dict(baseline, **results), f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {BASELINE}")
+    for key in flagged:
+        print(f"REGRESSION {key}")
+    for key in failed:
+        print(f"FAILED {key}")
+    return 1 if flagged or failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
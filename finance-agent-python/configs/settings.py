@@ -13,3 +13,43 @@ risk = {
 live = {
     "enabled": False
 }
+data = {
+    "candle_cache_bars": 1000,
+    "candle_store_dir": "data/candles",
+    "instrument_ttl_seconds": 3600
+}
+fetch = {
+    "max_workers": 12,
+    "rate_per_sec": 10,
+    "burst": 10,
+    "timeout_seconds": 15,
+    "news_workers": 2
+}
+stream = {
+    "enabled": False,
+    "max_age_seconds": 10
+}
+llm = {
+    "max_concurrent_decisions": 8,
+    "cache_ttl_seconds": 300,
+    "cache_max_entries": 512,
+    "cache_path": "data/llm_cache.sqlite",
+    "pool_connections": 16,
+    "request_timeout_seconds": 30,
+    "connect_timeout_seconds": 5,
+    "deadline_seconds": 45,
+    "max_retries": 2,
+    "hedge": False,
+    "hedge_after_seconds": None
+}
+scheduler = {
+    "max_concurrent_symbols": 4,
+    "symbol_timeout_seconds": 120,
+    "tick_seconds": 300
+}
+metrics = {
+    "enabled": True,
+    "jsonl_path": "logs/metrics.jsonl",
+    "port": None,
+    "window": 2048
+}
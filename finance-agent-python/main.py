@@ -1,23 +1,74 @@
 import os
 import json
 import time
+import threading
+import atexit
 from dotenv import load_dotenv
 from colorama import Fore, Style, init
 from configs import settings
 from src.strategies.registry import available_strategies
-from src.core.agent import Agent
-from src.core.llm import DeepSeekClient
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from src.core.agent import Agent, decide_all
+from src.core.llm import ClientRegistry
+from src.core.reflection import ReflectionWorker, REVIEWER_PROMPT
+from src.core.llm_cache import LLMCache
+from src.core.tape import TapeProxy, TapeRegistry, TapePool, tape_from_env, OKX_METHODS, NEWS_METHODS
+from src.core.metrics import Metrics, metered, record_decision, profiler_from_env
 from src.data.okx_client import OKXClient
-from src.data.aggregator import build_multi_timeframe
+from src.data.candle_store import CandleStore
+from src.data.aggregator import build_multi_snapshot
+from src.data.fetch_pool import FetchPool
+from src.data.indicators import IndicatorEngine
+from src.data.okx_stream import OKXStream
 from src.data.news import NewsEngine
 from src.execution.wallet import Wallet
+from src.sim.exchange import sim_from_env
 from src.execution.risk import RiskManager
 
 load_dotenv()
 init(autoreset=True)
 
+def monitor_tp_sl(okx, wallet, reflections, open_orders, prices, symbol, open_path, live_enabled, use_perp):
+    try:
+        to_close = []
+        for k, entry in open_orders.items():
+            sym = entry.get("symbol", symbol)
+            px = prices.get(sym, okx.fetch_price(sym))
+            tp = entry.get("take_profit")
+            sl = entry.get("stop_loss")
+            qty = float(entry.get("qty", 0))
+            pos_side = entry.get("pos_side", "long")
+            if qty <= 0:
+                continue
+            hit_tp = tp is not None and px >= float(tp)
+            hit_sl = sl is not None and px <= float(sl)
+            if hit_tp or hit_sl:
+                print(Fore.CYAN + f"Trigger hit for {k}: {'TP' if hit_tp else 'SL'} at {px:.2f}")
+                if live_enabled and use_perp:
+                    ok, msg = okx.close_perp_market(sym, qty, pos_side)
+                    print(Fore.CYAN + (f"Closed PERP position id={msg}" if ok else f"Close failed: {msg}"))
+                else:
+                    ok, msg = wallet.sell(sym, px, qty * px)
+                    print(Fore.CYAN + (msg))
+                to_close.append((k, entry, px))
+        for k, entry, exit_px in to_close:
+            open_orders.pop(k, None)
+            with open(open_path, "w") as f:
+                json.dump(open_orders, f)
+            pnl_usd = float(entry.get("qty", 0)) * (exit_px - float(entry.get("entry_price", 0)))
+            record = {"entry": entry, "exit_price": exit_px, "pnl_usd": pnl_usd}
+            reflections.submit("exit_reflection", f"AUTO-CLOSE {entry.get('strategy')} {entry.get('symbol')}", record, record)
+    except Exception:
+        pass
+
 def run():
-    symbol = os.getenv("SYMBOL", settings.symbols[0])
+    symbols_env = os.getenv("SYMBOLS")
+    if symbols_env:
+        symbols = [s.strip() for s in symbols_env.split(",") if s.strip()]
+    elif os.getenv("SYMBOL"):
+        symbols = [os.getenv("SYMBOL")]
+    else:
+        symbols = list(settings.symbols)
     tf = settings.timeframes
     strategies_env = os.getenv("STRATEGIES")
     if strategies_env:
@@ -33,8 +84,70 @@ def run():
     if not valid_keys:
         valid_keys = ["conservative"]
     multi_mode = len(valid_keys) > 1
-    okx = OKXClient()
+    # TAPE_MODE=record captures every exchange, news and LLM response; replay runs the loop offline from the tape
+    tape = tape_from_env()
+    replaying = tape is not None and tape.mode == "replay"
+    # SIM_EXCHANGE=1 runs the loop against the offline matching engine instead of OKX
+    sim = sim_from_env()
+    okx = OKXClient(
+        candle_cache_bars=settings.data["candle_cache_bars"],
+        store=None if replaying or sim is not None else CandleStore(settings.data["candle_store_dir"]),
+        instrument_ttl=settings.data["instrument_ttl_seconds"],
+        exchange=sim
+    )
+    if sim is not None:
+        print(Fore.CYAN + f"Simulated exchange: {', '.join(sorted(sim.portfolio.cols))}")
     news = NewsEngine()
+    if tape is not None:
+        okx = TapeProxy(okx, tape, "okx", OKX_METHODS)
+        news = TapeProxy(news, tape, "news", NEWS_METHODS)
+        atexit.register(tape.close)
+        print(Fore.CYAN + f"Tape {tape.mode}: {tape.path}")
+    # Stage timers, exchange/news/LLM counters and p50/p95/p99 histograms; METRICS_PORT serves them for Prometheus
+    metrics = Metrics(window=settings.metrics["window"])
+    metrics_enabled = settings.metrics["enabled"]
+    if metrics_enabled:
+        okx = metered(okx, metrics, "okx", OKX_METHODS)
+        news = metered(news, metrics, "news", NEWS_METHODS)
+        metrics_port = os.getenv("METRICS_PORT", settings.metrics["port"])
+        if metrics_port:
+            try:
+                metrics.serve(int(metrics_port))
+                print(Fore.CYAN + f"Metrics on http://127.0.0.1:{metrics_port}/metrics")
+            except Exception as e:
+                print(Fore.RED + f"Metrics endpoint failed: {e}")
+    profiler = profiler_from_env()
+    indicators = IndicatorEngine()
+    decision_pool = ThreadPoolExecutor(max_workers=settings.llm["max_concurrent_decisions"], thread_name_prefix="decide")
+    # Headline searches get their own workers so a slow search never holds a market-data slot
+    news_pool = ThreadPoolExecutor(max_workers=settings.fetch["news_workers"], thread_name_prefix="news")
+    llm_cache = LLMCache(
+        ttl=settings.llm["cache_ttl_seconds"],
+        maxsize=settings.llm["cache_max_entries"],
+        path=settings.llm["cache_path"] or None
+    )
+    # LLM clients and agents live for the whole run so HTTP connections stay warm between ticks
+    llm_clients = ClientRegistry(
+        pool_size=settings.llm["pool_connections"],
+        timeout=settings.llm["request_timeout_seconds"],
+        connect_timeout=settings.llm["connect_timeout_seconds"],
+        cache=llm_cache,
+        deadline=settings.llm["deadline_seconds"],
+        retries=settings.llm["max_retries"],
+        hedge=settings.llm["hedge"],
+        hedge_after=settings.llm["hedge_after_seconds"]
+    )
+    if tape is not None:
+        llm_clients = TapeRegistry(llm_clients, tape)
+    agents = {(s, key): Agent(strategy=available_strategies[key], registry=llm_clients) for s in symbols for key in valid_keys}
+    fetch_pool = FetchPool(
+        max_workers=settings.fetch["max_workers"],
+        rate_per_sec=settings.fetch["rate_per_sec"],
+        burst=settings.fetch["burst"],
+        timeout=settings.fetch["timeout_seconds"]
+    )
+    if tape is not None:
+        fetch_pool = TapePool(fetch_pool, tape)
     wallet = Wallet()
     risk = RiskManager(
         min_position_pct=settings.risk["min_position_pct"],
@@ -46,7 +159,6 @@ def run():
         leverage_max=settings.risk["leverage_max"],
         min_rrr=settings.risk["min_rrr"]
     )
-    reviewer = DeepSeekClient(system_prompt="You are a trading reviewer. Return JSON: {\"reflection\": string}", model="deepseek-chat")
     open_path = "logs/open_orders.json"
     journal_path = "logs/trade_journal.md"
     try:
@@ -59,6 +171,9 @@ def run():
                 f.write("")
     except Exception:
         pass
+    # Trade reflections run off the trading loop; the journal is flushed in order on exit
+    reflections = ReflectionWorker(llm_clients.get(REVIEWER_PROMPT, "deepseek-chat"), journal_path, metrics=metrics)
+    atexit.register(reflections.close)
     try:
         with open(open_path, "r") as f:
             open_orders = json.load(f)
@@ -69,272 +184,332 @@ def run():
     # Live trading is enabled if either env flag is true OR settings.live.enabled is true, and OKX creds exist
     okx_creds = bool(os.getenv("OKX_API_KEY")) and bool(os.getenv("OKX_SECRET")) and bool(os.getenv("OKX_PASSPHRASE"))
     live_enabled = (live_env or settings.live.get("enabled", False)) and okx_creds
-    while True:
-        prices = {}
-        prices[symbol] = okx.fetch_price(symbol)
+    stream = None
+    price_event = threading.Event()
+    if tape is None and os.getenv("STREAMING", str(settings.stream["enabled"])).lower() == "true":
+        stream_symbols = sorted(set(symbols + [e.get("symbol", symbols[0]) for e in open_orders.values()]))
+        stream = OKXStream(okx, stream_symbols, tf, max_age=settings.stream["max_age_seconds"])
+        stream.on(lambda ev: ev["type"] == "ticker" and price_event.set())
+        stream.start()
+    exec_lock = threading.Lock()
+
+    def account_state(symbol, prices, perp_qty, acct=None):
+        # Paper trades only move the wallet, so in paper mode that is the account sizing and risk checks must see
+        if acct is None and live_enabled:
+            acct = okx.get_account_state(symbol, prices[symbol])
+        elif acct is None:
+            acct = {"cash": wallet.balance[wallet.base], "qty": wallet.positions.get(symbol, 0.0), "equity": wallet.equity(prices)}
+        holdings = {symbol: perp_qty} if perp_qty != 0 else ({symbol: acct["qty"]} if acct.get("qty", 0) > 0 else {})
+        return acct, {"cash": acct["cash"], "positions": holdings, "equity": acct["equity"]}
+
+    def process_symbol(symbol, snapshot, news_future):
+        prices = snapshot["prices"]
+        mctx = snapshot["multi"]
+        with metrics.span("stage.news"):
+            try:
+                headlines = news_future.result(timeout=settings.fetch["timeout_seconds"])
+            except Exception:
+                headlines = []
+            news_text = news.summarize(headlines)
+        perp_qty = snapshot["perp_qty"] if live_enabled else 0.0
+        acct, portfolio_state = account_state(symbol, prices, perp_qty, snapshot["account"] if live_enabled else None)
+        print(Fore.YELLOW + f"{symbol} price {prices[symbol]:.2f}")
+        desired_notional = os.getenv("DESIRED_NOTIONAL_USD")
+        mc = {"multi": mctx, "price": prices[symbol], "symbol": symbol}
         try:
-            for k, entry in list(open_orders.items()):
-                sym = entry.get("symbol", symbol)
-                if sym not in prices:
-                    prices[sym] = okx.fetch_price(sym)
+            # Prompt prices are rounded to the instrument's tick
+            spec = okx.instrument_spec(symbol)
+            if spec is not None and spec.tick_size > 0:
+                mc["tick_size"] = spec.tick_size
         except Exception:
             pass
-        acct = okx.get_account_state(symbol, prices[symbol])
-        mctx = build_multi_timeframe(okx, symbol, tf)
-        headlines = news.headlines(f"{symbol} crypto news", 5)
-        news_text = news.summarize(headlines)
-        perp_qty = okx.fetch_perp_position_qty(symbol)
-        holdings = {symbol: perp_qty} if perp_qty != 0 else ({symbol: acct["qty"]} if acct.get("qty", 0) > 0 else {})
-        portfolio_state = {"cash": acct["cash"], "positions": holdings, "equity": acct["equity"]}
-        print(Fore.YELLOW + f"Price {prices[symbol]:.2f}")
-        for key in valid_keys:
-            strategy = available_strategies[key]
-            agent = Agent(strategy=strategy)
-            desired_notional = os.getenv("DESIRED_NOTIONAL_USD")
-            mc = {"multi": mctx, "price": prices[symbol], "symbol": symbol}
-            if desired_notional:
-                try:
-                    mc["desired_notional_usd"] = float(desired_notional)
-                except Exception:
-                    pass
-            decision = agent.decide(mc, portfolio_state, news_text)
-            order_contracts = os.getenv("ORDER_CONTRACTS")
-            # Enforce min/max after-leverage sizing when not placing explicit contracts
-            if not order_contracts:
-                lev_used = float(decision.get("leverage", settings.risk["leverage_min"]) or settings.risk["leverage_min"]) 
-                eq = float(portfolio_state["equity"]) if portfolio_state["equity"] else 0.0
-                min_pct = float(settings.risk["min_position_pct"]) 
-                max_pct = float(settings.risk["max_position_pct"]) 
-                current_notional = float(decision.get("amount_usd", 0) or 0.0) * lev_used
-                if decision.get("position_pct") is None and eq > 0:
-                    decision["position_pct"] = current_notional / eq if eq else 0.0
-                if eq > 0 and current_notional < eq * min_pct:
-                    decision["position_pct"] = min_pct
-                    decision["amount_usd"] = (eq * min_pct) / lev_used
-                elif eq > 0 and current_notional > eq * max_pct:
-                    decision["position_pct"] = max_pct
-                    decision["amount_usd"] = (eq * max_pct) / lev_used
-            valid, reason = (True, "ok") if order_contracts else risk.validate(decision, portfolio_state["equity"], portfolio_state["cash"])
-            print(Fore.CYAN + f"[{strategy.name}]")
-            print(Fore.WHITE + f"Decision {decision['action']} {decision['symbol']} ${decision['amount_usd']:.2f}")
-            pos_pct = decision.get('position_pct')
-            lev = decision.get('leverage')
-            sl = decision.get('stop_loss')
-            tp = decision.get('take_profit')
-            rr = decision.get('risk_reward')
-            es = decision.get('entry_signal')
-            er = decision.get('entry_reason')
-            if pos_pct is not None:
-                notional_pct = float(pos_pct) * 100.0
-                notional_usd = float(pos_pct) * float(portfolio_state['equity'])
-                print(Fore.WHITE + f"Position % (after leverage): {notional_pct:.1f}% | Notional: ${notional_usd:.2f} | Leverage: {lev}")
-            if sl is not None:
-                print(Fore.WHITE + f"Stop Loss: {sl} | Take Profit: {tp}")
-            if rr is not None:
-                print(Fore.WHITE + f"Risk/Reward: {rr}")
-            if es is not None:
-                print(Fore.WHITE + f"Entry: {('YES' if es else 'NO')} - {er}")
-            print(Fore.MAGENTA + f"News Analysis: {decision.get('news_analysis', '')}")
-            print(Fore.BLUE + f"Technical Conditions: {decision.get('technical_conditions', '')}")
-            print(Fore.GREEN + f"Risk Manager: {'ACCEPTED' if valid else 'REJECTED'}{(' - ' + reason) if not valid else ''}")
-            if valid:
-                if decision["action"] == "BUY":
-                    if live_enabled and use_perp:
-                        qty = 0.0
-                        if order_contracts:
-                            contracts = float(order_contracts)
-                            print(Fore.YELLOW + f"Placing PERP BUY contracts={contracts} on {symbol}")
-                            ok, msg, base_qty = okx.place_perp_market_by_contracts(symbol, 'buy', contracts)
-                            qty = base_qty
+        if desired_notional:
+            try:
+                mc["desired_notional_usd"] = float(desired_notional)
+            except Exception:
+                pass
+        # All strategies decide concurrently on the same snapshot; risk checks and orders are serialized across symbols
+        with exec_lock:
+            held = {k: dict(e) for k, e in open_orders.items() if e.get("symbol") == symbol}
+        with metrics.span("stage.decide"):
+            decisions = decide_all(decision_pool, {key: agents[(symbol, key)] for key in valid_keys}, mc, portfolio_state, news_text, held)
+        with exec_lock:
+            exec_start = time.perf_counter()
+            # TP/SL checks and log writes have their own spans; keep them out of stage.execute so stage totals don't overlap
+            nested = 0.0
+            # Symbols that held the lock before this one may have traded since the snapshot
+            acct, portfolio_state = account_state(symbol, prices, perp_qty)
+            for key in valid_keys:
+                strategy = available_strategies[key]
+                decision = decisions[key]
+                record_decision(metrics, decision)
+                order_contracts = os.getenv("ORDER_CONTRACTS")
+                # Enforce min/max after-leverage sizing when not placing explicit contracts
+                if not order_contracts:
+                    lev_used = float(decision.get("leverage", settings.risk["leverage_min"]) or settings.risk["leverage_min"]) 
+                    eq = float(portfolio_state["equity"]) if portfolio_state["equity"] else 0.0
+                    min_pct = float(settings.risk["min_position_pct"]) 
+                    max_pct = float(settings.risk["max_position_pct"]) 
+                    current_notional = float(decision.get("amount_usd", 0) or 0.0) * lev_used
+                    if decision.get("position_pct") is None and eq > 0:
+                        decision["position_pct"] = current_notional / eq if eq else 0.0
+                    if eq > 0 and current_notional < eq * min_pct:
+                        decision["position_pct"] = min_pct
+                        decision["amount_usd"] = (eq * min_pct) / lev_used
+                    elif eq > 0 and current_notional > eq * max_pct:
+                        decision["position_pct"] = max_pct
+                        decision["amount_usd"] = (eq * max_pct) / lev_used
+                valid, reason = (True, "ok") if order_contracts else risk.validate(decision, portfolio_state["equity"], portfolio_state["cash"])
+                print(Fore.CYAN + f"[{strategy.name} {symbol}]")
+                print(Fore.WHITE + f"Decision {decision['action']} {decision['symbol']} ${decision['amount_usd']:.2f}")
+                llm_meta = decision.get("llm") or {}
+                if llm_meta.get("timed_out") or llm_meta.get("retried") or llm_meta.get("hedged"):
+                    print(Fore.YELLOW + f"LLM: {llm_meta['latency']:.1f}s attempts={llm_meta['attempts']} hedged={llm_meta['hedged']} timed_out={llm_meta['timed_out']}")
+                pos_pct = decision.get('position_pct')
+                lev = decision.get('leverage')
+                sl = decision.get('stop_loss')
+                tp = decision.get('take_profit')
+                rr = decision.get('risk_reward')
+                es = decision.get('entry_signal')
+                er = decision.get('entry_reason')
+                if pos_pct is not None:
+                    notional_pct = float(pos_pct) * 100.0
+                    notional_usd = float(pos_pct) * float(portfolio_state['equity'])
+                    print(Fore.WHITE + f"Position % (after leverage): {notional_pct:.1f}% | Notional: ${notional_usd:.2f} | Leverage: {lev}")
+                if sl is not None:
+                    print(Fore.WHITE + f"Stop Loss: {sl} | Take Profit: {tp}")
+                if rr is not None:
+                    print(Fore.WHITE + f"Risk/Reward: {rr}")
+                if es is not None:
+                    print(Fore.WHITE + f"Entry: {('YES' if es else 'NO')} - {er}")
+                print(Fore.MAGENTA + f"News Analysis: {decision.get('news_analysis', '')}")
+                print(Fore.BLUE + f"Technical Conditions: {decision.get('technical_conditions', '')}")
+                print(Fore.GREEN + f"Risk Manager: {'ACCEPTED' if valid else 'REJECTED'}{(' - ' + reason) if not valid else ''}")
+                if valid:
+                    if decision["action"] == "BUY":
+                        if live_enabled and use_perp:
+                            qty = 0.0
+                            if order_contracts:
+                                contracts = float(order_contracts)
+                                print(Fore.YELLOW + f"Placing PERP BUY contracts={contracts} on {symbol}")
+                                ok, msg, base_qty = okx.place_perp_market_by_contracts(symbol, 'buy', contracts)
+                                qty = base_qty
+                            else:
+                                lev_used = float(decision.get("leverage", settings.risk["leverage_min"]))
+                                notional = decision["amount_usd"] * lev_used
+                                print(Fore.YELLOW + f"Placing PERP BUY notional=${notional:.2f} price={prices[symbol]:.2f} lev={lev_used}")
+                                okx.set_perp_leverage(symbol, lev_used)
+                                spec = okx.instrument_spec(symbol)
+                                cs = (spec.contract_size if spec else 0.0) or 1.0
+                                min_contracts = spec.min_contracts if spec else 0.0
+                                contracts = (notional / prices[symbol]) / cs if prices[symbol] else 0.0
+                                if min_contracts and contracts < min_contracts:
+                                    min_notional = (min_contracts * cs) * prices[symbol]
+                                    target_notional = max(notional, min_notional)
+                                    target_pct = target_notional / portfolio_state["equity"] if portfolio_state["equity"] else 0.0
+                                    if target_pct <= settings.risk["max_position_pct"] and target_pct >= settings.risk["min_position_pct"]:
+                                        decision["amount_usd"] = target_notional / lev_used
+                                        decision["position_pct"] = target_pct
+                                        notional = target_notional
+                                        print(Fore.YELLOW + f"Adjusted to min contract: notional=${notional:.2f} (pct={target_pct*100:.1f}%)")
+                                        ok, msg = okx.place_perp_market_order(symbol, 'buy', notional, prices[symbol], lev_used, False, decision.get("take_profit"), decision.get("stop_loss") )
+                                    else:
+                                        print(Fore.RED + f"Cannot place PERP BUY: min contracts {min_contracts} would exceed caps (pct={target_pct*100:.1f}%).")
+                                        ok, msg = (False, f"min_contracts {min_contracts}")
+                                else:
+                                    ok, msg = okx.place_perp_market_order(symbol, 'buy', notional, prices[symbol], lev_used, False, decision.get("take_profit"), decision.get("stop_loss") )
+                            print(Fore.GREEN + (f"Live PERP BUY placed id={msg}" if ok else f"Live PERP BUY failed: {msg}"))
+                            if ok:
+                                pos_side = 'long'
+                                ok_tp_sl, algo = okx.place_perp_tp_sl_algo(symbol, pos_side, decision.get("take_profit"), decision.get("stop_loss"), qty=qty)
+                                print(Fore.CYAN + (f"Attached TP/SL algo: {algo}" if ok_tp_sl else f"Failed to attach TP/SL: {algo}"))
+                        elif live_enabled:
+                            print(Fore.YELLOW + f"Placing SPOT BUY amount_usd=${decision['amount_usd']:.2f} price={prices[symbol]:.2f}")
+                            ok, msg = okx.place_spot_market_buy(symbol, decision["amount_usd"], prices[symbol])
+                            print(Fore.GREEN + (f"Live SPOT BUY placed id={msg}" if ok else f"Live SPOT BUY failed: {msg}"))
                         else:
+                            ok, msg = wallet.buy(symbol, prices[symbol], decision["amount_usd"])
+                            print(Fore.GREEN + msg if ok else Fore.RED + msg)
+                        if ok:
+                            key_id = f"{strategy.name}:{symbol}"
+                            if not order_contracts:
+                                qty = (decision["amount_usd"] * float(decision.get("leverage", 1) or 1)) / prices[symbol] if prices[symbol] else 0.0
+                            open_orders[key_id] = {
+                                "ts": time.time(),
+                                "strategy": strategy.name,
+                                "symbol": symbol,
+                                "entry_price": prices[symbol],
+                                "qty": qty,
+                                "amount_usd": decision["amount_usd"],
+                                "order_id": msg,
+                                "stop_loss": decision.get("stop_loss"),
+                                "take_profit": decision.get("take_profit"),
+                                "leverage": decision.get("leverage"),
+                                "risk_reward": decision.get("risk_reward"),
+                                "entry_reason": decision.get("entry_reason"),
+                                "pos_side": "long"
+                            }
+                            try:
+                                with open(open_path, "w") as f:
+                                    json.dump(open_orders, f)
+                                reflections.submit(
+                                    "entry_reflection",
+                                    f"OPEN {strategy.name} {symbol}",
+                                    {"entry": open_orders[key_id]},
+                                    {"price": prices[symbol], "decision": decision}
+                                )
+                            except Exception:
+                                pass
+                        # Refresh account state after execution for next strategies
+                        acct, portfolio_state = account_state(symbol, prices, perp_qty)
+                    elif decision["action"] == "SELL":
+                        if live_enabled and use_perp:
                             lev_used = float(decision.get("leverage", settings.risk["leverage_min"]))
                             notional = decision["amount_usd"] * lev_used
-                            print(Fore.YELLOW + f"Placing PERP BUY notional=${notional:.2f} price={prices[symbol]:.2f} lev={lev_used}")
+                            print(Fore.YELLOW + f"Placing PERP SELL notional=${notional:.2f} price={prices[symbol]:.2f} lev={lev_used}")
                             okx.set_perp_leverage(symbol, lev_used)
-                            base, quote = symbol.split("/")
-                            perp_sym = f"{base}/{quote}:USDT"
-                            cs = float(okx.exchange.market(perp_sym).get('contractSize') or 1.0)
-                            min_contracts = okx.get_perp_min_amount(symbol)
+                            spec = okx.instrument_spec(symbol)
+                            cs = (spec.contract_size if spec else 0.0) or 1.0
+                            min_contracts = spec.min_contracts if spec else 0.0
                             contracts = (notional / prices[symbol]) / cs if prices[symbol] else 0.0
                             if min_contracts and contracts < min_contracts:
                                 min_notional = (min_contracts * cs) * prices[symbol]
                                 target_notional = max(notional, min_notional)
                                 target_pct = target_notional / portfolio_state["equity"] if portfolio_state["equity"] else 0.0
-                                if target_pct <= settings.risk["max_position_pct"] and target_pct >= settings.risk["min_position_pct"]:
+                                if target_pct <= settings.risk["max_position_pct"]:
                                     decision["amount_usd"] = target_notional / lev_used
                                     decision["position_pct"] = target_pct
                                     notional = target_notional
                                     print(Fore.YELLOW + f"Adjusted to min contract: notional=${notional:.2f} (pct={target_pct*100:.1f}%)")
-                                    ok, msg = okx.place_perp_market_order(symbol, 'buy', notional, prices[symbol], lev_used, False, decision.get("take_profit"), decision.get("stop_loss") )
+                                    ok, msg = okx.place_perp_market_order(symbol, 'sell', notional, prices[symbol], lev_used, True)
                                 else:
-                                    print(Fore.RED + f"Cannot place PERP BUY: min contracts {min_contracts} would exceed caps (pct={target_pct*100:.1f}%).")
+                                    print(Fore.RED + f"Cannot place PERP SELL: min contracts {min_contracts} would exceed caps (pct={target_pct*100:.1f}%).")
                                     ok, msg = (False, f"min_contracts {min_contracts}")
                             else:
-                                ok, msg = okx.place_perp_market_order(symbol, 'buy', notional, prices[symbol], lev_used, False, decision.get("take_profit"), decision.get("stop_loss") )
-                        print(Fore.GREEN + (f"Live PERP BUY placed id={msg}" if ok else f"Live PERP BUY failed: {msg}"))
-                        if ok:
-                            pos_side = 'long'
-                            ok_tp_sl, algo = okx.place_perp_tp_sl_algo(symbol, pos_side, decision.get("take_profit"), decision.get("stop_loss"), qty=qty)
-                            print(Fore.CYAN + (f"Attached TP/SL algo: {algo}" if ok_tp_sl else f"Failed to attach TP/SL: {algo}"))
-                    elif live_enabled:
-                        print(Fore.YELLOW + f"Placing SPOT BUY amount_usd=${decision['amount_usd']:.2f} price={prices[symbol]:.2f}")
-                        ok, msg = okx.place_spot_market_buy(symbol, decision["amount_usd"], prices[symbol])
-                        print(Fore.GREEN + (f"Live SPOT BUY placed id={msg}" if ok else f"Live SPOT BUY failed: {msg}"))
-                    else:
-                        ok, msg = wallet.buy(symbol, prices[symbol], decision["amount_usd"])
-                        print(Fore.GREEN + msg if ok else Fore.RED + msg)
-                    if ok:
-                        key_id = f"{strategy.name}:{symbol}"
-                        if not order_contracts:
-                            qty = (decision["amount_usd"] * float(decision.get("leverage", 1) or 1)) / prices[symbol] if prices[symbol] else 0.0
-                        open_orders[key_id] = {
-                            "ts": time.time(),
-                            "strategy": strategy.name,
-                            "symbol": symbol,
-                            "entry_price": prices[symbol],
-                            "qty": qty,
-                            "amount_usd": decision["amount_usd"],
-                            "order_id": msg,
-                            "stop_loss": decision.get("stop_loss"),
-                            "take_profit": decision.get("take_profit"),
-                            "leverage": decision.get("leverage"),
-                            "risk_reward": decision.get("risk_reward"),
-                            "entry_reason": decision.get("entry_reason"),
-                            "pos_side": "long"
-                        }
-                        try:
-                            with open(open_path, "w") as f:
-                                json.dump(open_orders, f)
-                            ref = reviewer.complete_json(json.dumps({
-                                "type": "entry_reflection",
-                                "context": {
-                                    "price": prices[symbol],
-                                    "decision": decision
-                                }
-                            }))
-                            with open(journal_path, "a") as f:
-                                f.write(f"\n## OPEN {strategy.name} {symbol}\n")
-                                f.write(json.dumps({"entry": open_orders[key_id], "reflection": ref.get("reflection", "")}) + "\n")
-                        except Exception:
-                            pass
-                    # Refresh account state after execution for next strategies
-                    acct = okx.get_account_state(symbol, prices[symbol])
-                    portfolio_state = {"cash": acct["cash"], "positions": holdings, "equity": acct["equity"]}
-                elif decision["action"] == "SELL":
-                    if live_enabled and use_perp:
-                        lev_used = float(decision.get("leverage", settings.risk["leverage_min"]))
-                        notional = decision["amount_usd"] * lev_used
-                        print(Fore.YELLOW + f"Placing PERP SELL notional=${notional:.2f} price={prices[symbol]:.2f} lev={lev_used}")
-                        okx.set_perp_leverage(symbol, lev_used)
-                        base, quote = symbol.split("/")
-                        perp_sym = f"{base}/{quote}:USDT"
-                        cs = float(okx.exchange.market(perp_sym).get('contractSize') or 1.0)
-                        min_contracts = okx.get_perp_min_amount(symbol)
-                        contracts = (notional / prices[symbol]) / cs if prices[symbol] else 0.0
-                        if min_contracts and contracts < min_contracts:
-                            min_notional = (min_contracts * cs) * prices[symbol]
-                            target_notional = max(notional, min_notional)
-                            target_pct = target_notional / portfolio_state["equity"] if portfolio_state["equity"] else 0.0
-                            if target_pct <= settings.risk["max_position_pct"]:
-                                decision["amount_usd"] = target_notional / lev_used
-                                decision["position_pct"] = target_pct
-                                notional = target_notional
-                                print(Fore.YELLOW + f"Adjusted to min contract: notional=${notional:.2f} (pct={target_pct*100:.1f}%)")
                                 ok, msg = okx.place_perp_market_order(symbol, 'sell', notional, prices[symbol], lev_used, True)
-                            else:
-                                print(Fore.RED + f"Cannot place PERP SELL: min contracts {min_contracts} would exceed caps (pct={target_pct*100:.1f}%).")
-                                ok, msg = (False, f"min_contracts {min_contracts}")
-                        else:
-                            ok, msg = okx.place_perp_market_order(symbol, 'sell', notional, prices[symbol], lev_used, True)
-                        print(Fore.RED + (f"Live PERP SELL placed id={msg}" if ok else f"Live PERP SELL failed: {msg}"))
-                    elif live_enabled:
-                        print(Fore.YELLOW + f"Placing SPOT SELL amount_usd=${decision['amount_usd']:.2f} price={prices[symbol]:.2f}")
-                        ok, msg = okx.place_spot_market_sell(symbol, decision["amount_usd"], prices[symbol], acct.get("qty", 0.0))
-                        print(Fore.RED + (f"Live SPOT SELL placed id={msg}" if ok else f"Live SPOT SELL failed: {msg}"))
-                    else:
-                        ok, msg = wallet.sell(symbol, prices[symbol], decision["amount_usd"])
-                        print(Fore.RED + msg if ok else Fore.RED + msg)
-                    key_id = f"{strategy.name}:{symbol}"
-                    if ok and key_id in open_orders:
-                        entry = open_orders.pop(key_id)
-                        exit_price = prices[symbol]
-                        qty = float(entry.get("qty", 0))
-                        pnl_usd = qty * (exit_price - float(entry.get("entry_price", 0)))
-                        try:
-                            with open(open_path, "w") as f:
-                                json.dump(open_orders, f)
-                            ref = reviewer.complete_json(json.dumps({
-                                "type": "exit_reflection",
-                                "context": {
-                                    "entry": entry,
-                                    "exit_price": exit_price,
-                                    "pnl_usd": pnl_usd
-                                }
-                            }))
-                            with open(journal_path, "a") as f:
-                                f.write(f"\n## CLOSE {strategy.name} {symbol}\n")
-                                f.write(json.dumps({"entry": entry, "exit_price": exit_price, "pnl_usd": pnl_usd, "reflection": ref.get("reflection", "")}) + "\n")
-                        except Exception:
-                            pass
-                    # Refresh account state after execution for next strategies
-                    acct = okx.get_account_state(symbol, prices[symbol])
-                    portfolio_state = {"cash": acct["cash"], "positions": holdings, "equity": acct["equity"]}
-            # Monitor TP/SL for auto-close
-            try:
-                to_close = []
-                for k, entry in open_orders.items():
-                    sym = entry.get("symbol", symbol)
-                    px = prices.get(sym, okx.fetch_price(sym))
-                    tp = entry.get("take_profit")
-                    sl = entry.get("stop_loss")
-                    qty = float(entry.get("qty", 0))
-                    pos_side = entry.get("pos_side", "long")
-                    if qty <= 0:
-                        continue
-                    hit_tp = tp is not None and px >= float(tp)
-                    hit_sl = sl is not None and px <= float(sl)
-                    if hit_tp or hit_sl:
-                        print(Fore.CYAN + f"Trigger hit for {k}: {'TP' if hit_tp else 'SL'} at {px:.2f}")
-                        if live_enabled and use_perp:
-                            ok, msg = okx.close_perp_market(sym, qty, pos_side)
-                            print(Fore.CYAN + (f"Closed PERP position id={msg}" if ok else f"Close failed: {msg}"))
+                            print(Fore.RED + (f"Live PERP SELL placed id={msg}" if ok else f"Live PERP SELL failed: {msg}"))
+                        elif live_enabled:
+                            print(Fore.YELLOW + f"Placing SPOT SELL amount_usd=${decision['amount_usd']:.2f} price={prices[symbol]:.2f}")
+                            ok, msg = okx.place_spot_market_sell(symbol, decision["amount_usd"], prices[symbol], acct.get("qty", 0.0))
+                            print(Fore.RED + (f"Live SPOT SELL placed id={msg}" if ok else f"Live SPOT SELL failed: {msg}"))
                         else:
-                            ok, msg = wallet.sell(sym, px, qty * px)
-                            print(Fore.CYAN + (msg))
-                        to_close.append((k, entry, px))
-                for k, entry, exit_px in to_close:
-                    open_orders.pop(k, None)
-                    with open(open_path, "w") as f:
-                        json.dump(open_orders, f)
-                    pnl_usd = float(entry.get("qty", 0)) * (exit_px - float(entry.get("entry_price", 0)))
-                    ref = reviewer.complete_json(json.dumps({
-                        "type": "exit_reflection",
-                        "context": {"entry": entry, "exit_price": exit_px, "pnl_usd": pnl_usd}
-                    }))
-                    with open(journal_path, "a") as f:
-                        f.write(f"\n## AUTO-CLOSE {entry.get('strategy')} {entry.get('symbol')}\n")
-                        f.write(json.dumps({"entry": entry, "exit_price": exit_px, "pnl_usd": pnl_usd, "reflection": ref.get("reflection", "")}) + "\n")
-            except Exception:
-                pass
+                            ok, msg = wallet.sell(symbol, prices[symbol], decision["amount_usd"])
+                            print(Fore.RED + msg if ok else Fore.RED + msg)
+                        key_id = f"{strategy.name}:{symbol}"
+                        if ok and key_id in open_orders:
+                            entry = open_orders.pop(key_id)
+                            exit_price = prices[symbol]
+                            qty = float(entry.get("qty", 0))
+                            pnl_usd = qty * (exit_price - float(entry.get("entry_price", 0)))
+                            try:
+                                with open(open_path, "w") as f:
+                                    json.dump(open_orders, f)
+                                record = {"entry": entry, "exit_price": exit_price, "pnl_usd": pnl_usd}
+                                reflections.submit("exit_reflection", f"CLOSE {strategy.name} {symbol}", record, record)
+                            except Exception:
+                                pass
+                        # Refresh account state after execution for next strategies
+                        acct, portfolio_state = account_state(symbol, prices, perp_qty)
+                # Monitor TP/SL for auto-close
+                t0 = time.perf_counter()
+                monitor_tp_sl(okx, wallet, reflections, open_orders, prices, symbol, open_path, live_enabled, use_perp)
+                elapsed = time.perf_counter() - t0
+                metrics.observe("stage.tp_sl", elapsed)
+                nested += elapsed
 
-            log = {
-                "ts": time.time(),
-                "strategy": strategy.name,
-                "symbol": symbol,
-                "price": prices[symbol],
-                "decision": decision,
-                "equity": portfolio_state["equity"]
-            }
-            try:
-                os.makedirs("logs", exist_ok=True)
-                with open("logs/decisions.jsonl", "a") as f:
-                    f.write(json.dumps(log) + "\n")
-            except Exception:
-                pass
-        
-        # Wait for 5 minutes (300 seconds) before the next iteration
-        print(Fore.CYAN + "Waiting 5 minutes for next tick...")
-        time.sleep(300)
+                log = {
+                    "ts": time.time(),
+                    "strategy": strategy.name,
+                    "symbol": symbol,
+                    "price": prices[symbol],
+                    "decision": decision,
+                    "equity": portfolio_state["equity"]
+                }
+                t0 = time.perf_counter()
+                try:
+                    os.makedirs("logs", exist_ok=True)
+                    with open("logs/decisions.jsonl", "a") as f:
+                        f.write(json.dumps(log) + "\n")
+                except Exception:
+                    pass
+                elapsed = time.perf_counter() - t0
+                metrics.observe("stage.log_write", elapsed)
+                nested += elapsed
+            metrics.observe("stage.execute", time.perf_counter() - exec_start - nested)
+
+    symbol_pool = ThreadPoolExecutor(max_workers=settings.scheduler["max_concurrent_symbols"], thread_name_prefix="symbol")
+    inflight = {}
+    prices = {}
+    tick_seconds = float(os.getenv("TICK_SECONDS", settings.scheduler["tick_seconds"]))
+    if replaying:
+        tick_seconds = tick_seconds / tape.speed if tape.speed > 0 else 0.0
+    max_ticks = int(os.getenv("MAX_TICKS", "0"))
+    ticks = 0
+    while True:
+        tick_start = time.monotonic()
+        ticks += 1
+        if profiler is not None:
+            profiler.start()
+        try:
+            open_symbols = [entry.get("symbol", symbols[0]) for entry in list(open_orders.values())]
+            # One batched fetch for every symbol; a symbol whose calls time out falls back to cached candles
+            with metrics.span("stage.snapshot"):
+                snapshots = build_multi_snapshot(okx, symbols, tf, fetch_pool, open_symbols, indicators)
+            news_futures = {s: news_pool.submit(news.headlines, f"{s} crypto news", 5) for s in snapshots}
+            started = []
+            for s in symbols:
+                if s not in snapshots:
+                    print(Fore.RED + f"{s} has no candles yet (fetch timed out on an empty cache); skipping it this tick")
+                    continue
+                prices.update(snapshots[s]["prices"])
+                prev = inflight.get(s)
+                if prev is not None and not prev.done():
+                    print(Fore.RED + f"{s} is still processing the previous tick; skipping it this tick")
+                    continue
+                inflight[s] = symbol_pool.submit(process_symbol, s, snapshots[s], news_futures[s])
+                started.append((s, inflight[s]))
+            # A slow symbol keeps running in the background but does not hold up the tick
+            deadline = time.monotonic() + settings.scheduler["symbol_timeout_seconds"]
+            for s, fut in started:
+                try:
+                    fut.result(timeout=max(deadline - time.monotonic(), 0))
+                except FuturesTimeout:
+                    print(Fore.RED + f"{s} exceeded the tick deadline; continuing without it")
+                except Exception as e:
+                    print(Fore.RED + f"{s} failed: {e}")
+            cs = llm_cache.stats()
+            print(Fore.CYAN + f"LLM cache: {cs['hits']} hits / {cs['misses']} misses")
+            gated = sum(a.gated for a in agents.values())
+            total = sum(a.decisions for a in agents.values())
+            print(Fore.CYAN + f"Entry gates: {gated}/{total} decisions settled without the LLM")
+            metrics.observe("tick", time.monotonic() - tick_start)
+        finally:
+            # Stop even when the tick raised, so the profiler is never left running into the next tick
+            if profiler is not None:
+                print(Fore.CYAN + f"Profile written to {profiler.stop(ticks)}")
+        if metrics_enabled:
+            snap = metrics.flush(settings.metrics["jsonl_path"], tick=ticks)
+            slowest = sorted(((k, v) for k, v in snap["tick_totals"].items() if k.startswith("stage.")), key=lambda kv: -kv[1])[:3]
+            # Per-symbol stages run in parallel, so these are summed across symbols and can exceed the tick time
+            print(Fore.CYAN + "Slowest stages (summed across symbols): " + ", ".join(f"{k[6:]} {v:.2f}s" for k, v in slowest))
+        print(Fore.CYAN + f"Tick {ticks} took {time.monotonic() - tick_start:.2f}s")
+        more_on_tape = tape.tick() if tape is not None else True
+        if (max_ticks and ticks >= max_ticks) or not more_on_tape:
+            break
+        print(Fore.CYAN + f"Waiting {tick_seconds:.0f}s for next tick...")
+        if stream is None:
+            time.sleep(tick_seconds)
+            continue
+        # Streaming: re-check TP/SL on every price update while waiting for the next tick
+        next_tick = time.time() + tick_seconds
+        while time.time() < next_tick:
+            if price_event.wait(timeout=max(next_tick - time.time(), 0)):
+                price_event.clear()
+                for sym in set(symbols + [e.get("symbol", symbols[0]) for e in open_orders.values()]):
+                    if okx.last_price.get(sym):
+                        prices[sym] = okx.last_price[sym]
+                with exec_lock:
+                    monitor_tp_sl(okx, wallet, reflections, open_orders, prices, symbols[0], open_path, live_enabled, use_perp)
 
 if __name__ == "__main__":
     run()
@@ -0,0 +1,287 @@
+import json
+import numpy as np
+import pandas as pd
+from src.data.candles import Candles
+from src.execution.risk import RiskManager
+from src.strategies.base import GATE_OPS
+from configs import settings
+
+TF_MS = {"m": 60000, "h": 3600000, "d": 86400000, "w": 604800000}
+
+def tf_ms(timeframe: str) -> int:
+    return int(timeframe[:-1]) * TF_MS[timeframe[-1].lower()]
+
+def default_risk() -> RiskManager:
+    return RiskManager(
+        min_position_pct=settings.risk["min_position_pct"],
+        max_position_pct=settings.risk["max_position_pct"],
+        max_daily_drawdown_pct=settings.risk["max_daily_drawdown_pct"],
+        cooldown_minutes=settings.risk["cooldown_minutes"],
+        min_cash_buffer_pct=settings.risk["min_cash_buffer_pct"],
+        leverage_min=settings.risk["leverage_min"],
+        leverage_max=settings.risk["leverage_max"],
+        min_rrr=settings.risk["min_rrr"]
+    )
+
+def candles_from_store(store, symbol: str, timeframe: str, start: int = None, end: int = None) -> Candles:
+    rows = store.read(symbol, timeframe, start, end)
+    return Candles(*(np.asarray(rows[k]) for k in ("timestamp", "open", "high", "low", "close", "volume")))
+
+def indicator_arrays(candles: Candles, sma_n: int = 20, rsi_n: int = 14, window: int = 200) -> dict:
+    # The same fields summarize() puts in "current", computed for every bar at once
+    close = pd.Series(candles.close)
+    high = pd.Series(candles.high)
+    low = pd.Series(candles.low)
+    sma = close.rolling(sma_n, min_periods=1).mean()
+    delta = close.diff()
+    ma_up = delta.clip(lower=0).ewm(com=rsi_n - 1, adjust=False).mean()
+    ma_down = (-delta.clip(upper=0)).ewm(com=rsi_n - 1, adjust=False).mean()
+    rsi = (100 - 100 / (1 + ma_up / ma_down.replace(0, np.nan))).fillna(50.0)
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    prev_close = close.shift(1)
+    tr = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+    c = candles.close
+    return {
+        "price": c,
+        "sma20": sma.to_numpy(),
+        "rsi": rsi.to_numpy(),
+        "macd": macd.to_numpy(),
+        "trend": np.where(c > sma.to_numpy(), "up", "down"),
+        "momentum": np.where(macd.to_numpy() > 0, "bullish", "bearish"),
+        "volatility": close.rolling(window, min_periods=2).std().fillna(0.0).to_numpy(),
+        "high_200": high.rolling(window, min_periods=1).max().to_numpy(),
+        "low_200": low.rolling(window, min_periods=1).min().to_numpy(),
+        "atr": tr.ewm(com=13, adjust=False).mean().to_numpy(),
+        "breakout": np.concatenate([[False], c[1:] > candles.high[:-1]]),
+        "breakdown": np.concatenate([[False], c[1:] < candles.low[:-1]])
+    }
+
+def align(base: Candles, base_tf: str, other: Candles, other_tf: str):
+    # For each base bar, the last bar of other_tf that had fully closed when the base bar closed: no lookahead
+    decided_at = base.timestamp + tf_ms(base_tf)
+    closed_at = other.timestamp + tf_ms(other_tf)
+    idx = np.searchsorted(closed_at, decided_at, side="right") - 1
+    return idx, idx >= 0
+
+class BacktestEngine:
+    def __init__(self, risk: RiskManager = None, initial_equity: float = 10000.0, fee: float = 0.0005, slippage: float = 0.0002, maintenance_margin: float = 0.005, position_pct: float = None, leverage: float = None, stop_atr: float = 1.5):
+        self.risk = risk or default_risk()
+        self.initial_equity = initial_equity
+        self.fee = fee
+        self.slippage = slippage
+        self.maintenance_margin = maintenance_margin
+        if position_pct is None:
+            position_pct = min(max(0.15, self.risk.min_position_pct), self.risk.max_position_pct)
+        self.position_pct = position_pct
+        self.leverage = leverage if leverage is not None else self.risk.leverage_min
+        self.stop_atr = stop_atr
+
+    def prepare(self, frames: dict, base_tf: str) -> dict:
+        # frames maps timeframe -> Candles; every timeframe's indicators are mapped onto the base bars
+        base = frames[base_tf]
+        aligned = {}
+        for tf, candles in frames.items():
+            ind = indicator_arrays(candles)
+            if tf == base_tf:
+                aligned[tf] = {"valid": np.ones(len(base), dtype=bool), **ind}
+                continue
+            idx, valid = align(base, base_tf, candles, tf)
+            safe = np.where(valid, idx, 0)
+            aligned[tf] = {"valid": valid & (len(candles) > 0)}
+            for k, v in ind.items():
+                aligned[tf][k] = v[safe] if len(v) else np.zeros(len(base), dtype=v.dtype)
+        return {"base": base, "base_tf": base_tf, "tf": aligned}
+
+    def gate_mask(self, strategy, prepared: dict) -> np.ndarray:
+        # Vector form of BaseStrategy.failed_gates; missing timeframes or fields pass (fail open)
+        n = len(prepared["base"])
+        mask = np.ones(n, dtype=bool)
+        for tf, field, op, expected in strategy.entry_gates:
+            ctx = prepared["tf"].get(tf)
+            if ctx is None or field not in ctx:
+                continue
+            ok = np.asarray(GATE_OPS[op](ctx[field], expected), dtype=bool)
+            mask &= ok | ~ctx["valid"]
+        return mask
+
+    def signals(self, strategy, prepared: dict) -> dict:
+        # Stub for the LLM: a BUY wherever the strategy's own vector rule (or its entry gates) allows an entry
+        base = prepared["base"]
+        entry = strategy.vector_signal(prepared)
+        if entry is None:
+            entry = self.gate_mask(strategy, prepared) if strategy.entry_gates else np.zeros(len(base), dtype=bool)
+        atr = prepared["tf"][prepared["base_tf"]]["atr"]
+        stop = base.close - self.stop_atr * atr
+        target = base.close + self.risk.min_rrr * (base.close - stop)
+        n = len(base)
+        pct = strategy.vector_size(prepared)
+        # Like main's sizing clamp: whatever the strategy asks for lands inside the risk bounds
+        pct = np.full(n, float(self.position_pct)) if pct is None else np.clip(pct, self.risk.min_position_pct * 1.0001, self.risk.max_position_pct)
+        return {
+            "entry": np.asarray(entry, dtype=bool),
+            "stop_loss": stop,
+            "take_profit": target,
+            "leverage": np.full(n, float(self.leverage)),
+            "position_pct": pct,
+            "risk_reward": np.full(n, float(self.risk.min_rrr))
+        }
+
+    def _first_exit(self, low, high, start: int, stop: float, target: float, chunk: int = 512):
+        # Scan forward in chunks so a long trade does not cost a full-array comparison per trade
+        n = len(low)
+        i = start
+        while i < n:
+            j = min(i + chunk, n)
+            hit_sl = low[i:j] <= stop
+            hit_tp = high[i:j] >= target if np.isfinite(target) else np.zeros(j - i, dtype=bool)
+            hit = hit_sl | hit_tp
+            if hit.any():
+                k = int(np.argmax(hit))
+                # Both inside one bar: assume the stop filled first
+                return i + k, bool(hit_sl[k])
+            i = j
+        return None, False
+
+    def simulate(self, base: Candles, signals: dict, base_tf: str = "15m", symbol: str = "") -> dict:
+        n = len(base)
+        close_ms = base.timestamp + tf_ms(base_tf)
+        entries = np.flatnonzero(signals["entry"][:-1]) if n > 1 else np.empty(0, dtype=np.int64)
+        realized = np.zeros(n)
+        unrealized = np.zeros(n)
+        equity = self.initial_equity
+        trades = []
+        rejected = {}
+        pos = 0
+        while pos < len(entries):
+            d = int(entries[pos])
+            k = d + 1
+            lev = float(signals["leverage"][d])
+            pct = float(signals["position_pct"][d])
+            sl = float(signals["stop_loss"][d])
+            tp = float(signals["take_profit"][d])
+            decision = {
+                "action": "BUY",
+                "amount_usd": equity * pct / lev if lev > 0 else 0.0,
+                "leverage": lev,
+                "position_pct": pct,
+                "stop_loss": sl if np.isfinite(sl) else None,
+                "take_profit": tp if np.isfinite(tp) else None,
+                "risk_reward": float(signals["risk_reward"][d])
+            }
+            # Entries only follow the previous exit, so no margin is held and all equity is free cash
+            ok, reason = self.risk.validate(decision, equity, equity, now=close_ms[d] / 1000.0)
+            if not ok:
+                rejected[reason] = rejected.get(reason, 0) + 1
+                pos += 1
+                continue
+            entry_px = float(base.open[k]) * (1 + self.slippage)
+            margin = decision["amount_usd"]
+            notional = margin * lev
+            qty = notional / entry_px
+            liq_px = entry_px * (1 - 1 / lev + self.maintenance_margin)
+            stop = decision["stop_loss"]
+            liquidated_first = liq_px > stop
+            stop_eff = max(stop, liq_px)
+            target = tp if np.isfinite(tp) and tp > entry_px else np.inf
+            j, by_stop = self._first_exit(base.low, base.high, k, stop_eff, target)
+            if j is None:
+                j, exit_px, why = n - 1, float(base.close[-1]), "end"
+            elif by_stop:
+                # Gapped through the stop: filled at the open, not the stop price
+                exit_px = min(float(base.open[j]), stop_eff) if j > k else stop_eff
+                why = "liquidation" if liquidated_first else "stop_loss"
+            else:
+                exit_px = max(float(base.open[j]), target) if j > k else target
+                why = "take_profit"
+            exit_px *= (1 - self.slippage)
+            fees = self.fee * (notional + qty * exit_px)
+            pnl = -margin - self.fee * notional if why == "liquidation" else qty * (exit_px - entry_px) - fees
+            unrealized[k:j] = qty * (base.close[k:j] - entry_px) - self.fee * notional
+            realized[j] += pnl
+            equity += pnl
+            if pnl < 0:
+                self.risk.record_loss(now=close_ms[j] / 1000.0)
+            trades.append({
+                "symbol": symbol,
+                "entry_ts": int(base.timestamp[k]),
+                "exit_ts": int(close_ms[j]),
+                "entry_price": entry_px,
+                "exit_price": exit_px,
+                "qty": qty,
+                "leverage": lev,
+                "margin": margin,
+                "pnl_usd": pnl,
+                "exit_reason": why
+            })
+            # The next decision can only be taken once this trade's exit bar has closed
+            pos = int(np.searchsorted(entries, j, side="left"))
+        curve = self.initial_equity + np.cumsum(realized) + unrealized
+        return {"symbol": symbol, "timestamp": close_ms, "equity": curve, "trades": trades, "rejected": rejected, "stats": self.stats(curve, trades, base_tf)}
+
+    def stats(self, curve: np.ndarray, trades: list, base_tf: str) -> dict:
+        if not len(curve):
+            return {"trades": 0}
+        peak = np.maximum.accumulate(curve)
+        drawdown = float(np.max((peak - curve) / peak)) if len(curve) else 0.0
+        rets = np.diff(curve) / curve[:-1] if len(curve) > 1 else np.zeros(0)
+        per_year = 365 * 86400000 / tf_ms(base_tf)
+        sharpe = float(np.mean(rets) / np.std(rets) * np.sqrt(per_year)) if len(rets) and np.std(rets) > 0 else 0.0
+        pnls = np.array([t["pnl_usd"] for t in trades]) if trades else np.zeros(0)
+        gross_loss = -pnls[pnls < 0].sum()
+        return {
+            "trades": len(trades),
+            "final_equity": float(curve[-1]),
+            "return_pct": float(curve[-1] / self.initial_equity - 1),
+            "max_drawdown_pct": drawdown,
+            "sharpe": sharpe,
+            "win_rate": float((pnls > 0).mean()) if len(pnls) else 0.0,
+            "profit_factor": float(pnls[pnls > 0].sum() / gross_loss) if gross_loss > 0 else None
+        }
+
+    def run(self, strategy, frames: dict, base_tf: str = "15m", symbol: str = "", decisions: dict = None) -> dict:
+        prepared = self.prepare(frames, base_tf)
+        signals = decisions if decisions is not None else self.signals(strategy, prepared)
+        return self.simulate(prepared["base"], signals, base_tf, symbol)
+
+    def run_store(self, store, strategy, symbols: list, timeframes: list, base_tf: str = "15m", start: int = None, end: int = None) -> dict:
+        out = {}
+        for symbol in symbols:
+            frames = {tf: candles_from_store(store, symbol, tf, start, end) for tf in timeframes}
+            if not len(frames[base_tf]):
+                continue
+            # Each symbol is an independent account with its own cooldown clock
+            self.risk.last_loss_time = 0
+            out[symbol] = self.run(strategy, frames, base_tf, symbol)
+        return out
+
+def decisions_from_log(path: str, base: Candles, base_tf: str, symbol: str, strategy_name: str, leverage: float = 20) -> dict:
+    # Replays logged LLM decisions (logs/decisions.jsonl) onto the bar whose close follows each decision
+    n = len(base)
+    out = {
+        "entry": np.zeros(n, dtype=bool),
+        "stop_loss": np.full(n, np.nan),
+        "take_profit": np.full(n, np.inf),
+        "leverage": np.full(n, float(leverage)),
+        "position_pct": np.zeros(n),
+        "risk_reward": np.zeros(n)
+    }
+    close_ms = base.timestamp + tf_ms(base_tf)
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            d = rec.get("decision", {})
+            if rec.get("symbol") != symbol or rec.get("strategy") != strategy_name or str(d.get("action", "")).upper() != "BUY":
+                continue
+            i = int(np.searchsorted(close_ms, float(rec.get("ts", 0)) * 1000, side="left"))
+            if i >= n - 1:
+                continue
+            out["entry"][i] = True
+            out["stop_loss"][i] = float(d.get("stop_loss") or np.nan)
+            out["take_profit"][i] = float(d.get("take_profit") or np.inf)
+            out["leverage"][i] = float(d.get("leverage") or leverage)
+            out["position_pct"][i] = float(d.get("position_pct") or 0.0)
+            out["risk_reward"][i] = float(d.get("risk_reward") or 0.0)
+    return out
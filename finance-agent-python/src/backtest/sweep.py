@@ -0,0 +1,165 @@
+import copy
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+from src.backtest.engine import BacktestEngine
+from src.data.candle_store import DTYPE
+from src.data.candles import Candles
+from src.execution.risk import RiskManager
+from src.strategies.registry import available_strategies
+from configs import settings
+
+def expand_grid(grid: dict) -> list:
+    # {"risk.leverage_min": [20, 30], "sizing.base_pct": [0.1, 0.15]} -> one dict per combination
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def point_key(strategy_key: str, params: dict) -> str:
+    raw = json.dumps([strategy_key, params], sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def score(result: dict, drawdown_weight: float = 1.0) -> float:
+    return result.get("return_pct", 0.0) - drawdown_weight * result.get("max_drawdown_pct", 0.0)
+
+def rank(rows: list, drawdown_weight: float = 1.0) -> list:
+    # Best first: return penalised by drawdown, ties broken by the smaller drawdown
+    return sorted(rows, key=lambda r: (-score(r["result"], drawdown_weight), r["result"].get("max_drawdown_pct", 0.0)))
+
+class SharedCandles:
+    # One shared-memory block per (symbol, timeframe) holding the raw store rows; workers map it without copying
+    def __init__(self):
+        self.blocks = []
+        self.manifest = {}
+
+    def put(self, symbol: str, timeframe: str, rows: np.ndarray):
+        rows = np.ascontiguousarray(rows, dtype=DTYPE)
+        shm = shared_memory.SharedMemory(create=True, size=max(rows.nbytes, 1))
+        np.ndarray(rows.shape, dtype=DTYPE, buffer=shm.buf)[:] = rows
+        self.blocks.append(shm)
+        self.manifest[(symbol, timeframe)] = (shm.name, len(rows))
+
+    def close(self):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+_worker = {}
+
+def _attach(manifest: dict) -> dict:
+    frames = {}
+    for (symbol, tf), (name, n) in manifest.items():
+        shm = shared_memory.SharedMemory(name=name)
+        if multiprocessing.get_start_method() != "fork":
+            # Spawned workers get their own resource tracker, which would unlink the parent's block on exit
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        rows = np.ndarray((n,), dtype=DTYPE, buffer=shm.buf)
+        _worker.setdefault("shm", []).append(shm)
+        frames.setdefault(symbol, {})[tf] = Candles(*(rows[k] for k in ("timestamp", "open", "high", "low", "close", "volume")))
+    return frames
+
+def _init_worker(manifest: dict, strategy_key: str, base_tf: str):
+    _worker["frames"] = _attach(manifest)
+    _worker["strategy_key"] = strategy_key
+    _worker["base_tf"] = base_tf
+    _worker["prepared"] = {}
+
+def build_run(strategy_key: str, params: dict):
+    # Dotted keys pick the target: risk.* -> RiskManager, sizing.* -> strategy.sizing, engine.* -> BacktestEngine
+    risk_cfg = dict(settings.risk)
+    sizing = {}
+    engine_cfg = {}
+    for k, v in params.items():
+        scope, _, name = k.partition(".")
+        {"risk": risk_cfg, "sizing": sizing, "engine": engine_cfg}[scope][name] = v
+    risk = RiskManager(**risk_cfg)
+    strategy = copy.copy(available_strategies[strategy_key])
+    if sizing:
+        strategy.sizing = dict(getattr(strategy, "sizing", {}), **sizing)
+    return strategy, BacktestEngine(risk=risk, **engine_cfg)
+
+def run_point(params: dict) -> dict:
+    strategy, engine = build_run(_worker["strategy_key"], params)
+    base_tf = _worker["base_tf"]
+    per_symbol = {}
+    for symbol, frames in _worker["frames"].items():
+        if base_tf not in frames or not len(frames[base_tf]):
+            continue
+        # Indicator alignment does not depend on the parameters, so each worker prepares a symbol once
+        prepared = _worker["prepared"].get(symbol)
+        if prepared is None:
+            prepared = engine.prepare(frames, base_tf)
+            _worker["prepared"][symbol] = prepared
+        engine.risk.last_loss_time = 0
+        out = engine.simulate(prepared["base"], engine.signals(strategy, prepared), base_tf, symbol)
+        per_symbol[symbol] = out["stats"]
+    stats = list(per_symbol.values())
+    return {
+        "return_pct": float(np.mean([s.get("return_pct", 0.0) for s in stats])) if stats else 0.0,
+        "max_drawdown_pct": float(max([s.get("max_drawdown_pct", 0.0) for s in stats] or [0.0])),
+        "trades": int(sum(s.get("trades", 0) for s in stats)),
+        "symbols": per_symbol
+    }
+
+def load_done(path: str) -> dict:
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+                done[row["key"]] = row
+            except Exception:
+                # A line cut short by a crash is simply recomputed
+                continue
+    return done
+
+def _terminate_line(path: str):
+    # Appends after a torn last line must start on a fresh line
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+def sweep(store, strategy_key: str, grid: dict, symbols: list, timeframes: list, results_path: str, base_tf: str = "15m", start: int = None, end: int = None, workers: int = None) -> list:
+    points = expand_grid(grid)
+    done = load_done(results_path)
+    todo = [p for p in points if point_key(strategy_key, p) not in done]
+    print(f"Sweep {strategy_key}: {len(points)} points, {len(points) - len(todo)} already done")
+    shared = SharedCandles()
+    try:
+        for symbol in symbols:
+            for tf in timeframes:
+                shared.put(symbol, tf, store.read(symbol, tf, start, end))
+        if todo:
+            os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+            _terminate_line(results_path)
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(shared.manifest, strategy_key, base_tf)) as pool, open(results_path, "a") as out:
+                futures = {pool.submit(run_point, p): p for p in todo}
+                for i, fut in enumerate(as_completed(futures), 1):
+                    params = futures[fut]
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        print(f"Point {params} failed: {e}")
+                        continue
+                    row = {"key": point_key(strategy_key, params), "strategy": strategy_key, "params": params, "result": result}
+                    out.write(json.dumps(row) + "\n")
+                    out.flush()
+                    done[row["key"]] = row
+                    if i % 50 == 0 or i == len(todo):
+                        print(f"  {i}/{len(todo)}")
+    finally:
+        shared.close()
+    keys = {point_key(strategy_key, p) for p in points}
+    return rank([row for k, row in done.items() if k in keys])
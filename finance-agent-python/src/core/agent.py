@@ -3,13 +3,31 @@ from src.core.llm import DeepSeekClient
 from src.strategies.base import BaseStrategy
 
 class Agent:
-    def __init__(self, strategy: BaseStrategy, model: str = "deepseek-chat"):
-        self.strategy = strategy
-        self.client = DeepSeekClient(system_prompt=strategy.system_prompt, model=model)
+    def __init__(self, strategy: BaseStrategy, model: str = "deepseek-chat", cache=None, registry=None):
+        self.model = model
+        self.cache = cache
+        self.registry = registry
+        self.decisions = 0
+        self.gated = 0
+        self.set_strategy(strategy)
+
+    def in_position(self, market_context: Dict, portfolio_state: Dict, open_orders: Dict = None) -> bool:
+        if portfolio_state.get("positions"):
+            return True
+        # Paper fills never show up in exchange positions; open_orders records which strategy entered which symbol
+        symbol = market_context.get("symbol")
+        return any(e.get("strategy") == self.strategy.name and e.get("symbol") == symbol for e in (open_orders or {}).values())
 
-    def decide(self, market_context: Dict, portfolio_state: Dict, news_summary: str) -> Dict:
+    def decide(self, market_context: Dict, portfolio_state: Dict, news_summary: str, open_orders: Dict = None) -> Dict:
+        self.decisions += 1
+        # With no open position the only non-HOLD answer is an entry, so failed entry gates settle it locally
+        if not self.in_position(market_context, portfolio_state, open_orders):
+            failed = self.strategy.failed_gates(market_context)
+            if failed:
+                self.gated += 1
+                return self._gated_hold(market_context, failed)
         user = self.strategy.build_user_content(market_context, portfolio_state, news_summary)
-        decision = self.client.complete_json(user)
+        decision, llm_meta = self.client.complete_json_with_meta(user)
         action = str(decision.get("action", "HOLD")).upper()
         symbol = decision.get("symbol") or market_context.get("symbol") or "BTC/USDT"
         equity = float(portfolio_state.get("equity", 0) or 0)
@@ -64,9 +82,47 @@ class Agent:
             "entry_reason": entry_reason,
             "news_analysis": news_analysis,
             "technical_conditions": technical_conditions,
-            "risk_assessment": risk_assessment
+            "risk_assessment": risk_assessment,
+            "llm": llm_meta
+        }
+
+    def _gated_hold(self, market_context: Dict, failed: list) -> Dict:
+        reason = "Entry gates failed: " + "; ".join(failed)
+        return {
+            "action": "HOLD",
+            "symbol": market_context.get("symbol") or "BTC/USDT",
+            "amount_usd": 0.0,
+            "stop_loss": None,
+            "take_profit": None,
+            "leverage": None,
+            "risk_reward": None,
+            "entry_signal": False,
+            "entry_reason": reason,
+            "news_analysis": "",
+            "technical_conditions": reason,
+            "risk_assessment": "",
+            "gated": True
         }
 
+    def stats(self) -> Dict:
+        return {"decisions": self.decisions, "gated": self.gated, "llm_calls": self.decisions - self.gated}
+
     def set_strategy(self, strategy: BaseStrategy):
         self.strategy = strategy
-        self.client = DeepSeekClient(system_prompt=strategy.system_prompt)
+        if self.registry is not None:
+            self.client = self.registry.get(strategy.system_prompt, self.model)
+        else:
+            self.client = DeepSeekClient(system_prompt=strategy.system_prompt, model=self.model, cache=self.cache)
+
+def decide_all(executor, agents: Dict, market_context: Dict, portfolio_state: Dict, news_summary: str, open_orders: Dict = None) -> Dict:
+    # Fan out one decision per agent against the same snapshot; results come back keyed in the caller's order
+    extra = {} if open_orders is None else {"open_orders": open_orders}
+    futures = {key: executor.submit(agent.decide, market_context, dict(portfolio_state), news_summary, **extra) for key, agent in agents.items()}
+    out = {}
+    for key, fut in futures.items():
+        try:
+            out[key] = fut.result()
+        except Exception as e:
+            print(f"Decision failed for {key}: {e}")
+            out[key] = {"action": "HOLD", "symbol": market_context.get("symbol") or "BTC/USDT", "amount_usd": 0.0}
+    return out
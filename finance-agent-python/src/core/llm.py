@@ -1,40 +1,168 @@
 import os
 import json
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import httpx
 from openai import OpenAI
+from src.core.llm_cache import cache_key
+
+BASE_URL = "https://api.deepseek.com"
+
+# Requests run here so a call can be abandoned at its deadline or raced against a hedge
+_request_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-request")
+
+def make_openai(api_key: str, pool_size: int = 16, timeout: float = 30, connect_timeout: float = 5) -> OpenAI:
+    # One keep-alive pool shared by every caller; httpx.Client is thread-safe
+    http = httpx.Client(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size, keepalive_expiry=120),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
+    # Retries are handled by DeepSeekClient against its own deadline
+    return OpenAI(api_key=api_key, base_url=BASE_URL, http_client=http, max_retries=0)
 
 class DeepSeekClient:
-    def __init__(self, system_prompt: str, model: str = "deepseek-chat"):
+    def __init__(self, system_prompt: str, model: str = "deepseek-chat", cache=None, client=None,
+                 deadline: float = 45, retries: int = 2, hedge: bool = False, hedge_after: float = None):
         api_key = os.getenv("DEEPSEEK_API_KEY")
-        if not api_key:
+        if client is not None:
+            self.client = client
+        elif not api_key:
             print("WARNING: DEEPSEEK_API_KEY not found. Using mock LLM mode.")
             self.client = None
         else:
-            self.client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-        
+            self.client = OpenAI(api_key=api_key, base_url=BASE_URL, max_retries=0)
+
         self.system_prompt = system_prompt
         self.model = model
+        self.cache = cache
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.latencies = deque(maxlen=200)
+        self.lock = threading.Lock()
 
     def complete_json(self, user_content: str) -> dict:
+        return self.complete_json_with_meta(user_content)[0]
+
+    def complete_json_with_meta(self, user_content: str):
+        meta = {"cached": False, "attempts": 0, "retried": False, "hedged": False, "timed_out": False, "latency": 0.0, "error": None}
         if not self.client:
             # Mock response for testing without API key
             return {
                 "action": "HOLD",
-                "symbol": "BTC/USDT", 
+                "symbol": "BTC/USDT",
                 "amount_usd": 0,
                 "reasoning": "Mock Decision (No API Key)"
-            }
-
-        try:
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                temperature=0.5,
-                response_format={"type": "json_object"}
-            )
-            content = resp.choices[0].message.content
-            return json.loads(content)
-        except Exception:
-            return {"action": "HOLD", "symbol": "BTC/USDT", "amount_usd": 0, "reasoning": "LLM error"}
+            }, meta
+
+        key = None
+        if self.cache is not None:
+            key = cache_key(self.model, self.system_prompt, user_content)
+            cached = self.cache.get(key)
+            if cached is not None:
+                meta["cached"] = True
+                return cached, meta
+
+        start = time.monotonic()
+        deadline_at = start + self.deadline
+        for attempt in range(self.retries + 1):
+            meta["attempts"] = attempt + 1
+            meta["retried"] = attempt > 0
+            decision = self._attempt(user_content, deadline_at, meta)
+            if decision is not None:
+                meta["latency"] = time.monotonic() - start
+                meta["error"] = None
+                with self.lock:
+                    self.latencies.append(meta["latency"])
+                # Only successful responses are cached; errors fall through to a fresh call next tick
+                if key is not None:
+                    self.cache.set(key, decision)
+                return decision, meta
+            remaining = deadline_at - time.monotonic()
+            if meta["timed_out"] or remaining <= 0 or attempt == self.retries:
+                break
+            # Exponential backoff with full jitter, never past the deadline
+            time.sleep(min(random.uniform(0, 0.5 * (2 ** attempt)), remaining))
+        meta["latency"] = time.monotonic() - start
+        if time.monotonic() >= deadline_at:
+            meta["timed_out"] = True
+        reason = "LLM timeout" if meta["timed_out"] else "LLM error"
+        return {"action": "HOLD", "symbol": "BTC/USDT", "amount_usd": 0, "reasoning": reason}, meta
+
+    def hedge_delay(self) -> float:
+        if self.hedge_after is not None:
+            return self.hedge_after
+        with self.lock:
+            samples = sorted(self.latencies)
+        if len(samples) < 20:
+            return self.deadline / 3.0
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    def _attempt(self, user_content: str, deadline_at: float, meta: dict):
+        # One logical attempt: the primary request plus, if enabled, a duplicate once the p95 delay passes
+        started = time.monotonic()
+        pending = {_request_pool.submit(self._request, user_content, deadline_at - started)}
+        hedge_at = started + self.hedge_delay() if self.hedge else None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline_at:
+                meta["timed_out"] = True
+                return None
+            wait_until = deadline_at if hedge_at is None else min(deadline_at, hedge_at)
+            done, pending = wait(pending, timeout=max(wait_until - now, 0), return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    return fut.result()
+                except Exception as e:
+                    meta["error"] = str(e)[:200]
+            if hedge_at is not None and time.monotonic() >= hedge_at and pending:
+                meta["hedged"] = True
+                pending.add(_request_pool.submit(self._request, user_content, deadline_at - time.monotonic()))
+                hedge_at = None
+        return None
+
+    def _request(self, user_content: str, timeout: float) -> dict:
+        resp = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_content}
+            ],
+            temperature=0.5,
+            response_format={"type": "json_object"},
+            timeout=max(timeout, 0.1)
+        )
+        decision = json.loads(resp.choices[0].message.content)
+        if not isinstance(decision, dict):
+            raise ValueError("LLM response is not a JSON object")
+        return decision
+
+class ClientRegistry:
+    def __init__(self, pool_size: int = 16, timeout: float = 30, connect_timeout: float = 5, cache=None,
+                 deadline: float = 45, retries: int = 2, hedge: bool = False, hedge_after: float = None):
+        api_key = os.getenv("DEEPSEEK_API_KEY")
+        self.openai = make_openai(api_key, pool_size, timeout, connect_timeout) if api_key else None
+        self.cache = cache
+        self.options = {"deadline": deadline, "retries": retries, "hedge": hedge, "hedge_after": hedge_after}
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def get(self, system_prompt: str, model: str = "deepseek-chat") -> DeepSeekClient:
+        key = (model, system_prompt)
+        with self.lock:
+            client = self.clients.get(key)
+            if client is None:
+                client = DeepSeekClient(system_prompt=system_prompt, model=model, cache=self.cache, client=self.openai, **self.options)
+                self.clients[key] = client
+            return client
+
+    def close(self):
+        with self.lock:
+            self.clients.clear()
+            if self.openai is not None:
+                self.openai.close()
+                self.openai = None
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def cache_key(model: str, system_prompt: str, user_content: str) -> str:
+    # Whitespace differences between otherwise identical prompts should not miss the cache
+    normalized = " ".join(str(user_content).split())
+    h = hashlib.sha256()
+    for part in (model, system_prompt, normalized):
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+class LLMCache:
+    def __init__(self, ttl: float = 300, maxsize: int = 512, path: str = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self.db = sqlite3.connect(path, check_same_thread=False)
+                self.db.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)")
+                self.db.execute("DELETE FROM llm_cache WHERE created < ?", (time.time() - ttl,))
+                self.db.commit()
+            except Exception as e:
+                print(f"LLM cache disk backend disabled: {e}")
+                self.db = None
+
+    def get(self, key: str):
+        now = time.time()
+        with self.lock:
+            entry = self.items.get(key)
+            if entry is None and self.db is not None:
+                try:
+                    row = self.db.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                    if row:
+                        entry = (row[1], json.loads(row[0]))
+                        self._put(key, entry)
+                except Exception:
+                    entry = None
+            if entry is None or now - entry[0] > self.ttl:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(self, key: str, value: dict):
+        entry = (time.time(), dict(value))
+        with self.lock:
+            self._put(key, entry)
+            if self.db is not None:
+                try:
+                    self.db.execute("INSERT OR REPLACE INTO llm_cache (key, value, created) VALUES (?, ?, ?)", (key, json.dumps(entry[1]), entry[0]))
+                    self.db.commit()
+                except Exception:
+                    pass
+
+    def _put(self, key: str, entry: tuple):
+        self.items[key] = entry
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def _drop(self, key: str):
+        self.items.pop(key, None)
+        if self.db is not None:
+            try:
+                self.db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.db.commit()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": (self.hits / total) if total else 0.0, "size": len(self.items)}
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            if self.db is not None:
+                try:
+                    self.db.execute("DELETE FROM llm_cache")
+                    self.db.commit()
+                except Exception:
+                    pass
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
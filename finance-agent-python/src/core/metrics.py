@@ -0,0 +1,208 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.core.tape import TapeProxy
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+def quantile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+class Metrics:
+    # Spans feed rolling-window histograms; counters and gauges are plain totals. All methods are thread-safe.
+    def __init__(self, window: int = 2048, prefix: str = "finance_agent"):
+        self.window = window
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.totals = Counter()
+        self.counts = Counter()
+        self.counters = Counter()
+        self.gauges = {}
+        # Seconds per span name since the last flush, i.e. where the current tick went
+        self.tick = Counter()
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name: str, seconds: float):
+        with self.lock:
+            self.samples[name].append(seconds)
+            self.totals[name] += seconds
+            self.counts[name] += 1
+            self.tick[name] += seconds
+
+    def incr(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] += n
+
+    def gauge(self, name: str, value: float):
+        with self.lock:
+            self.gauges[name] = float(value)
+
+    def call(self, label: str, fn, args: tuple, kwargs: dict):
+        # Same hook TapeProxy uses for the tape, so exchange and news clients can be wrapped for timing
+        self.incr(f"{label}.calls")
+        try:
+            with self.span(label):
+                return fn(*args, **kwargs)
+        except Exception:
+            self.incr(f"{label}.errors")
+            raise
+
+    def histograms(self) -> dict:
+        with self.lock:
+            items = {k: sorted(v) for k, v in self.samples.items()}
+            counts = dict(self.counts)
+            totals = dict(self.totals)
+        out = {}
+        for name, values in items.items():
+            h = {f"p{int(q * 100)}": quantile(values, q) for q in QUANTILES}
+            h.update({"max": values[-1] if values else 0.0, "count": counts.get(name, 0), "sum": totals.get(name, 0.0)})
+            out[name] = h
+        return out
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            tick = dict(self.tick)
+        return {"ts": time.time(), "counters": counters, "gauges": gauges, "spans": self.histograms(), "tick_totals": tick}
+
+    def flush(self, path: str, **extra) -> dict:
+        # One JSONL line per tick; the per-tick span totals start over afterwards
+        snap = dict(self.snapshot(), **extra)
+        with self.lock:
+            self.tick = Counter()
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a") as f:
+                f.write(json.dumps(snap) + "\n")
+        except Exception:
+            pass
+        return snap
+
+    def prometheus(self) -> str:
+        p = self.prefix
+        snap = self.snapshot()
+        lines = [f"# TYPE {p}_span_seconds summary"]
+        for name, h in sorted(snap["spans"].items()):
+            for q in QUANTILES:
+                lines.append(f'{p}_span_seconds{{name="{name}",quantile="{q}"}} {h[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'{p}_span_seconds_sum{{name="{name}"}} {h["sum"]:.6f}')
+            lines.append(f'{p}_span_seconds_count{{name="{name}"}} {h["count"]}')
+        lines.append(f"# TYPE {p}_events_total counter")
+        for name, v in sorted(snap["counters"].items()):
+            lines.append(f'{p}_events_total{{name="{name}"}} {v}')
+        lines.append(f"# TYPE {p}_gauge gauge")
+        for name, v in sorted(snap["gauges"].items()):
+            lines.append(f'{p}_gauge{{name="{name}"}} {v}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        # GET /metrics is Prometheus text, /metrics.json the raw snapshot; local only by default
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, ctype = metrics.prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, ctype = json.dumps(metrics.snapshot()).encode("utf-8"), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+def metered(target, metrics: Metrics, prefix: str, methods: tuple):
+    return TapeProxy(target, metrics, prefix, methods)
+
+def record_decision(metrics: Metrics, decision: dict):
+    if decision.get("gated"):
+        metrics.incr("llm.gated")
+        return
+    meta = decision.get("llm")
+    if not meta:
+        return
+    # A cache hit never reaches the API, so llm.calls tracks what is billed
+    if not meta.get("cached"):
+        metrics.incr("llm.calls")
+    for flag in ("cached", "retried", "hedged", "timed_out"):
+        if meta.get(flag):
+            metrics.incr(f"llm.{flag}")
+    if meta.get("error"):
+        metrics.incr("llm.errors")
+    if meta.get("attempts"):
+        metrics.observe("llm.latency", float(meta.get("latency", 0.0) or 0.0))
+
+class TickProfiler:
+    # PROFILE=sample writes folded stacks for every thread; the tick's work runs in pool threads, which cProfile can't see
+    def __init__(self, mode: str, directory: str = "logs/profiles", interval: float = 0.005):
+        if mode != "sample":
+            raise ValueError(f"Unknown profiler mode: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.interval = interval
+        self.stacks = None
+        self.stop_event = None
+        self.thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self.thread.start()
+
+    def _sample(self):
+        me = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join([names.get(ident, str(ident))] + stack[::-1])] += 1
+
+    def stop(self, tick: int) -> str:
+        path = os.path.join(self.directory, f"tick-{tick:06d}.folded")
+        self.stop_event.set()
+        self.thread.join()
+        # Folded-stack format: feed straight into flamegraph.pl or speedscope
+        with open(path, "w") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        return path
+
+def profiler_from_env():
+    mode = os.getenv("PROFILE", "").lower()
+    if not mode:
+        return None
+    return TickProfiler(mode, os.getenv("PROFILE_DIR", "logs/profiles"), float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000.0)
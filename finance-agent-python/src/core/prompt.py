@@ -0,0 +1,131 @@
+import json
+import math
+import numpy as np
+from src.data.candles import Candles
+
+PRICE_DIGITS = 6
+VOLUME_DIGITS = 4
+# Without a tick size, prices keep at least cents so 100000.25 is not sent as 100000
+MIN_PRICE_DECIMALS = 2
+MIN_BARS = 20
+# What encode_candles produces, for system prompts to describe
+CANDLES_FORMAT = (
+    "Each timeframe's 'candles' holds the most recent 'bars' (oldest first, trimmed to fit the prompt) as compact CSV: "
+    "'columns' names the fields (o,h,l,c,v; a leading t is minutes since 'start' when spacing is irregular), "
+    "'rows' are separated by ';', and bars are 'interval_min' minutes apart from 'start'. "
+)
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/JSON on BPE tokenizers; good enough for budgeting
+    return int(math.ceil(len(text) / 4.0))
+
+def _decimals(ref: float, digits: int) -> int:
+    ref = abs(float(ref))
+    if not np.isfinite(ref) or ref == 0:
+        return 2
+    return max(0, digits - 1 - int(math.floor(math.log10(ref))))
+
+def _tick_decimals(tick: float) -> int:
+    s = f"{float(tick):.12f}".rstrip("0")
+    return len(s.split(".")[1])
+
+def _fmt(x: float, decimals: int) -> str:
+    s = f"{x:.{decimals}f}"
+    if "." in s:
+        s = s.rstrip("0").rstrip(".")
+    return "0" if s in ("-0", "") else s
+
+def _number(x, digits: int = PRICE_DIGITS, tick: float = None):
+    x = float(x)
+    if not np.isfinite(x):
+        return None
+    if x == int(x) and abs(x) < 1e15:
+        return int(x)
+    # Significant figures, but never coarser than the tick, so large prices keep the decimals they trade at
+    return round(x, max(_decimals(x, digits), _tick_decimals(tick) if tick else MIN_PRICE_DECIMALS))
+
+def encode_candles(candles: Candles, delta: bool = False, tick: float = None) -> dict:
+    # CSV-like rows instead of one dict per bar; timestamps collapse to start + interval when regular
+    n = len(candles)
+    if n == 0:
+        return {"bars": 0}
+    ts = candles.timestamp
+    steps = np.diff(ts)
+    out = {"bars": n, "start": candles.timestamps_str()[0]}
+    cols = ["o", "h", "l", "c", "v"]
+    offsets = None
+    if n > 1 and np.all(steps == steps[0]):
+        out["interval_min"] = int(steps[0] // 60000)
+    elif n > 1:
+        offsets = ((ts - ts[0]) // 60000).astype(np.int64)
+        cols = ["t"] + cols
+    vol_dec = _decimals(np.max(np.abs(candles.volume)), VOLUME_DIGITS)
+    prices = np.column_stack([candles.open, candles.high, candles.low, candles.close])
+    if tick:
+        price_dec = _tick_decimals(tick)
+        prices = np.round(prices / tick) * tick
+    else:
+        price_dec = max(_decimals(np.median(candles.close), PRICE_DIGITS), MIN_PRICE_DECIMALS)
+    if delta:
+        # First row absolute, then each bar relative to the previous close
+        base = np.concatenate([[0.0], candles.close[:-1]])[:, None]
+        prices = prices - base
+        out["price_mode"] = "delta_prev_close"
+    rows = []
+    for i in range(n):
+        vals = [_fmt(p, price_dec) for p in prices[i]] + [_fmt(candles.volume[i], vol_dec)]
+        if offsets is not None:
+            vals.insert(0, str(int(offsets[i])))
+        rows.append(",".join(vals))
+    out["columns"] = ",".join(cols)
+    out["rows"] = ";".join(rows)
+    return out
+
+def compact(obj, delta: bool = False, tick: float = None):
+    if isinstance(obj, Candles):
+        return encode_candles(obj, delta, tick)
+    if isinstance(obj, dict):
+        return {str(k): compact(v, delta, tick) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [compact(v, delta, tick) for v in obj]
+    if isinstance(obj, (bool, np.bool_)):
+        return bool(obj)
+    if isinstance(obj, (int, np.integer)):
+        return int(obj)
+    if isinstance(obj, (float, np.floating)):
+        return _number(obj, tick=tick)
+    if obj is None or isinstance(obj, str):
+        return obj
+    return str(obj)
+
+def to_json(obj, delta: bool = False, tick: float = None) -> str:
+    return json.dumps(compact(obj, delta, tick), separators=(",", ":"), ensure_ascii=False)
+
+def _max_bars(obj) -> int:
+    if isinstance(obj, Candles):
+        return len(obj)
+    if isinstance(obj, dict):
+        return max([_max_bars(v) for v in obj.values()] or [0])
+    if isinstance(obj, (list, tuple)):
+        return max([_max_bars(v) for v in obj] or [0])
+    return 0
+
+def _trim(obj, bars: int):
+    if isinstance(obj, Candles):
+        return obj.tail(bars)
+    if isinstance(obj, dict):
+        return {k: _trim(v, bars) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_trim(v, bars) for v in obj]
+    return obj
+
+def encode_prompt(payload: dict, token_budget: int = None, delta: bool = False, min_bars: int = MIN_BARS, tick: float = None) -> str:
+    # Oldest candles are dropped first, uniformly across timeframes, until the estimate fits the budget
+    text = to_json(payload, delta, tick)
+    if not token_budget:
+        return text
+    bars = _max_bars(payload)
+    while estimate_tokens(text) > token_budget and bars > min_bars:
+        bars = max(min_bars, int(bars * 0.75))
+        text = to_json(_trim(payload, bars), delta, tick)
+    return text
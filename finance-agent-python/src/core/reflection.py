@@ -0,0 +1,104 @@
+import json
+import queue
+import threading
+import time
+
+REVIEWER_PROMPT = (
+    'You are a trading reviewer. Return JSON: {"reflection": string}. '
+    'For a "batch_reflection" request return {"reflections": [{"id": number, "reflection": string}]} with one item per event.'
+)
+
+_STOP = object()
+
+class ReflectionWorker:
+    def __init__(self, reviewer, journal_path: str, max_backlog: int = 100, batch_size: int = 8, batch_wait: float = 0.5, metrics=None):
+        self.reviewer = reviewer
+        self.metrics = metrics
+        self.journal_path = journal_path
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.max_backlog = max_backlog
+        # Unbounded so a journal record is never lost; only the LLM reflection is shed under backlog
+        self.queue = queue.Queue()
+        self.write_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="reflection", daemon=True)
+        self.closed = False
+        self.skipped = 0
+        self.thread.start()
+
+    def submit(self, kind: str, heading: str, record: dict, context: dict):
+        # kind is entry_reflection/exit_reflection; record is what lands in the journal next to the reflection
+        item = (kind, heading, record, context)
+        if self.closed and not self.thread.is_alive():
+            # The worker has drained and exited, so a late entry still lands after everything it wrote
+            self._write([(item, "")])
+            return
+        self.queue.put_nowait(item)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    nxt = self.queue.get(timeout=self.batch_wait)
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True
+                    break
+                batch.append(nxt)
+            if self.queue.qsize() >= self.max_backlog:
+                # Too far behind to wait on the reviewer: journal the records without a reflection
+                reflections = [""] * len(batch)
+                self.skipped += len(batch)
+                if self.metrics is not None:
+                    self.metrics.incr("reflection.skipped", len(batch))
+            else:
+                started = time.perf_counter()
+                reflections = self._reflect(batch)
+                if self.metrics is not None:
+                    self.metrics.observe("reflection.llm", time.perf_counter() - started)
+            self._write(list(zip(batch, reflections)))
+
+    def _reflect(self, batch: list) -> list:
+        try:
+            if len(batch) == 1:
+                kind, _, _, context = batch[0]
+                ref = self.reviewer.complete_json(json.dumps({"type": kind, "context": context}))
+                return [str(ref.get("reflection", ""))]
+            events = [{"id": i, "type": kind, "context": context} for i, (kind, _, _, context) in enumerate(batch)]
+            ref = self.reviewer.complete_json(json.dumps({"type": "batch_reflection", "events": events}))
+            by_id = {}
+            for r in ref.get("reflections", []) or []:
+                try:
+                    by_id[int(r.get("id"))] = str(r.get("reflection", ""))
+                except Exception:
+                    pass
+            return [by_id.get(i, "") for i in range(len(batch))]
+        except Exception:
+            return [""] * len(batch)
+
+    def _write(self, items: list):
+        started = time.perf_counter()
+        with self.write_lock:
+            try:
+                with open(self.journal_path, "a") as f:
+                    for (kind, heading, record, context), reflection in items:
+                        f.write(f"\n## {heading}\n")
+                        f.write(json.dumps(dict(record, reflection=reflection)) + "\n")
+            except Exception:
+                pass
+        if self.metrics is not None:
+            self.metrics.observe("journal.write", time.perf_counter() - started)
+
+    def close(self, timeout: float = 30):
+        # Drains everything already queued before returning
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
@@ -0,0 +1,206 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+import numpy as np
+import pandas as pd
+from src.data.instruments import InstrumentSpec
+
+OKX_METHODS = (
+    "fetch_ohlcv", "fetch_price", "fetch_balance", "get_account_state", "fetch_perp_position_qty",
+    "instrument_spec", "refresh_instruments", "get_perp_min_amount", "get_perp_min_base_qty", "set_perp_leverage",
+    "place_spot_market_buy", "place_spot_market_sell", "place_perp_market_order", "place_perp_market_by_contracts",
+    "close_perp_market", "place_perp_tp_sl_algo"
+)
+NEWS_METHODS = ("headlines",)
+LLM_METHODS = ("complete_json", "complete_json_with_meta")
+
+class TapeMiss(Exception):
+    pass
+
+def encode(obj):
+    if isinstance(obj, pd.DataFrame):
+        df = obj.copy()
+        if "timestamp" in df:
+            df["timestamp"] = df["timestamp"].to_numpy().astype("datetime64[ms]").astype(np.int64)
+        return {"__df__": {c: df[c].tolist() for c in df.columns}}
+    if isinstance(obj, InstrumentSpec):
+        return {"__spec__": list(obj)}
+    if isinstance(obj, tuple):
+        return {"__tuple__": [encode(v) for v in obj]}
+    if isinstance(obj, dict):
+        return {str(k): encode(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [encode(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+def decode(obj):
+    if isinstance(obj, dict):
+        if "__df__" in obj:
+            df = pd.DataFrame(obj["__df__"])
+            if "timestamp" in df:
+                df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+            return df
+        if "__spec__" in obj:
+            return InstrumentSpec(*obj["__spec__"])
+        if "__tuple__" in obj:
+            return tuple(decode(v) for v in obj["__tuple__"])
+        return {k: decode(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [decode(v) for v in obj]
+    return obj
+
+def call_key(name: str, args: tuple, kwargs: dict) -> str:
+    raw = json.dumps([encode(list(args)), encode(kwargs)], sort_keys=True, default=str)
+    return name + ":" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+class Tape:
+    def __init__(self, path: str, mode: str, speed: float = 0):
+        # mode is "record" or "replay"; speed > 0 replays recorded latencies that many times faster, 0 skips them
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.entries = defaultdict(deque)
+        self.file = None
+        if mode == "record":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.file = gzip.open(path, "at") if path.endswith(".gz") else open(path, "a")
+        elif mode == "replay":
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt") as f:
+                for line in f:
+                    if line.strip():
+                        e = json.loads(line)
+                        self.entries[e["k"]].append(e)
+        else:
+            raise ValueError(f"Unknown tape mode: {mode}")
+
+    def call(self, name: str, fn, args: tuple, kwargs: dict):
+        key = call_key(name, args, kwargs)
+        if self.mode == "replay":
+            with self.lock:
+                queue = self.entries.get(key)
+                if not queue:
+                    raise TapeMiss(f"{name} not on tape")
+                e = queue.popleft()
+            if self.speed > 0 and e.get("t"):
+                time.sleep(e["t"] / self.speed)
+            if "err" in e:
+                raise RuntimeError(e["err"])
+            return decode(e["r"])
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as ex:
+            self._write({"k": key, "t": round(time.monotonic() - start, 4), "err": str(ex)})
+            raise
+        self._write({"k": key, "t": round(time.monotonic() - start, 4), "r": encode(result)})
+        return result
+
+    def _write(self, entry: dict):
+        line = json.dumps(entry, separators=(",", ":"), default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def tick(self) -> bool:
+        # Tick boundaries are recorded so a replay stops where the recording did
+        if self.mode == "record":
+            self._write({"k": "tick"})
+            return True
+        with self.lock:
+            queue = self.entries.get("tick")
+            if not queue:
+                return False
+            queue.popleft()
+            return bool(queue)
+
+    def remaining(self) -> int:
+        with self.lock:
+            return sum(len(q) for q in self.entries.values())
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+class TapeProxy:
+    # Routes the listed methods through the tape; everything else goes straight to the target
+    def __init__(self, target, tape: Tape, prefix: str, methods: tuple):
+        self._target = target
+        self._tape = tape
+        self._prefix = prefix
+        self._methods = set(methods)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._target, name, value)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name not in self._methods or not callable(attr):
+            return attr
+        label = f"{self._prefix}.{name}"
+        return lambda *args, **kwargs: self._tape.call(label, attr, args, kwargs)
+
+class TapeRegistry:
+    def __init__(self, registry, tape: Tape):
+        self.registry = registry
+        self.tape = tape
+        self.proxies = {}
+        self.lock = threading.Lock()
+
+    def get(self, system_prompt: str, model: str = "deepseek-chat"):
+        with self.lock:
+            key = (model, system_prompt)
+            if key not in self.proxies:
+                prompt_id = hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:12]
+                self.proxies[key] = TapeProxy(self.registry.get(system_prompt, model), self.tape, f"llm.{model}.{prompt_id}", LLM_METHODS)
+            return self.proxies[key]
+
+    def close(self):
+        self.registry.close()
+
+class TapePool:
+    # Wraps FetchPool so a replay takes exactly the timeout fallbacks the recording took
+    def __init__(self, pool, tape: Tape, replay_wait: float = 3600):
+        self.pool = pool
+        self.tape = tape
+        self.replay_wait = replay_wait
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+    def gather(self, calls: dict, defaults: dict = None, timeout: float = None, timeouts: dict = None) -> dict:
+        if self.tape.mode == "replay":
+            # Every call still runs, so its tape entry is consumed in order; then the recorded fallbacks win
+            out = self.pool.gather(calls, timeout=self.replay_wait)
+            for k, v in self.tape.call("pool.fallbacks", None, (), {}):
+                out[tuple(k) if isinstance(k, list) else k] = v
+            return out
+        defaults = defaults or {}
+        fell_back = {}
+        wrapped = {}
+        for k in calls:
+            def fallback(k=k, d=defaults.get(k)):
+                fell_back[k] = d() if callable(d) else d
+                return fell_back[k]
+            wrapped[k] = fallback
+        out = self.pool.gather(calls, defaults=wrapped, timeout=timeout, timeouts=timeouts)
+        self.tape.call("pool.fallbacks", lambda: [[list(k) if isinstance(k, tuple) else k, v] for k, v in fell_back.items()], (), {})
+        return out
+
+def tape_from_env():
+    mode = os.getenv("TAPE_MODE", "").lower()
+    if mode not in ("record", "replay"):
+        return None
+    return Tape(os.getenv("TAPE_PATH", "logs/tape.jsonl.gz"), mode, float(os.getenv("TAPE_SPEED", "0")))
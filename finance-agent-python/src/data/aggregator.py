@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from src.data.candles import Candles
 
 def sma(series: pd.Series, n: int) -> pd.Series:
     return series.rolling(window=n, min_periods=1).mean()
@@ -18,37 +19,72 @@ def macd(series: pd.Series) -> pd.Series:
     ema26 = series.ewm(span=26, adjust=False).mean()
     return ema12 - ema26
 
-def summarize(df: pd.DataFrame) -> dict:
-    last = df.iloc[-1]
-    s20 = sma(df["close"], 20).iloc[-1]
-    r = rsi(df["close"]).iloc[-1]
-    m = macd(df["close"]).iloc[-1]
-    trend = "up" if last["close"] > s20 else "down"
-    momentum = "bullish" if m > 0 else "bearish"
-    
-    # Recent 200 candles for pattern recognition (Full History)
-    history = df[["timestamp", "open", "high", "low", "close", "volume"]].copy()
-    history["timestamp"] = history["timestamp"].dt.strftime("%Y-%m-%d %H:%M")
-    recent = history.to_dict(orient="records")
-
-    return {
-        "current": {
+def summarize(df: pd.DataFrame, current: dict = None) -> dict:
+    if current is None:
+        last = df.iloc[-1]
+        s20 = sma(df["close"], 20).iloc[-1]
+        r = rsi(df["close"]).iloc[-1]
+        m = macd(df["close"]).iloc[-1]
+        current = {
             "price": float(last["close"]),
             "sma20": float(s20),
             "rsi": float(r) if np.isfinite(r) else 50.0,
             "macd": float(m),
-            "trend": trend,
-            "momentum": momentum,
+            "trend": "up" if last["close"] > s20 else "down",
+            "momentum": "bullish" if m > 0 else "bearish",
             "volatility": float(df["close"].std()),
             "high_200": float(df["high"].max()),
             "low_200": float(df["low"].min())
-        },
-        "candles": recent
+        }
+
+    return {
+        "current": current,
+        "candles": Candles.from_frame(df)
     }
 
-def build_multi_timeframe(okx_client, symbol: str, timeframes: list) -> dict:
+def _summarize(engine, symbol: str, tf: str, df: pd.DataFrame) -> dict:
+    if engine is None:
+        return summarize(df)
+    return summarize(df, engine.update(symbol, tf, df))
+
+def build_multi_timeframe(okx_client, symbol: str, timeframes: list, pool=None, engine=None) -> dict:
+    if pool is None:
+        frames = {tf: okx_client.fetch_ohlcv(symbol, tf, limit=200) for tf in timeframes}
+    else:
+        frames = pool.gather(
+            {tf: (okx_client.fetch_ohlcv, symbol, tf, 200) for tf in timeframes},
+            defaults={tf: (lambda tf=tf: okx_client.cached_ohlcv(symbol, tf, 200)) for tf in timeframes}
+        )
     out = {}
     for tf in timeframes:
-        df = okx_client.fetch_ohlcv(symbol, tf, limit=200)
-        out[tf] = summarize(df)
+        out[tf] = _summarize(engine, symbol, tf, frames[tf])
     return out
+
+def build_tick_snapshot(okx_client, symbol: str, timeframes: list, pool, extra_symbols: list = None, engine=None) -> dict:
+    return build_multi_snapshot(okx_client, [symbol], timeframes, pool, extra_symbols, engine)[symbol]
+
+def build_multi_snapshot(okx_client, symbols: list, timeframes: list, pool, extra_symbols: list = None, engine=None) -> dict:
+    # Issue every ticker, balance, position and candle request of a tick, for all symbols, together
+    price_symbols = list(symbols) + [s for s in (extra_symbols or []) if s not in symbols]
+    calls = {("price", s): (okx_client.fetch_price, s) for s in price_symbols}
+    calls[("balance",)] = (okx_client.fetch_balance,)
+    defaults = {("price", s): (lambda s=s: float(okx_client.last_price.get(s, 0.0))) for s in price_symbols}
+    for symbol in symbols:
+        calls[("perp_qty", symbol)] = (okx_client.fetch_perp_position_qty, symbol)
+        defaults[("perp_qty", symbol)] = 0.0
+        for tf in timeframes:
+            calls[("ohlcv", symbol, tf)] = (okx_client.fetch_ohlcv, symbol, tf, 200)
+            defaults[("ohlcv", symbol, tf)] = lambda symbol=symbol, tf=tf: okx_client.cached_ohlcv(symbol, tf, 200)
+    res = pool.gather(calls, defaults=defaults)
+    prices = {s: res[("price", s)] for s in price_symbols}
+    # A symbol that timed out with nothing cached has no candles to summarize; it sits this tick out
+    ready = [s for s in symbols if all(res[("ohlcv", s, tf)] is not None and len(res[("ohlcv", s, tf)]) for tf in timeframes)]
+    return {
+        symbol: {
+            "prices": prices,
+            "account": okx_client.account_state_from_balance(res[("balance",)], symbol, prices[symbol]),
+            "perp_qty": res[("perp_qty", symbol)],
+            "multi": {tf: _summarize(engine, symbol, tf, res[("ohlcv", symbol, tf)]) for tf in timeframes}
+        }
+        for symbol in ready
+    }
@@ -0,0 +1,128 @@
+import threading
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+def empty_frame() -> pd.DataFrame:
+    return pd.DataFrame(columns=COLUMNS)
+
+class CandleRing:
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        # Each row is written at slot i and i + capacity, so the newest `capacity` rows are always one contiguous slice
+        self.ts = np.zeros(2 * self.capacity, dtype=np.int64)
+        self.values = np.zeros((2 * self.capacity, 5), dtype=np.float64)
+        self.head = 0
+        self.size = 0
+        self.version = 0
+        self._frame = None
+        self._frame_key = None
+        self.lock = threading.RLock()
+        self.streamed_at = 0.0
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+        self.streamed_at = 0.0
+        self.version += 1
+
+    def last_ts(self):
+        if not self.size:
+            return None
+        return int(self.ts[self.head + self.size - 1])
+
+    def _write(self, slot: int, ts: int, row):
+        self.ts[slot] = ts
+        self.ts[slot + self.capacity] = ts
+        self.values[slot] = row
+        self.values[slot + self.capacity] = row
+
+    def _append(self, ts: int, row):
+        if self.size < self.capacity:
+            self._write(self.size, ts, row)
+            self.size += 1
+        else:
+            self._write(self.head, ts, row)
+            self.head = (self.head + 1) % self.capacity
+
+    def _fill(self, ts: np.ndarray, values: np.ndarray):
+        n = min(len(ts), self.capacity)
+        self.head = 0
+        self.size = n
+        self.ts[:n] = ts[-n:]
+        self.ts[self.capacity:self.capacity + n] = ts[-n:]
+        self.values[:n] = values[-n:]
+        self.values[self.capacity:self.capacity + n] = values[-n:]
+
+    def merge(self, rows) -> int:
+        arr = np.asarray(rows, dtype=np.float64)
+        if arr.size == 0:
+            return 0
+        arr = arr.reshape(-1, 6)
+        return self.merge_arrays(arr[:, 0].astype(np.int64), arr[:, 1:6])
+
+    def merge_arrays(self, ts: np.ndarray, values: np.ndarray) -> int:
+        if not len(ts):
+            return 0
+        last = self.last_ts()
+        if last is None:
+            self._fill(ts, values)
+            self.version += 1
+            return len(ts)
+        changed = 0
+        for i in range(len(ts)):
+            t = int(ts[i])
+            if t < last:
+                continue
+            if t == last:
+                # Still-forming bar: overwrite in place
+                self._write((self.head + self.size - 1) % self.capacity, t, values[i])
+            else:
+                self._append(t, values[i])
+                last = t
+            changed += 1
+        if changed:
+            self.version += 1
+        return changed
+
+    def arrays(self, limit: int = None):
+        n = self.size if limit is None else min(int(limit), self.size)
+        end = self.head + self.size
+        return self.ts[end - n:end], self.values[end - n:end]
+
+    def frame(self, limit: int = None) -> pd.DataFrame:
+        # The stream thread and timed-out fetches may still be merging; copy the rows out under the lock
+        with self.lock:
+            key = (self.version, limit)
+            if self._frame is not None and self._frame_key == key:
+                return self._frame
+            ts, values = self.arrays(limit)
+            df = pd.DataFrame({
+                "timestamp": pd.to_datetime(ts, unit="ms"),
+                "open": values[:, 0],
+                "high": values[:, 1],
+                "low": values[:, 2],
+                "close": values[:, 3],
+                "volume": values[:, 4]
+            }, copy=True)
+            self._frame = df
+            self._frame_key = key
+            return df
+
+class CandleCache:
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.rings = {}
+        self.lock = threading.RLock()
+
+    def get(self, symbol: str, timeframe: str):
+        return self.rings.get((symbol, timeframe))
+
+    def ring(self, symbol: str, timeframe: str, min_capacity: int = 0) -> CandleRing:
+        with self.lock:
+            r = self.rings.get((symbol, timeframe))
+            if r is None or r.capacity < min_capacity:
+                r = CandleRing(max(self.capacity, min_capacity))
+                self.rings[(symbol, timeframe)] = r
+            return r
@@ -0,0 +1,130 @@
+import os
+import bisect
+import threading
+import numpy as np
+import pandas as pd
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+DTYPE = np.dtype([("timestamp", "<i8")] + [(f, "<f8") for f in FIELDS])
+
+class CandleStore:
+    def __init__(self, root: str = "data/candles", segment_rows: int = 50000):
+        self.root = root
+        self.segment_rows = int(segment_rows)
+        self.segments = {}
+        self.maps = {}
+        self.lock = threading.RLock()
+
+    def _dir(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, symbol.replace("/", "-").replace(":", "-"), timeframe)
+
+    def _path(self, symbol: str, timeframe: str, start: int) -> str:
+        return os.path.join(self._dir(symbol, timeframe), f"{int(start):015d}.bin")
+
+    def _starts(self, symbol: str, timeframe: str) -> list:
+        # Segment files are named by their first timestamp; the sorted starts are the range index
+        starts = self.segments.get((symbol, timeframe))
+        if starts is None:
+            try:
+                names = os.listdir(self._dir(symbol, timeframe))
+            except FileNotFoundError:
+                names = []
+            starts = sorted(int(n[:-4]) for n in names if n.endswith(".bin"))
+            self.segments[(symbol, timeframe)] = starts
+        return starts
+
+    def _load(self, path: str) -> np.ndarray:
+        m = self.maps.get(path)
+        if m is None:
+            # A torn trailing write leaves a partial row; only map whole rows
+            rows = os.path.getsize(path) // DTYPE.itemsize
+            m = np.memmap(path, dtype=DTYPE, mode="r", shape=(rows,)) if rows else np.empty(0, dtype=DTYPE)
+            self.maps[path] = m
+        return m
+
+    def last_ts(self, symbol: str, timeframe: str):
+        with self.lock:
+            starts = self._starts(symbol, timeframe)
+            if not starts:
+                return None
+            tail = self._load(self._path(symbol, timeframe, starts[-1]))
+            return int(tail["timestamp"][-1]) if len(tail) else None
+
+    def append(self, symbol: str, timeframe: str, ts, values) -> int:
+        ts = np.asarray(ts, dtype=np.int64)
+        if not len(ts):
+            return 0
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(FIELDS))
+        with self.lock:
+            last = self.last_ts(symbol, timeframe)
+            if last is not None:
+                keep = ts > last
+                ts, values = ts[keep], values[keep]
+            if not len(ts):
+                return 0
+            rows = np.empty(len(ts), dtype=DTYPE)
+            rows["timestamp"] = ts
+            for i, f in enumerate(FIELDS):
+                rows[f] = values[:, i]
+            written = len(rows)
+            starts = self._starts(symbol, timeframe)
+            os.makedirs(self._dir(symbol, timeframe), exist_ok=True)
+            if starts:
+                tail_path = self._path(symbol, timeframe, starts[-1])
+                room = self.segment_rows - len(self._load(tail_path))
+                if room > 0:
+                    self._write(tail_path, rows[:room])
+                    rows = rows[room:]
+            while len(rows):
+                chunk = rows[:self.segment_rows]
+                start = int(chunk["timestamp"][0])
+                self._write(self._path(symbol, timeframe, start), chunk)
+                starts.append(start)
+                rows = rows[self.segment_rows:]
+            return written
+
+    def _write(self, path: str, rows: np.ndarray):
+        with open(path, "ab") as f:
+            torn = f.tell() % DTYPE.itemsize
+            if torn:
+                f.truncate(f.tell() - torn)
+            f.write(rows.tobytes())
+        self.maps.pop(path, None)
+
+    def read(self, symbol: str, timeframe: str, start: int = None, end: int = None) -> np.ndarray:
+        with self.lock:
+            starts = self._starts(symbol, timeframe)
+            lo = 0 if start is None else max(bisect.bisect_right(starts, start) - 1, 0)
+            hi = len(starts) if end is None else bisect.bisect_right(starts, end)
+            parts = []
+            for s in starts[lo:hi]:
+                m = self._load(self._path(symbol, timeframe, s))
+                i = 0 if start is None else int(np.searchsorted(m["timestamp"], start, "left"))
+                j = len(m) if end is None else int(np.searchsorted(m["timestamp"], end, "right"))
+                if j > i:
+                    parts.append(m[i:j])
+        if not parts:
+            return np.empty(0, dtype=DTYPE)
+        # A single segment is returned as a zero-copy memmap slice
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def tail(self, symbol: str, timeframe: str, n: int) -> np.ndarray:
+        with self.lock:
+            starts = self._starts(symbol, timeframe)
+            parts = []
+            need = int(n)
+            for s in reversed(starts):
+                if need <= 0:
+                    break
+                m = self._load(self._path(symbol, timeframe, s))
+                parts.append(m[max(len(m) - need, 0):])
+                need -= len(m)
+        if not parts:
+            return np.empty(0, dtype=DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts[::-1])
+
+    def frame(self, symbol: str, timeframe: str, start: int = None, end: int = None) -> pd.DataFrame:
+        rows = self.read(symbol, timeframe, start, end)
+        df = pd.DataFrame({f: np.asarray(rows[f]) for f in FIELDS})
+        df.insert(0, "timestamp", pd.to_datetime(np.asarray(rows["timestamp"]), unit="ms"))
+        return df
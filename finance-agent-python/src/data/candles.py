@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+class Candles:
+    __slots__ = ("timestamp", "open", "high", "low", "close", "volume")
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+
+    @classmethod
+    def empty(cls):
+        return cls(*([[]] * 6))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        if df is None or df.empty:
+            return cls.empty()
+        ts = df["timestamp"].to_numpy().astype("datetime64[ms]").astype(np.int64)
+        return cls(ts, *(df[f].to_numpy(dtype=np.float64) for f in FIELDS))
+
+    @classmethod
+    def from_records(cls, records: list):
+        if not records:
+            return cls.empty()
+        ts = pd.to_datetime([r.get("timestamp") for r in records]).to_numpy().astype("datetime64[ms]").astype(np.int64)
+        return cls(ts, *([float(r.get(f, 0) or 0) for r in records] for f in FIELDS))
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return Candles(*(getattr(self, k)[idx] for k in self.__slots__))
+        raise TypeError("Candles only supports slicing")
+
+    def tail(self, n: int):
+        return self[-n:] if n < len(self) else self
+
+    def last_ts(self):
+        return int(self.timestamp[-1]) if len(self) else None
+
+    def timestamps_str(self, fmt: str = "%Y-%m-%d %H:%M") -> list:
+        return pd.to_datetime(self.timestamp, unit="ms").strftime(fmt).tolist()
+
+    def to_records(self) -> list:
+        cols = [self.timestamps_str()] + [getattr(self, f).tolist() for f in FIELDS]
+        return [dict(zip(("timestamp",) + FIELDS, row)) for row in zip(*cols)]
+
+def as_candles(obj) -> Candles:
+    if isinstance(obj, Candles):
+        return obj
+    return Candles.from_records(obj or [])
+
+def to_payload(obj):
+    # Candles stay columnar through the tick and only become records where a prompt is serialized
+    if isinstance(obj, Candles):
+        return obj.to_records()
+    if isinstance(obj, dict):
+        return {k: to_payload(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_payload(v) for v in obj]
+    return obj
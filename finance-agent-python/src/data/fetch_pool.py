@@ -0,0 +1,73 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class RateLimiter:
+    def __init__(self, rate_per_sec: float, burst: int):
+        self.rate = float(rate_per_sec)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        # Non-blocking variant for callers that reject instead of waiting
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: float = None) -> bool:
+        # Gives up without sleeping once the next token would arrive after the timeout
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if end is not None and time.monotonic() + wait > end:
+                return False
+            time.sleep(wait)
+
+class FetchPool:
+    def __init__(self, max_workers: int = 8, rate_per_sec: float = 10, burst: int = 10, timeout: float = 15):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self.limiter = RateLimiter(rate_per_sec, burst)
+        self.timeout = timeout
+
+    def submit(self, fn, *args, **kwargs):
+        # Throttling waits on the caller's thread, so a worker slot is never parked in a limiter sleep
+        self.limiter.acquire()
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def gather(self, calls: dict, defaults: dict = None, timeout: float = None, timeouts: dict = None) -> dict:
+        # calls maps key -> (fn, *args); a call that misses its deadline resolves to its default (value or callable)
+        defaults = defaults or {}
+        timeouts = timeouts or {}
+        start = time.monotonic()
+        deadlines = {k: start + timeouts.get(k, timeout if timeout is not None else self.timeout) for k in calls}
+        futures = {}
+        for k, c in calls.items():
+            # A call the limiter can't admit before its deadline is never sent and takes its default
+            if self.limiter.acquire(timeout=deadlines[k] - time.monotonic()):
+                futures[k] = self.executor.submit(c[0], *c[1:])
+        out = {}
+        for k in calls:
+            try:
+                out[k] = futures[k].result(timeout=max(deadlines[k] - time.monotonic(), 0))
+            except Exception:
+                d = defaults.get(k)
+                out[k] = d() if callable(d) else d
+        return out
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
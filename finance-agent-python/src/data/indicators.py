@@ -0,0 +1,216 @@
+import math
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+from src.data.aggregator import sma, rsi, macd
+
+def _ms(df: pd.DataFrame) -> np.ndarray:
+    return df["timestamp"].to_numpy().astype("datetime64[ms]").astype(np.int64)
+
+def _rsi_value(up: float, down: float) -> float:
+    if up is None or not down:
+        return float("nan")
+    return 100 - (100 / (1 + up / down))
+
+class IndicatorState:
+    def __init__(self, window: int = 200, sma_n: int = 20, rsi_n: int = 14):
+        self.window = window
+        self.sma_n = sma_n
+        self.a_rsi = 1.0 / rsi_n
+        self.a12 = 2.0 / 13
+        self.a26 = 2.0 / 27
+        self.last_ts = None
+        self.count = 0
+        # Committed (closed) bars inside the window; the forming bar takes the last slot
+        self.closes = deque()
+        self.highs = deque()
+        self.lows = deque()
+        self.sum_sma = 0.0
+        self.ref = None
+        self.s1 = 0.0
+        self.s2 = 0.0
+        self.ema12 = None
+        self.ema26 = None
+        self.up = None
+        self.down = None
+        self.prev_close = None
+        self.series = {k: deque(maxlen=window - 1) for k in ("sma20", "rsi", "macd")}
+        self.last_current = None
+
+    def _resum(self):
+        self.ref = self.closes[0] if self.closes else self.ref
+        self.s1 = sum(c - self.ref for c in self.closes)
+        self.s2 = sum((c - self.ref) ** 2 for c in self.closes)
+
+    def commit(self, ts: int, high: float, low: float, close: float):
+        keep = self.window - 1
+        if self.ref is None:
+            self.ref = close
+        if self.prev_close is not None:
+            d = close - self.prev_close
+            up, down = max(d, 0.0), max(-d, 0.0)
+            if self.up is None:
+                self.up, self.down = up, down
+            else:
+                self.up += self.a_rsi * (up - self.up)
+                self.down += self.a_rsi * (down - self.down)
+        self.ema12 = close if self.ema12 is None else self.ema12 + self.a12 * (close - self.ema12)
+        self.ema26 = close if self.ema26 is None else self.ema26 + self.a26 * (close - self.ema26)
+        sma_val = (self.sum_sma + close) / min(self.sma_n, self.count + 1)
+        if len(self.closes) == keep:
+            old = self.closes.popleft()
+            self.s1 -= old - self.ref
+            self.s2 -= (old - self.ref) ** 2
+        self.closes.append(close)
+        self.s1 += close - self.ref
+        self.s2 += (close - self.ref) ** 2
+        # sum_sma holds the last sma_n - 1 committed closes
+        self.sum_sma += close
+        if len(self.closes) >= self.sma_n:
+            self.sum_sma -= self.closes[-self.sma_n]
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((self.count, high))
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((self.count, low))
+        oldest = self.count - keep + 1
+        while self.highs[0][0] < oldest:
+            self.highs.popleft()
+        while self.lows[0][0] < oldest:
+            self.lows.popleft()
+        self.count += 1
+        self.prev_close = close
+        self.last_ts = ts
+        if self.count % self.window == 0:
+            # Periodically re-sum to stop floating point drift
+            self._resum()
+        self.series["sma20"].append(sma_val)
+        self.series["rsi"].append(_rsi_value(self.up, self.down))
+        self.series["macd"].append(self.ema12 - self.ema26)
+
+    def initialise(self, ts: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        self.__init__(self.window, self.sma_n, int(round(1 / self.a_rsi)))
+        n = len(close)
+        if not n:
+            return
+        keep = self.window - 1
+        s = pd.Series(close, dtype="float64")
+        delta = s.diff()
+        com = int(round(1 / self.a_rsi)) - 1
+        self.ema12 = float(s.ewm(span=12, adjust=False).mean().iloc[-1])
+        self.ema26 = float(s.ewm(span=26, adjust=False).mean().iloc[-1])
+        if n > 1:
+            self.up = float(delta.clip(lower=0).ewm(com=com, adjust=False).mean().iloc[-1])
+            self.down = float((-1 * delta.clip(upper=0)).ewm(com=com, adjust=False).mean().iloc[-1])
+        self.count = n
+        self.prev_close = float(close[-1])
+        self.last_ts = int(ts[-1])
+        self.closes = deque(float(c) for c in close[-keep:])
+        self._resum()
+        self.sum_sma = float(np.sum(close[-(self.sma_n - 1):])) if self.sma_n > 1 else 0.0
+        start = max(n - keep, 0)
+        for i in range(start, n):
+            while self.highs and self.highs[-1][1] <= high[i]:
+                self.highs.pop()
+            self.highs.append((i, float(high[i])))
+            while self.lows and self.lows[-1][1] >= low[i]:
+                self.lows.pop()
+            self.lows.append((i, float(low[i])))
+        self.series["sma20"].extend(sma(s, self.sma_n).iloc[-keep:].tolist())
+        self.series["rsi"].extend(rsi(s, com + 1).iloc[-keep:].tolist())
+        self.series["macd"].extend(macd(s).iloc[-keep:].tolist())
+
+    def current(self, high: float, low: float, close: float) -> dict:
+        n = len(self.closes) + 1
+        ema12 = close if self.ema12 is None else self.ema12 + self.a12 * (close - self.ema12)
+        ema26 = close if self.ema26 is None else self.ema26 + self.a26 * (close - self.ema26)
+        m = ema12 - ema26
+        r = float("nan")
+        if self.prev_close is not None:
+            d = close - self.prev_close
+            up, down = max(d, 0.0), max(-d, 0.0)
+            if self.up is not None:
+                up = self.up + self.a_rsi * (up - self.up)
+                down = self.down + self.a_rsi * (down - self.down)
+            r = _rsi_value(up, down)
+        s20 = (self.sum_sma + close) / min(self.sma_n, self.count + 1)
+        vol = float("nan")
+        if n > 1:
+            ref = self.ref if self.ref is not None else close
+            s1 = self.s1 + (close - ref)
+            s2 = self.s2 + (close - ref) ** 2
+            vol = math.sqrt(max((s2 - s1 * s1 / n) / (n - 1), 0.0))
+        hi = max(self.highs[0][1], high) if self.highs else high
+        lo = min(self.lows[0][1], low) if self.lows else low
+        cur = {
+            "price": float(close),
+            "sma20": float(s20),
+            "rsi": float(r) if np.isfinite(r) else 50.0,
+            "macd": float(m),
+            "trend": "up" if close > s20 else "down",
+            "momentum": "bullish" if m > 0 else "bearish",
+            "volatility": float(vol),
+            "high_200": float(hi),
+            "low_200": float(lo)
+        }
+        self.last_current = (cur, s20, r, m)
+        return cur
+
+class IndicatorEngine:
+    def __init__(self, window: int = 200):
+        self.window = window
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def _state(self, symbol: str, timeframe: str) -> IndicatorState:
+        with self.lock:
+            st = self.states.get((symbol, timeframe))
+            if st is None:
+                st = IndicatorState(self.window)
+                self.states[(symbol, timeframe)] = st
+            return st
+
+    def initialise(self, symbol: str, timeframe: str, df: pd.DataFrame) -> IndicatorState:
+        # Bulk path: every row of a history frame is treated as a closed bar
+        st = self._state(symbol, timeframe)
+        st.initialise(_ms(df), df["high"].to_numpy(dtype=float), df["low"].to_numpy(dtype=float), df["close"].to_numpy(dtype=float))
+        return st
+
+    def update(self, symbol: str, timeframe: str, df: pd.DataFrame):
+        # O(new bars) per call: the last committed bar is found by binary search, and only the rows after it are converted
+        if df is None or df.empty:
+            return None
+        st = self._state(symbol, timeframe)
+        n = len(df)
+        i = None
+        if st.last_ts is not None:
+            i = int(df["timestamp"].searchsorted(pd.Timestamp(st.last_ts, unit="ms"), side="right"))
+            if i == 0 or i >= n or _ms(df.iloc[i - 1:i])[0] != st.last_ts:
+                i = None
+        if i is None:
+            # Unknown, non-contiguous or rewound history: rebuild from the frame's closed bars
+            closed = df.iloc[:-1]
+            st.initialise(_ms(closed), closed["high"].to_numpy(dtype=float), closed["low"].to_numpy(dtype=float), closed["close"].to_numpy(dtype=float))
+            i = n - 1
+        tail = df.iloc[i:]
+        ts = _ms(tail)
+        high = tail["high"].to_numpy(dtype=float)
+        low = tail["low"].to_numpy(dtype=float)
+        close = tail["close"].to_numpy(dtype=float)
+        for j in range(len(ts) - 1):
+            st.commit(int(ts[j]), float(high[j]), float(low[j]), float(close[j]))
+        return st.current(float(high[-1]), float(low[-1]), float(close[-1]))
+
+    def series(self, symbol: str, timeframe: str) -> dict:
+        st = self.states.get((symbol, timeframe))
+        if st is None:
+            return {}
+        out = {k: list(v) for k, v in st.series.items()}
+        if st.last_current is not None:
+            _, s20, r, m = st.last_current
+            out["sma20"].append(s20)
+            out["rsi"].append(r)
+            out["macd"].append(m)
+        return out
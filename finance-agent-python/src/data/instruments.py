@@ -0,0 +1,49 @@
+import math
+from typing import NamedTuple
+
+def _step(value, tick_size_mode: bool) -> float:
+    if value is None:
+        return 0.0
+    if tick_size_mode:
+        return float(value)
+    # DECIMAL_PLACES precision: 3 means a step of 0.001
+    return float(10 ** (-int(value)))
+
+class InstrumentSpec(NamedTuple):
+    symbol: str
+    inst_id: str
+    contract_size: float
+    min_contracts: float
+    lot_step: float
+    tick_size: float
+
+    def round_contracts(self, contracts: float, up: bool = False) -> float:
+        if self.lot_step <= 0:
+            return float(contracts)
+        steps = contracts / self.lot_step
+        steps = math.ceil(steps - 1e-9) if up else math.floor(steps + 1e-9)
+        return round(steps * self.lot_step, 12)
+
+    def round_price(self, price: float) -> float:
+        if self.tick_size <= 0:
+            return float(price)
+        return round(round(price / self.tick_size) * self.tick_size, 12)
+
+    def contracts_for_base(self, base_qty: float) -> float:
+        return base_qty / self.contract_size if self.contract_size > 0 else 0.0
+
+def spec_from_market(market: dict, tick_size_mode: bool = True) -> InstrumentSpec:
+    precision = market.get("precision", {}) or {}
+    limits = market.get("limits", {}) or {}
+    lot_step = _step(precision.get("amount"), tick_size_mode)
+    min_contracts = float(limits.get("amount", {}).get("min") or 0.0)
+    if not min_contracts and lot_step > 0 and (lot_step < 1.0 or not tick_size_mode):
+        min_contracts = lot_step
+    return InstrumentSpec(
+        symbol=market.get("symbol", ""),
+        inst_id=market.get("id", ""),
+        contract_size=float(market.get("contractSize") or 0.0),
+        min_contracts=min_contracts,
+        lot_step=lot_step,
+        tick_size=_step(precision.get("price"), tick_size_mode)
+    )
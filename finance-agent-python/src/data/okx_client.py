@@ -1,43 +1,159 @@
 import ccxt
+import numpy as np
 import pandas as pd
 import os
 import json
+import time
+import threading
+from src.data.candle_cache import CandleCache, empty_frame
+from src.data.candle_store import CandleStore, FIELDS
+from src.data.instruments import InstrumentSpec, spec_from_market
 
 class OKXClient:
-    def __init__(self):
-        api_key = os.getenv("OKX_API_KEY")
-        secret = os.getenv("OKX_SECRET")
-        password = os.getenv("OKX_PASSPHRASE")
-        cfg = {}
-        if api_key and secret and password:
-            cfg = {"apiKey": api_key, "secret": secret, "password": password}
-        self.exchange = ccxt.okx(cfg)
+    def __init__(self, candle_cache_bars: int = 1000, store: CandleStore = None, instrument_ttl: float = 3600, exchange=None):
+        if exchange is not None:
+            # Any ccxt-compatible object, e.g. the offline SimExchange
+            self.exchange = exchange
+        else:
+            api_key = os.getenv("OKX_API_KEY")
+            secret = os.getenv("OKX_SECRET")
+            password = os.getenv("OKX_PASSPHRASE")
+            cfg = {}
+            if api_key and secret and password:
+                cfg = {"apiKey": api_key, "secret": secret, "password": password}
+            self.exchange = ccxt.okx(cfg)
         self.exchange.timeout = 20000
         self.last_price = {}
+        self.price_ts = {}
+        self.stream_max_age = 0
+        self.candles = CandleCache(candle_cache_bars)
+        self.instruments = {}
+        self.instruments_loaded_at = 0.0
+        self.instrument_ttl = instrument_ttl
+        # A failed load is retried in the background after this long instead of on every order
+        self.instrument_retry = 60.0
+        self._instruments_refreshing = False
+        self._instruments_lock = threading.Lock()
+        self.store = store
 
     def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 200) -> pd.DataFrame:
+        ring = self.candles.ring(symbol, timeframe, limit)
         try:
-            data = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-            df = pd.DataFrame(data, columns=["timestamp", "open", "high", "low", "close", "volume"])
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-            return df
+            with ring.lock:
+                if self._stream_fresh(ring.streamed_at) and ring.size >= limit:
+                    return ring.frame(limit)
+                since = ring.last_ts()
+                if since is None and self.store is not None:
+                    # Warm start from disk; the newest stored bar is re-fetched as if still forming
+                    rows = self.store.tail(symbol, timeframe, ring.capacity)
+                    ring.merge_arrays(np.asarray(rows["timestamp"]), np.column_stack([rows[f] for f in FIELDS]))
+                    since = ring.last_ts()
+            # Requests run outside the ring lock so a timed-out caller can still fall back to the cached rows
+            refill = paged = False
+            if since is None:
+                data = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            else:
+                # Only ask for bars from the cached forming bar onwards
+                data = self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+                if not data or int(data[0][0]) > since:
+                    # Cache no longer contiguous with the exchange: refill from scratch
+                    refill = True
+                elif len(data) >= limit and self.store is not None:
+                    # More than a page behind: page forward so the store gets every bar a refill would skip
+                    data, caught_up = self._page_forward(symbol, timeframe, data, limit)
+                    paged = True
+                    if not caught_up:
+                        # The capped backfill still ends in the past; the store keeps those bars but callers need current ones
+                        print(f"{symbol} {timeframe}: backfill stopped at {int(data[-1][0])}; the store has a gap up to the latest page")
+                        refill = True
+                elif len(data) >= limit:
+                    refill = True
+                if refill:
+                    latest = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            with ring.lock:
+                if paged:
+                    # Persist closed bars only; the last one is still forming
+                    arr = np.asarray(data[:-1], dtype=np.float64).reshape(-1, 6)
+                    self.store.append(symbol, timeframe, arr[:, 0].astype(np.int64), arr[:, 1:6])
+                if refill:
+                    ring.clear()
+                    data = latest
+                changed = ring.merge(data)
+                if self.store is not None and changed and (refill or not paged):
+                    ts, values = ring.arrays(changed + 1)
+                    self.store.append(symbol, timeframe, ts[:-1], values[:-1])
+                return ring.frame(limit)
         except Exception:
-            # Return empty frame on failure; caller should handle
-            return pd.DataFrame(columns=["timestamp", "open", "high", "low", "close", "volume"])
+            # Serve the last cached candles on failure; empty frame if nothing cached yet
+            return self.cached_ohlcv(symbol, timeframe, limit)
+
+    def _page_forward(self, symbol: str, timeframe: str, data: list, limit: int, max_pages: int = 50) -> tuple:
+        # Returns the bars and whether they reach the present; a capped run ends on an older bar
+        out = list(data)
+        for _ in range(max_pages):
+            last = int(out[-1][0])
+            page = self.exchange.fetch_ohlcv(symbol, timeframe, since=last, limit=limit)
+            out.extend(b for b in page if int(b[0]) > last)
+            if len(page) < limit or int(out[-1][0]) == last:
+                return out, True
+        return out, False
+
+    def cached_ohlcv(self, symbol: str, timeframe: str, limit: int = 200) -> pd.DataFrame:
+        ring = self.candles.get(symbol, timeframe)
+        if ring is None:
+            return empty_frame()
+        with ring.lock:
+            return ring.frame(limit) if ring.size else empty_frame()
+
+    def history(self, symbol: str, timeframe: str, start: int = None, end: int = None) -> pd.DataFrame:
+        if self.store is None:
+            return empty_frame()
+        return self.store.frame(symbol, timeframe, start, end)
+
+    def _stream_fresh(self, ts: float) -> bool:
+        return bool(self.stream_max_age) and time.time() - ts < self.stream_max_age
+
+    def update_price(self, symbol: str, price: float):
+        self.last_price[symbol] = price
+        self.price_ts[symbol] = time.time()
+
+    def apply_stream_candle(self, symbol: str, timeframe: str, bar: list, closed: bool = False) -> bool:
+        ring = self.candles.get(symbol, timeframe)
+        if ring is None or not ring.size:
+            # The first fill always comes from REST
+            return False
+        with ring.lock:
+            last = ring.last_ts()
+            if bar[0] > last + self.exchange.parse_timeframe(timeframe) * 1000:
+                # Missed bars: let the next REST fetch refill
+                ring.streamed_at = 0.0
+                return False
+            ring.merge([bar])
+            ring.streamed_at = time.time()
+            if closed and self.store is not None:
+                self.store.append(symbol, timeframe, [int(bar[0])], [bar[1:6]])
+        return True
 
     def fetch_price(self, symbol: str) -> float:
+        if self._stream_fresh(self.price_ts.get(symbol, 0.0)):
+            return float(self.last_price[symbol])
         try:
             t = self.exchange.fetch_ticker(symbol)
             price = float(t.get("last", t.get("close", 0.0)) or 0.0)
             if price > 0:
-                self.last_price[symbol] = price
+                self.update_price(symbol, price)
             return price if price > 0 else float(self.last_price.get(symbol, 0.0))
         except Exception:
             return float(self.last_price.get(symbol, 0.0))
 
-    def get_account_state(self, symbol: str, price: float) -> dict:
+    def fetch_balance(self):
+        try:
+            return self.exchange.fetch_balance()
+        except Exception:
+            return None
+
+    def account_state_from_balance(self, bal, symbol: str, price: float) -> dict:
         try:
-            bal = self.exchange.fetch_balance()
             cash = float(bal.get("free", {}).get("USDT", bal.get("total", {}).get("USDT", 0.0)) or 0.0)
             base = symbol.split("/")[0]
             qty = float(bal.get("total", {}).get(base, 0.0) or 0.0)
@@ -47,6 +163,9 @@ class OKXClient:
             # Fallback to zero if not authenticated or failed
             return {"cash": 0.0, "qty": 0.0, "equity": 0.0}
 
+    def get_account_state(self, symbol: str, price: float) -> dict:
+        return self.account_state_from_balance(self.fetch_balance(), symbol, price)
+
     def place_spot_market_buy(self, symbol: str, amount_usd: float, price: float) -> (bool, str):
         if amount_usd <= 0 or price <= 0:
             return False, "invalid_amount_or_price"
@@ -91,40 +210,46 @@ class OKXClient:
         except Exception:
             return 0.0
 
-    def get_perp_min_amount(self, spot_symbol: str) -> float:
+    def refresh_instruments(self) -> dict:
         try:
-            self.exchange.load_markets()
-            m = self.exchange.markets.get(self._perp_symbol(spot_symbol))
-            if not m:
-                return 0.0
-            limits = m.get('limits', {})
-            amt_min = limits.get('amount', {}).get('min')
-            if amt_min:
-                return float(amt_min)
-            prec = m.get('precision', {}).get('amount')
-            if prec is not None:
-                try:
-                    if isinstance(prec, (float,)) and prec < 1.0:
-                        return float(prec)
-                    if isinstance(prec, int) and prec >= 0:
-                        return float(10 ** (-prec))
-                except Exception:
-                    return 0.0
-            return 0.0
-        except Exception:
-            return 0.0
+            return self._load_instruments()
+        finally:
+            with self._instruments_lock:
+                self._instruments_refreshing = False
 
-    def get_perp_min_base_qty(self, spot_symbol: str) -> float:
+    def _load_instruments(self) -> dict:
         try:
-            self.exchange.load_markets()
-            m = self.exchange.markets.get(self._perp_symbol(spot_symbol))
-            if not m:
-                return 0.0
-            contract_size = float(m.get('contractSize') or 1.0)
-            min_contracts = self.get_perp_min_amount(spot_symbol)
-            return float(min_contracts) * contract_size
-        except Exception:
-            return 0.0
+            self.exchange.load_markets(True)
+            tick_mode = self.exchange.precisionMode == ccxt.TICK_SIZE
+            specs = {}
+            for sym, m in self.exchange.markets.items():
+                if m.get("contract"):
+                    specs[sym] = spec_from_market(m, tick_mode)
+            self.instruments = specs
+        except Exception as e:
+            print(f"Instrument refresh failed: {e}")
+        # Stamped on failure too, so the next attempt waits out instrument_retry
+        self.instruments_loaded_at = time.time()
+        return self.instruments
+
+    def instrument_spec(self, spot_symbol: str) -> InstrumentSpec:
+        with self._instruments_lock:
+            if not self.instruments_loaded_at:
+                # First use: nothing to serve yet, so concurrent callers share one load
+                self._load_instruments()
+            elif not self._instruments_refreshing and time.time() - self.instruments_loaded_at > (self.instrument_ttl if self.instruments else self.instrument_retry):
+                # Serve the cached spec and reload in the background; order placement never waits on it
+                self._instruments_refreshing = True
+                threading.Thread(target=self.refresh_instruments, name="instrument-refresh", daemon=True).start()
+        return self.instruments.get(self._perp_symbol(spot_symbol))
+
+    def get_perp_min_amount(self, spot_symbol: str) -> float:
+        spec = self.instrument_spec(spot_symbol)
+        return spec.min_contracts if spec else 0.0
+
+    def get_perp_min_base_qty(self, spot_symbol: str) -> float:
+        spec = self.instrument_spec(spot_symbol)
+        return spec.min_contracts * (spec.contract_size or 1.0) if spec else 0.0
 
     def set_perp_leverage(self, spot_symbol: str, leverage: float):
         try:
@@ -136,21 +261,19 @@ class OKXClient:
         if notional_usd <= 0 or price <= 0:
             return False, "invalid_notional_or_price"
         base_qty = notional_usd / price
-        market = self.exchange.market(self._perp_symbol(spot_symbol))
-        cs = float(market.get('contractSize') or 0.0)
-        if cs <= 0:
+        spec = self.instrument_spec(spot_symbol)
+        if spec is None or spec.contract_size <= 0:
             return False, "contract_size_unknown"
-        contracts = base_qty / cs
-        min_contracts = self.get_perp_min_amount(spot_symbol)
-        if min_contracts and contracts < min_contracts:
-            return False, f"contracts {contracts:.6f} below exchange minimum {min_contracts}"
+        contracts = spec.round_contracts(spec.contracts_for_base(base_qty))
+        if spec.min_contracts and contracts < spec.min_contracts:
+            return False, f"contracts {contracts:.6f} below exchange minimum {spec.min_contracts}"
         try:
             params = {"tdMode": "cross", "reduceOnly": reduce_only}
             if side.lower() == 'buy':
                 params['posSide'] = 'long'
             elif side.lower() == 'sell':
                 params['posSide'] = 'short'
-            order = self.exchange.create_order(self._perp_symbol(spot_symbol), 'market', side, contracts, None, params)
+            order = self.exchange.create_order(spec.symbol, 'market', side, contracts, None, params)
             oid = order.get('id', '')
             return True, oid or json.dumps(order)
         except Exception as e:
@@ -158,17 +281,16 @@ class OKXClient:
 
     def place_perp_market_by_contracts(self, spot_symbol: str, side: str, contracts: float) -> (bool, str, float):
         try:
-            market = self.exchange.market(self._perp_symbol(spot_symbol))
-            cs = float(market.get('contractSize') or 0.0)
-            if cs <= 0:
+            spec = self.instrument_spec(spot_symbol)
+            if spec is None or spec.contract_size <= 0:
                 return False, "contract_size_unknown", 0.0
-            base_qty = float(contracts) * cs
+            base_qty = float(contracts) * spec.contract_size
             params = {"tdMode": "cross", "reduceOnly": False}
             if side.lower() == 'buy':
                 params['posSide'] = 'long'
             elif side.lower() == 'sell':
                 params['posSide'] = 'short'
-            order = self.exchange.create_order(self._perp_symbol(spot_symbol), 'market', side, float(contracts), None, params)
+            order = self.exchange.create_order(spec.symbol, 'market', side, float(contracts), None, params)
             oid = order.get('id', '')
             return True, (oid or json.dumps(order)), base_qty
         except Exception as e:
@@ -188,32 +310,22 @@ class OKXClient:
 
     def place_perp_tp_sl_algo(self, spot_symbol: str, pos_side: str, tp_px: float = None, sl_px: float = None, qty: float = None, close_fraction: float = None):
         try:
-            market = self.exchange.market(self._perp_symbol(spot_symbol))
-            inst_id = market.get('id')
-            payload = {"instId": inst_id, "tdMode": "cross", "posSide": pos_side, "reduceOnly": True, "ordType": "conditional"}
+            spec = self.instrument_spec(spot_symbol)
+            if spec is None:
+                return False, "instrument_unknown"
+            payload = {"instId": spec.inst_id, "tdMode": "cross", "posSide": pos_side, "reduceOnly": True, "ordType": "conditional"}
             payload['side'] = 'sell' if pos_side == 'long' else 'buy'
-            # sz must be in contracts and respect lot size (amount precision)
-            amount_step = None
-            try:
-                amount_step = market.get('precision', {}).get('amount') or market.get('limits', {}).get('amount', {}).get('min')
-            except Exception:
-                amount_step = None
-            cs = float(market.get('contractSize') or 0.0)
             if close_fraction is not None:
                 payload['closeFraction'] = str(close_fraction)
-            elif qty is not None and qty > 0 and cs > 0:
-                contracts = qty / cs
-                if amount_step:
-                    step = float(amount_step)
-                    # round up to nearest step to satisfy lot size
-                    contracts = ( (int(contracts / step + 0.999999)) * step )
-                payload['sz'] = str(contracts)
+            elif qty is not None and qty > 0 and spec.contract_size > 0:
+                # sz must be in contracts and respect lot size; round up to the nearest step
+                payload['sz'] = str(spec.round_contracts(spec.contracts_for_base(qty), up=True))
             else:
                 payload['closeFraction'] = '1'
             if tp_px is not None:
-                payload.update({"tpTriggerPx": tp_px, "tpOrdPx": "-1", "tpTriggerPxType": "last"})
+                payload.update({"tpTriggerPx": spec.round_price(float(tp_px)), "tpOrdPx": "-1", "tpTriggerPxType": "last"})
             if sl_px is not None:
-                payload.update({"slTriggerPx": sl_px, "slOrdPx": "-1", "slTriggerPxType": "last"})
+                payload.update({"slTriggerPx": spec.round_price(float(sl_px)), "slOrdPx": "-1", "slTriggerPxType": "last"})
             # raw endpoint for algo orders
             result = self.exchange.privatePostTradeOrderAlgo(payload)
             return True, result
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import threading
+import aiohttp
+
+PUBLIC_WS = "wss://ws.okx.com:8443/ws/v5/public"
+BUSINESS_WS = "wss://ws.okx.com:8443/ws/v5/business"
+
+def inst_id(symbol: str) -> str:
+    return symbol.replace("/", "-").replace(":USDT", "-SWAP")
+
+def candle_channel(timeframe: str) -> str:
+    # OKX spells hour/day/week bars in upper case: candle15m, candle1H, candle1D
+    unit = timeframe[-1]
+    return "candle" + timeframe[:-1] + (unit.upper() if unit in ("h", "d", "w") else unit)
+
+class OKXStream:
+    def __init__(self, okx_client, symbols: list, timeframes: list, public_url: str = PUBLIC_WS, business_url: str = BUSINESS_WS, max_age: float = 10):
+        self.okx = okx_client
+        self.symbols = list(symbols)
+        self.timeframes = list(timeframes)
+        self.public_url = public_url
+        self.business_url = business_url
+        self.by_inst = {inst_id(s): s for s in self.symbols}
+        self.by_channel = {candle_channel(tf): tf for tf in self.timeframes}
+        self.callbacks = []
+        self.queues = []
+        self.loop = None
+        self.thread = None
+        self._stop = None
+        # REST calls are skipped while streamed data is younger than this
+        self.okx.stream_max_age = max_age
+
+    def on(self, fn):
+        self.callbacks.append(fn)
+        return fn
+
+    def start(self):
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.run()), name="okx-stream", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout: float = 5):
+        if self.loop is not None and self._stop is not None:
+            self.loop.call_soon_threadsafe(self._stop.set)
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    async def events(self):
+        # Async iterator for consumers running on the stream's own loop (i.e. awaiting run() themselves)
+        q = asyncio.Queue(maxsize=1000)
+        self.queues.append(q)
+        try:
+            while True:
+                yield await q.get()
+        finally:
+            self.queues.remove(q)
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        tickers = [{"channel": "tickers", "instId": inst_id(s)} for s in self.symbols]
+        candles = [{"channel": candle_channel(tf), "instId": inst_id(s)} for s in self.symbols for tf in self.timeframes]
+        if self.public_url == self.business_url:
+            subs = [(self.public_url, tickers + candles)]
+        else:
+            subs = [(self.public_url, tickers), (self.business_url, candles)]
+        async with aiohttp.ClientSession() as session:
+            tasks = [asyncio.create_task(self._socket(session, url, args)) for url, args in subs if args]
+            await self._stop.wait()
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _socket(self, session, url: str, args: list):
+        backoff = 1
+        while True:
+            try:
+                async with session.ws_connect(url) as ws:
+                    await ws.send_json({"op": "subscribe", "args": args})
+                    backoff = 1
+                    while True:
+                        try:
+                            msg = await ws.receive(timeout=25)
+                        except asyncio.TimeoutError:
+                            # OKX drops idle connections after 30s
+                            await ws.send_str("ping")
+                            continue
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            if msg.data != "pong":
+                                self._handle(json.loads(msg.data))
+                        elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.ERROR):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Stream error on {url}: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _handle(self, msg: dict):
+        data = msg.get("data")
+        arg = msg.get("arg") or {}
+        symbol = self.by_inst.get(arg.get("instId"))
+        if not data or symbol is None:
+            return
+        channel = arg.get("channel", "")
+        if channel == "tickers":
+            for d in data:
+                price = float(d.get("last") or 0.0)
+                if price > 0:
+                    self.okx.update_price(symbol, price)
+                    self._emit({"type": "ticker", "symbol": symbol, "price": price, "ts": int(d.get("ts") or 0)})
+        elif channel in self.by_channel:
+            tf = self.by_channel[channel]
+            for row in data:
+                bar = [float(x) for x in row[:6]]
+                closed = len(row) > 8 and str(row[8]) == "1"
+                self.okx.apply_stream_candle(symbol, tf, bar, closed)
+                self._emit({"type": "candle", "symbol": symbol, "timeframe": tf, "bar": bar, "closed": closed})
+
+    def _emit(self, event: dict):
+        for fn in self.callbacks:
+            try:
+                fn(event)
+            except Exception:
+                pass
+        for q in self.queues:
+            try:
+                q.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
@@ -1,8 +1,11 @@
 import time
 import os
 import sys
-import json
+import socket
 import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Add project root/finance-agent-python to path to allow imports from src
@@ -12,164 +15,164 @@ agent_root = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(curren
 sys.path.insert(0, agent_root)
 
 from supabase import create_client, Client
-from src.execution.okx_live import OKXLiveAdapter
-# Import the detailed client for perp orders if needed, or extend OKXLiveAdapter
 from src.data.okx_client import OKXClient
+from src.sim.exchange import sim_from_env
+from src.execution.order_queue import SupabaseOrderStore, listen_postgres, listen_realtime
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Load env
-load_dotenv()
+def execute_order(okx, order: dict) -> (bool, str):
+    symbol = order['symbol']
+    side = order['side'].lower()
+    qty = float(order['quantity'])
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    # Note: This logic assumes Spot Market Buy/Sell for simplicity.
+    # Enhance this to handle Perps if needed based on symbol format.
+    # The dashboard sends 'quantity' as a USD amount for both sides.
+    current_price = okx.fetch_price(symbol)
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    logger.error("Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY")
-    exit(1)
+    if side == 'buy':
+        success, oid = okx.place_spot_market_buy(symbol, qty, current_price)
+    elif side == 'sell':
+        # place_spot_market_sell takes amount_usd and caps it at the quantity held
+        bal = okx.get_account_state(symbol, current_price)
+        success, oid = okx.place_spot_market_sell(symbol, qty, current_price, bal['qty'])
+    else:
+        return False, f"unknown side {side}"
+    return (True, f"Filled: {oid}") if success else (False, oid)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+class LocalExecutor:
+    def __init__(self, store, okx, supabase: Client = None, owner_user_id: str = None, worker_id: str = None,
+                 batch_size: int = 10, workers: int = 4, poll_seconds: float = 30, balance_seconds: float = 15):
+        self.store = store
+        self.okx = okx
+        self.supabase = supabase
+        self.owner_user_id = owner_user_id
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.idle_poll_seconds = poll_seconds
+        self.balance_seconds = balance_seconds
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="execute")
+        # Set by LISTEN/NOTIFY, Realtime or an in-memory store; polling only covers notifications that never arrive
+        self.wake = threading.Event()
+        self.last_balance_update = 0
 
-# Initialize OKX Client
-# We use the detailed OKXClient from data/okx_client.py as it has more features
-okx = OKXClient()
+    def fallback_to_polling(self, interval: float = 2):
+        if self.poll_seconds > interval:
+            logger.warning(f"Order notifications unavailable; polling every {interval:.0f}s")
+            self.poll_seconds = interval
 
-OWNER_USER_ID = os.getenv("OWNER_USER_ID")
+    def restore_polling(self):
+        # Called when notifications (re)connect; polling goes back to being a slow safety net
+        if self.poll_seconds != self.idle_poll_seconds:
+            logger.info(f"Order notifications connected; polling every {self.idle_poll_seconds:.0f}s")
+            self.poll_seconds = self.idle_poll_seconds
 
-def fetch_and_update_balance():
-    if not OWNER_USER_ID:
-        return
-        
-    try:
-        # Use get_account_state to find total equity (USDT)
-        # Note: get_account_state takes a symbol and price, but we just want general balance.
-        # Let's inspect OKXClient.get_account_state or fetch_balance
-        
-        # OKXClient.exchange is a ccxt instance
-        bal = okx.exchange.fetch_balance()
-        # Usually total equity is in info or total['USDT'] if base currency
-        # For unified account, details are in 'info' -> 'data' -> [0] -> 'totalEq'
-        
-        total_eq = 0.0
-        if 'info' in bal and 'data' in bal['info'] and len(bal['info']['data']) > 0:
-             total_eq = float(bal['info']['data'][0].get('totalEq', 0.0))
-        else:
-             # Fallback to USDT total if not unified
-             total_eq = float(bal.get('total', {}).get('USDT', 0.0))
-        
-        # Update Supabase
-        supabase.table('account_balances').upsert({
-            'user_id': OWNER_USER_ID,
-            'total_equity': total_eq,
-            'updated_at': 'now()'
-        }).execute()
-        
-        logger.info(f"Updated account balance: ${total_eq:.2f}")
-        
-    except Exception as e:
-        logger.error(f"Failed to fetch balance: {e}")
-
-def process_orders():
-    logger.info("Starting Local Execution Agent...")
-    if not OWNER_USER_ID:
-        logger.warning("OWNER_USER_ID not set in .env. Balance updates will be skipped.")
-    
-    logger.info("Polling for orders with status 'PENDING_EXECUTION'...")
-    
-    last_balance_update = 0
-    
-    while True:
+    def fetch_and_update_balance(self):
+        if not self.owner_user_id or self.supabase is None:
+            return
         try:
-            # Update balance every 15 seconds
-            now = time.time()
-            if now - last_balance_update > 15:
-                fetch_and_update_balance()
-                last_balance_update = now
-
-            # Fetch pending orders
-            # Fetch pending orders
-            response = supabase.table('orders')\
-                .select("*")\
-                .eq('status', 'PENDING_EXECUTION')\
-                .execute()
-            
-            orders = response.data
-            
-            if not orders:
-                time.sleep(2)
-                continue
-                
-            for order in orders:
-                logger.info(f"Processing Order {order['id']}: {order['side']} {order['symbol']} {order['quantity']}")
-                
-                symbol = order['symbol']
-                side = order['side'].lower()
-                qty = float(order['quantity'])
-                
-                # Execute on OKX
-                # Note: This logic assumes Spot Market Buy/Sell for simplicity. 
-                # Enhance this to handle Perps if needed based on symbol format.
-                
-                result_ok = False
-                msg = ""
-                
-                # Check if it's a perp symbol or spot
-                is_perp = "SWAP" in symbol or "-USDT" in symbol # simplistic check, adjust as needed
-                
-                # For this agent, we'll try to use the generic placement methods
-                # Note: okx_client.py methods take 'amount_usd' for spot buy usually.
-                # We need to clarify if 'quantity' in DB is USD amount or Token amount.
-                # Usually Dashboard sends USD amount for buys.
-                
-                current_price = okx.fetch_price(symbol)
-                
-                if side == 'buy':
-                    # Assuming quantity is in USDT for buys
-                    success, oid = okx.place_spot_market_buy(symbol, qty, current_price)
-                    if success:
-                        result_ok = True
-                        msg = f"Filled: {oid}"
-                    else:
-                        msg = oid
-                elif side == 'sell':
-                    # For sell, we usually need token amount.
-                    # Check balance first?
-                    # Let's assume qty is token amount for sell
-                    # Or is it USD value? The dashboard usually deals in USD value for simplicity.
-                    # Let's try to sell by USD value logic in okx_client
-                    
-                    # We need available base qty
-                    # This is complex. Let's simplify: 
-                    # If the user wants to sell $100 worth of BTC.
-                    # place_spot_market_sell takes amount_usd
-                    
-                    # Need to check if user holds enough? okx_client handles it.
-                    # We need 'qty_available' for the method signature
-                    bal = okx.get_account_state(symbol, current_price)
-                    qty_avail = bal['qty']
-                    
-                    success, oid = okx.place_spot_market_sell(symbol, qty, current_price, qty_avail)
-                    if success:
-                        result_ok = True
-                        msg = f"Filled: {oid}"
-                    else:
-                        msg = oid
-                
-                # Update Supabase
-                new_status = 'EXECUTED' if result_ok else 'FAILED'
-                supabase.table('orders').update({
-                    'status': new_status,
-                    # We could store the error message in a metadata field if it existed
-                    'updated_at': 'now()'
-                }).eq('id', order['id']).execute()
-                
-                logger.info(f"Order {order['id']} {new_status}: {msg}")
-                
+            # OKXClient.exchange is a ccxt instance
+            bal = self.okx.exchange.fetch_balance()
+            # For unified account, details are in 'info' -> 'data' -> [0] -> 'totalEq'
+            total_eq = 0.0
+            if 'info' in bal and 'data' in bal['info'] and len(bal['info']['data']) > 0:
+                total_eq = float(bal['info']['data'][0].get('totalEq', 0.0))
+            else:
+                # Fallback to USDT total if not unified
+                total_eq = float(bal.get('total', {}).get('USDT', 0.0))
+            self.supabase.table('account_balances').upsert({
+                'user_id': self.owner_user_id,
+                'total_equity': total_eq,
+                'updated_at': 'now()'
+            }).execute()
+            logger.info(f"Updated account balance: ${total_eq:.2f}")
         except Exception as e:
-            logger.error(f"Error in poll loop: {e}")
-            time.sleep(5)
+            logger.error(f"Failed to fetch balance: {e}")
+
+    def _execute_symbol(self, orders: list):
+        # Orders for one symbol run in creation order; different symbols run in parallel
+        for order in orders:
+            logger.info(f"Processing Order {order['id']}: {order['side']} {order['symbol']} {order['quantity']}")
+            try:
+                result_ok, msg = execute_order(self.okx, order)
+            except Exception as e:
+                result_ok, msg = False, str(e)
+            new_status = 'EXECUTED' if result_ok else 'FAILED'
+            try:
+                if not self.store.complete(order['id'], self.worker_id, new_status, None if result_ok else msg[:500]):
+                    logger.warning(f"Order {order['id']} is no longer claimed by {self.worker_id}; outcome not recorded")
+            except Exception as e:
+                logger.error(f"Failed to record order {order['id']}: {e}")
+            logger.info(f"Order {order['id']} {new_status}: {msg}")
+
+    def run_once(self) -> int:
+        orders = self.store.claim(self.worker_id, self.batch_size)
+        by_symbol = defaultdict(list)
+        for order in orders:
+            by_symbol[order['symbol']].append(order)
+        for fut in [self.pool.submit(self._execute_symbol, batch) for batch in by_symbol.values()]:
+            fut.result()
+        return len(orders)
+
+    def process_orders(self, stop: threading.Event = None):
+        logger.info(f"Starting Local Execution Agent {self.worker_id}...")
+        if not self.owner_user_id:
+            logger.warning("OWNER_USER_ID not set in .env. Balance updates will be skipped.")
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                now = time.time()
+                if now - self.last_balance_update > self.balance_seconds:
+                    self.fetch_and_update_balance()
+                    self.last_balance_update = now
+                # Cleared before claiming, so a notification that lands mid-batch triggers another pass
+                self.wake.clear()
+                if self.run_once() >= self.batch_size:
+                    continue
+                until_balance = self.last_balance_update + self.balance_seconds - time.time() if self.owner_user_id else self.poll_seconds
+                self.wake.wait(timeout=max(min(self.poll_seconds, until_balance), 0.05))
+            except Exception as e:
+                logger.error(f"Error in poll loop: {e}")
+                stop.wait(5)
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not supabase_url or not supabase_key:
+        logger.error("Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY")
+        sys.exit(1)
+    supabase: Client = create_client(supabase_url, supabase_key)
+
+    # We use the detailed OKXClient from data/okx_client.py as it has more features
+    # SIM_EXCHANGE=1 executes against the offline SimExchange instead of OKX
+    okx = OKXClient(exchange=sim_from_env())
+
+    # ORDER_WAKE: realtime (Supabase Realtime), listen (Postgres LISTEN via DATABASE_URL) or poll
+    wake_mode = os.getenv("ORDER_WAKE", "realtime").lower()
+    executor = LocalExecutor(
+        SupabaseOrderStore(supabase, stale_seconds=int(os.getenv("EXECUTOR_STALE_SECONDS", "300"))),
+        okx,
+        supabase=supabase,
+        owner_user_id=os.getenv("OWNER_USER_ID"),
+        worker_id=os.getenv("EXECUTOR_ID"),
+        batch_size=int(os.getenv("EXECUTOR_BATCH", "10")),
+        workers=int(os.getenv("EXECUTOR_WORKERS", "4")),
+        poll_seconds=float(os.getenv("EXECUTOR_POLL_SECONDS", "2" if wake_mode == "poll" else "30"))
+    )
+    try:
+        if wake_mode == "listen":
+            listen_postgres(os.environ["DATABASE_URL"], executor.wake, on_error=executor.fallback_to_polling, on_ready=executor.restore_polling)
+        elif wake_mode == "realtime":
+            listen_realtime(supabase_url, supabase_key, executor.wake, on_error=executor.fallback_to_polling, on_ready=executor.restore_polling)
+    except Exception as e:
+        logger.warning(f"Cannot start {wake_mode} notifications: {e}")
+        executor.fallback_to_polling()
+    executor.process_orders()
 
 if __name__ == "__main__":
-    process_orders()
+    main()
@@ -0,0 +1,163 @@
+import asyncio
+import copy
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+PENDING = "PENDING_EXECUTION"
+IN_FLIGHT = "IN_FLIGHT"
+# An expired claim may already have filled on the exchange, so it is parked for review instead of being sent again
+STALE = "STALE"
+NOTIFY_CHANNEL = "orders_pending"
+
+logger = logging.getLogger(__name__)
+
+class SupabaseOrderStore:
+    # Claims go through the claim_orders() SQL function (FOR UPDATE SKIP LOCKED), so concurrent executors never share a row
+    def __init__(self, client, stale_seconds: int = 300):
+        self.client = client
+        self.stale_seconds = stale_seconds
+
+    def claim(self, worker: str, limit: int) -> list:
+        res = self.client.rpc("claim_orders", {"p_worker": worker, "p_limit": limit, "p_stale_seconds": self.stale_seconds}).execute()
+        return res.data or []
+
+    def complete(self, order_id, worker: str, status: str, error: str = None) -> bool:
+        # Fenced on the claim; the owner of a claim that went stale still knows the real outcome, so it may settle it
+        res = self.client.table("orders").update({"status": status, "error": error, "updated_at": "now()"})\
+            .eq("id", order_id).in_("status", [IN_FLIGHT, STALE]).eq("claimed_by", worker).execute()
+        return bool(res.data)
+
+class MemoryOrderStore:
+    # In-process stand-in for the orders table with the same claim/complete semantics as the SQL migration
+    def __init__(self, wake: threading.Event = None, stale_seconds: int = 300):
+        self.rows = {}
+        self.lock = threading.Lock()
+        self.wake = wake
+        self.stale_seconds = stale_seconds
+
+    def insert(self, order: dict) -> str:
+        row = dict(order)
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("status", PENDING)
+        row.setdefault("created_at", datetime.now(timezone.utc))
+        with self.lock:
+            self.rows[row["id"]] = row
+        if self.wake is not None and row["status"] == PENDING:
+            # What the pg_notify trigger does for the real table
+            self.wake.set()
+        return row["id"]
+
+    def claim(self, worker: str, limit: int) -> list:
+        now = datetime.now(timezone.utc)
+        stale = now - timedelta(seconds=self.stale_seconds)
+        with self.lock:
+            for r in self.rows.values():
+                if r["status"] == IN_FLIGHT and r["claimed_at"] < stale:
+                    r.update(status=STALE, error=f"claim by {r['claimed_by']} expired; check the exchange before resubmitting", updated_at=now)
+            ready = [r for r in self.rows.values() if r["status"] == PENDING]
+            ready.sort(key=lambda r: r["created_at"])
+            claimed = []
+            for r in ready[:limit]:
+                r.update(status=IN_FLIGHT, claimed_by=worker, claimed_at=now, updated_at=now)
+                claimed.append(copy.deepcopy(r))
+            return claimed
+
+    def complete(self, order_id, worker: str, status: str, error: str = None) -> bool:
+        with self.lock:
+            r = self.rows.get(order_id)
+            if r is None or r["status"] not in (IN_FLIGHT, STALE) or r.get("claimed_by") != worker:
+                return False
+            r.update(status=status, error=error, updated_at=datetime.now(timezone.utc))
+            return True
+
+    def get(self, order_id) -> dict:
+        with self.lock:
+            r = self.rows.get(order_id)
+            return copy.deepcopy(r) if r is not None else None
+
+def listen_postgres(dsn: str, wake: threading.Event, channel: str = NOTIFY_CHANNEL, on_error=None, on_ready=None) -> threading.Thread:
+    # LISTEN on a direct Postgres connection (needs psycopg); reconnects with backoff and wakes once per reconnect
+    import psycopg
+
+    def run():
+        backoff = 1.0
+        while True:
+            try:
+                with psycopg.connect(dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {channel}")
+                    backoff = 1.0
+                    if on_ready is not None:
+                        on_ready()
+                    # Anything inserted while disconnected is picked up by the claim this triggers
+                    wake.set()
+                    for _ in conn.notifies():
+                        wake.set()
+            except Exception as e:
+                logger.warning(f"LISTEN {channel} dropped: {e}; retrying in {backoff:.0f}s")
+                if on_error is not None:
+                    on_error()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    t = threading.Thread(target=run, name="orders-listen", daemon=True)
+    t.start()
+    return t
+
+def listen_realtime(url: str, key: str, wake: threading.Event, on_error=None, on_ready=None, check_seconds: float = 5) -> threading.Thread:
+    # Supabase Realtime postgres_changes on pending orders; the sync client has no realtime support, so run the async one.
+    # Reconnects with backoff like listen_postgres; a channel error, timeout or close counts as a drop.
+    from realtime import AsyncRealtimeClient
+
+    async def subscribe():
+        client = AsyncRealtimeClient(f"{url.rstrip('/')}/realtime/v1", key)
+        lost = asyncio.Event()
+
+        def on_status(status, err=None):
+            if status == "SUBSCRIBED":
+                if on_ready is not None:
+                    on_ready()
+                # Anything inserted while disconnected is picked up by the claim this triggers
+                wake.set()
+            elif status in ("CHANNEL_ERROR", "TIMED_OUT", "CLOSED"):
+                lost.set()
+
+        try:
+            await client.connect()
+            channel = client.channel("orders-pending")
+            channel.on_postgres_changes("*", lambda payload: wake.set(), table="orders", schema="public", filter=f"status=eq.{PENDING}")
+            await channel.subscribe(on_status)
+            # The socket can also die without a channel status, so check it between waits
+            while not lost.is_set() and client.is_connected:
+                try:
+                    await asyncio.wait_for(lost.wait(), check_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            raise ConnectionError("realtime channel closed")
+        finally:
+            try:
+                await client.close()
+            except Exception:
+                pass
+
+    def run():
+        backoff = 1.0
+        while True:
+            started = time.monotonic()
+            try:
+                asyncio.run(subscribe())
+            except Exception as e:
+                # A connection that stayed up for a while starts the backoff over
+                if time.monotonic() - started > 60:
+                    backoff = 1.0
+                logger.warning(f"Realtime subscription dropped: {e}; retrying in {backoff:.0f}s")
+                if on_error is not None:
+                    on_error()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    t = threading.Thread(target=run, name="orders-realtime", daemon=True)
+    t.start()
+    return t
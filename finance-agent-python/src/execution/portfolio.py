@@ -0,0 +1,145 @@
+import numpy as np
+
+class Portfolio:
+    # N simulated accounts x M instruments held as arrays; every account shares one cross-margin cash balance
+    def __init__(self, n_accounts: int = 1, symbols: list = None, initial_balance=10000.0, fee: float = 0.0005, maintenance_margin: float = 0.005, base_currency: str = "USDT"):
+        self.base = base_currency
+        self.fee = fee
+        self.maintenance_margin = maintenance_margin
+        self.symbols = []
+        self.cols = {}
+        n = int(n_accounts)
+        self.cash = np.broadcast_to(np.asarray(initial_balance, dtype=np.float64), (n,)).copy()
+        # spot: unlevered holdings; qty: signed perp size (short < 0) with its average entry and leverage
+        self.spot = np.zeros((n, 0))
+        self.qty = np.zeros((n, 0))
+        self.entry = np.zeros((n, 0))
+        self.leverage = np.ones((n, 0))
+        self.mark_px = np.zeros(0)
+        self.liquidations = np.zeros(n, dtype=np.int64)
+        for s in symbols or []:
+            self.col(s)
+
+    @property
+    def n_accounts(self) -> int:
+        return len(self.cash)
+
+    def col(self, symbol: str) -> int:
+        # Instruments can be added on the fly; existing accounts start flat in them
+        j = self.cols.get(symbol)
+        if j is None:
+            j = len(self.symbols)
+            self.cols[symbol] = j
+            self.symbols.append(symbol)
+            pad = lambda a, v: np.hstack([a, np.full((len(a), 1), v)])
+            self.spot = pad(self.spot, 0.0)
+            self.qty = pad(self.qty, 0.0)
+            self.entry = pad(self.entry, 0.0)
+            self.leverage = pad(self.leverage, 1.0)
+            self.mark_px = np.append(self.mark_px, 0.0)
+        return j
+
+    def prices(self, prices) -> np.ndarray:
+        # Accepts a {symbol: price} dict or an array in column order; unknown symbols keep their last mark
+        if isinstance(prices, dict):
+            px = self.mark_px.copy()
+            for s, p in prices.items():
+                if s in self.cols:
+                    px[self.cols[s]] = float(p)
+            return px
+        return np.asarray(prices, dtype=np.float64)
+
+    def unrealized(self, prices=None) -> np.ndarray:
+        px = self.mark_px if prices is None else self.prices(prices)
+        return self.qty * (px - self.entry)
+
+    def used_margin(self) -> np.ndarray:
+        return (np.abs(self.qty) * self.entry / self.leverage).sum(axis=1)
+
+    def maintenance(self, prices=None) -> np.ndarray:
+        px = self.mark_px if prices is None else self.prices(prices)
+        return self.maintenance_margin * (np.abs(self.qty) * px).sum(axis=1)
+
+    def equity(self, prices=None) -> np.ndarray:
+        px = self.mark_px if prices is None else self.prices(prices)
+        return self.cash + (self.spot * px).sum(axis=1) + self.unrealized(px).sum(axis=1)
+
+    def available(self, prices=None) -> np.ndarray:
+        return self.equity(prices) - self.used_margin()
+
+    def liquidation_price(self, prices=None) -> np.ndarray:
+        # Cross margin: the price of one instrument at which the whole account hits maintenance, others held at mark
+        px = self.mark_px if prices is None else self.prices(prices)
+        buffer = (self.equity(px) - self.maintenance(px))[:, None]
+        slope = self.qty - self.maintenance_margin * np.abs(self.qty)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            liq = px - buffer / slope
+        return np.where(self.qty != 0, np.maximum(liq, 0.0), np.nan)
+
+    def fill_spot(self, delta, prices) -> np.ndarray:
+        # delta (N, M) base quantity: > 0 buys with cash, < 0 sells holdings; returns the accepted row mask
+        delta = np.asarray(delta, dtype=np.float64)
+        px = self.prices(prices)
+        delta = np.maximum(delta, -self.spot)
+        cost = (delta * px).sum(axis=1) + self.fee * (np.abs(delta) * px).sum(axis=1)
+        ok = cost <= self.cash + 1e-9
+        delta = np.where(ok[:, None], delta, 0.0)
+        self.spot += delta
+        self.spot[np.abs(self.spot) <= 1e-8] = 0.0
+        self.cash -= np.where(ok, cost, 0.0)
+        return ok
+
+    def fill_perp(self, delta, prices, leverage=None) -> np.ndarray:
+        # delta (N, M) signed contracts in base units; handles open, add, reduce and flip in one pass
+        delta = np.asarray(delta, dtype=np.float64)
+        px = self.prices(prices)
+        lev = self.leverage if leverage is None else np.broadcast_to(np.asarray(leverage, dtype=np.float64), self.qty.shape)
+        old = self.qty
+        new = old + delta
+        closing = np.where(np.sign(delta) == -np.sign(old), np.minimum(np.abs(delta), np.abs(old)), 0.0)
+        realized = closing * np.sign(old) * (px - self.entry)
+        fees = self.fee * np.abs(delta) * px
+        # Same direction averages the entry; a flip restarts at the fill price; a pure reduce keeps it
+        grown = np.sign(new) == np.sign(old)
+        added = np.where(grown & (np.abs(new) > np.abs(old)), np.abs(delta), 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg = np.where(added > 0, (np.abs(old) * self.entry + added * px) / np.abs(new), self.entry)
+        entry = np.where(new == 0, 0.0, np.where((old == 0) | ~grown, px, avg))
+        new_lev = np.where(np.abs(new) > np.abs(old) * grown, lev, self.leverage)
+        cash = self.cash + realized.sum(axis=1) - fees.sum(axis=1)
+        # Initial margin check on the post-fill book; a rejected account keeps its whole row untouched
+        margin = (np.abs(new) * entry / new_lev).sum(axis=1)
+        upnl = (new * (px - entry)).sum(axis=1)
+        ok = (cash + (self.spot * px).sum(axis=1) + upnl - margin >= -1e-9) | (np.abs(new) <= np.abs(old)).all(axis=1)
+        keep = ok[:, None]
+        self.qty = np.where(keep, new, old)
+        self.entry = np.where(keep, entry, self.entry)
+        self.leverage = np.where(keep, new_lev, self.leverage)
+        self.cash = np.where(ok, cash, self.cash)
+        return ok
+
+    def step(self, prices, low=None, high=None) -> np.ndarray:
+        # One bar: mark every account to market and liquidate those under maintenance; returns the liquidated mask
+        px = self.prices(prices)
+        self.mark_px = px
+        # Maintenance is judged at each position's worst price within the bar: the low for longs, the high for shorts
+        lo = px if low is None else self.prices(low)
+        hi = px if high is None else self.prices(high)
+        worst = np.where(self.qty > 0, lo, np.where(self.qty < 0, hi, px))
+        pnl = (self.qty * (worst - self.entry)).sum(axis=1)
+        equity = self.cash + (self.spot * lo).sum(axis=1) + pnl
+        open_ = (self.qty != 0).any(axis=1)
+        liquidated = open_ & (equity < self.maintenance_margin * (np.abs(self.qty) * worst).sum(axis=1))
+        if liquidated.any():
+            rows = liquidated[:, None]
+            closed = pnl - self.fee * (np.abs(self.qty) * worst).sum(axis=1)
+            # The perp book is lost down to zero cash; spot holdings are not touched
+            self.cash = np.where(liquidated, np.maximum(self.cash + closed, 0.0), self.cash)
+            self.qty = np.where(rows, 0.0, self.qty)
+            self.entry = np.where(rows, 0.0, self.entry)
+            self.liquidations += liquidated
+        return liquidated
+
+    def wallet(self, row: int = 0):
+        from src.execution.wallet import Wallet
+        return Wallet(portfolio=self, row=row)
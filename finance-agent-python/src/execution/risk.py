@@ -12,15 +12,17 @@ class RiskManager:
         self.min_rrr = min_rrr
         self.last_loss_time = 0
 
-    def can_trade(self) -> bool:
+    def can_trade(self, now: float = None) -> bool:
         if self.last_loss_time == 0:
             return True
-        return time.time() - self.last_loss_time > self.cooldown_seconds
+        now = time.time() if now is None else now
+        return now - self.last_loss_time > self.cooldown_seconds
 
-    def record_loss(self):
-        self.last_loss_time = time.time()
+    def record_loss(self, now: float = None):
+        # Backtests pass the simulated clock; live callers use wall time
+        self.last_loss_time = time.time() if now is None else now
 
-    def validate(self, decision: dict, equity: float, cash: float) -> (bool, str):
+    def validate(self, decision: dict, equity: float, cash: float, now: float = None) -> (bool, str):
         action = str(decision.get("action", "HOLD")).upper()
         amount_usd = float(decision.get("amount_usd", 0))
         if action not in ["BUY", "SELL", "HOLD"]:
@@ -29,7 +31,7 @@ class RiskManager:
             return True, "ok"
         if amount_usd <= 0:
             return False, "invalid_amount"
-        if not self.can_trade():
+        if not self.can_trade(now):
             return False, "cooldown"
         lev = float(decision.get("leverage", 0) or 0)
         if lev < self.leverage_min or lev > self.leverage_max:
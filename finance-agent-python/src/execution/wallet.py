@@ -1,36 +1,55 @@
+from src.execution.portfolio import Portfolio
+
 class Wallet:
-    def __init__(self, base_currency: str = "USDT", initial_balance: float = 10000.0):
-        self.base = base_currency
-        self.balance = {self.base: float(initial_balance)}
-        self.positions = {}
+    # Scalar view over one row of a Portfolio; a standalone wallet owns a one-account, fee-free book
+    def __init__(self, base_currency: str = "USDT", initial_balance: float = 10000.0, portfolio: Portfolio = None, row: int = 0):
+        if portfolio is None:
+            portfolio = Portfolio(1, initial_balance=initial_balance, fee=0.0, base_currency=base_currency)
+        self.portfolio = portfolio
+        self.row = row
+        self.base = portfolio.base
+
+    @property
+    def balance(self) -> dict:
+        return {self.base: float(self.portfolio.cash[self.row])}
+
+    @property
+    def positions(self) -> dict:
+        spot = self.portfolio.spot[self.row]
+        return {s: float(spot[j]) for s, j in self.portfolio.cols.items() if spot[j] != 0}
 
     def equity(self, prices: dict) -> float:
-        e = float(self.balance.get(self.base, 0))
+        e = float(self.portfolio.cash[self.row])
         for sym, qty in self.positions.items():
             e += float(qty) * float(prices.get(sym, 0))
         return e
 
+    def _order(self, symbol: str, qty: float, price: float) -> bool:
+        j = self.portfolio.col(symbol)
+        delta = self.portfolio.spot * 0.0
+        delta[self.row, j] = qty
+        px = self.portfolio.mark_px.copy()
+        px[j] = price
+        return bool(self.portfolio.fill_spot(delta, px)[self.row])
+
     def buy(self, symbol: str, price: float, amount_usd: float):
         if amount_usd <= 0 or price <= 0:
             return False, "invalid"
-        if amount_usd > self.balance.get(self.base, 0):
+        if amount_usd > self.portfolio.cash[self.row]:
             return False, "insufficient"
         qty = amount_usd / price
-        self.balance[self.base] -= amount_usd
-        self.positions[symbol] = self.positions.get(symbol, 0) + qty
+        if not self._order(symbol, qty, price):
+            return False, "insufficient"
         return True, f"buy {qty} {symbol}"
 
     def sell(self, symbol: str, price: float, amount_usd: float):
         if amount_usd <= 0 or price <= 0:
             return False, "invalid"
         qty = amount_usd / price
-        if qty > self.positions.get(symbol, 0):
-            qty = self.positions.get(symbol, 0)
+        held = self.positions.get(symbol, 0)
+        if qty > held:
+            qty = held
         if qty <= 0:
             return False, "no_position"
-        revenue = qty * price
-        self.positions[symbol] = self.positions.get(symbol, 0) - qty
-        if self.positions[symbol] <= 1e-8:
-            del self.positions[symbol]
-        self.balance[self.base] += revenue
+        self._order(symbol, -qty, price)
         return True, f"sell {qty} {symbol}"
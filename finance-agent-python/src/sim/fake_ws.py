@@ -0,0 +1,88 @@
+import asyncio
+import json
+import threading
+import time
+from aiohttp import web, WSMsgType
+
+class FakeOKXWebSocket:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.clients = []
+        self.loop = None
+        self.thread = None
+        self.runner = None
+        self.subscribed = threading.Event()
+
+    @property
+    def url(self) -> str:
+        # Public and business channels are served from the same socket
+        return f"ws://{self.host}:{self.port}/ws/v5/public"
+
+    def start(self) -> str:
+        ready = threading.Event()
+        def serve():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self._start())
+            ready.set()
+            self.loop.run_forever()
+        self.thread = threading.Thread(target=serve, name="fake-okx-ws", daemon=True)
+        self.thread.start()
+        ready.wait(5)
+        return self.url
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get("/ws/v5/public", self._handler)
+        app.router.add_get("/ws/v5/business", self._handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+
+    async def _handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        client = (ws, set())
+        self.clients.append(client)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                if msg.data == "ping":
+                    await ws.send_str("pong")
+                    continue
+                req = json.loads(msg.data)
+                if req.get("op") == "subscribe":
+                    for a in req.get("args", []):
+                        client[1].add((a.get("channel"), a.get("instId")))
+                        await ws.send_json({"event": "subscribe", "arg": a})
+                    self.subscribed.set()
+        finally:
+            self.clients.remove(client)
+        return ws
+
+    async def _broadcast(self, channel: str, inst: str, data: list):
+        msg = {"arg": {"channel": channel, "instId": inst}, "data": data}
+        for ws, subs in list(self.clients):
+            if (channel, inst) in subs:
+                await ws.send_json(msg)
+
+    def publish(self, channel: str, inst: str, data: list):
+        asyncio.run_coroutine_threadsafe(self._broadcast(channel, inst, data), self.loop).result(5)
+
+    def publish_ticker(self, inst: str, last: float):
+        self.publish("tickers", inst, [{"instId": inst, "last": str(last), "ts": str(int(time.time() * 1000))}])
+
+    def publish_candle(self, inst: str, channel: str, bar: list, confirm: bool = False):
+        row = [str(int(bar[0]))] + [str(x) for x in bar[1:6]] + ["0", "0", "1" if confirm else "0"]
+        self.publish(channel, inst, [row])
+
+    def stop(self):
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
@@ -1,6 +1,30 @@
+import operator
 from abc import ABC, abstractmethod
+from src.data.candles import as_candles
+from src.core.prompt import encode_prompt
+from src.strategies.features import feature_cache, snapshot_key
+
+GATE_OPS = {"==": operator.eq, "!=": operator.ne, ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+def gate_value(ctx: dict, field: str):
+    current = ctx.get("current", {}) or {}
+    if field in current:
+        return current[field]
+    candles = as_candles(ctx.get("candles"))
+    if field == "breakout" and len(candles) >= 2:
+        return bool(candles.close[-1] > candles.high[-2])
+    if field == "breakdown" and len(candles) >= 2:
+        return bool(candles.close[-1] < candles.low[-2])
+    return None
 
 class BaseStrategy(ABC):
+    feature_timeframes = ()
+    # (timeframe, field, op, value) tuples that must all hold for a new entry; fields come from summarize()'s "current"
+    entry_gates = ()
+    # Rough prompt size cap (estimated tokens); candle history is trimmed oldest-first to fit
+    token_budget = 6000
+    delta_prices = False
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -17,16 +41,46 @@ class BaseStrategy(ABC):
         pass
 
     def build_user_content(self, market_context: dict, portfolio_state: dict, news_summary: str) -> str:
-        return (
-            "{"
-            + f"\"market\": {market_context}, "
-            + f"\"portfolio\": {portfolio_state}, "
-            + f"\"news\": \"{news_summary}\""
-            + "}"
-        )
+        payload = {"market": market_context, "portfolio": portfolio_state, "news": news_summary}
+        return self.encode(payload, market_context.get("tick_size"))
 
-    def inspect_features(self, market_context: dict) -> dict:
+    def encode(self, payload: dict, tick: float = None) -> str:
+        return encode_prompt(payload, self.token_budget, self.delta_prices, tick=tick)
+
+    def failed_gates(self, market_context: dict) -> list:
+        # Missing data never blocks: an unknown value passes its gate and the LLM decides
+        multi = market_context.get("multi", {})
+        failed = []
+        for tf, field, op, expected in self.entry_gates:
+            value = gate_value(multi.get(tf, {}), field)
+            if value is None:
+                continue
+            try:
+                ok = GATE_OPS[op](value, expected)
+            except Exception:
+                continue
+            if not ok:
+                failed.append(f"{tf} {field} {value!r} not {op} {expected!r}")
+        return failed
+
+    def vector_signal(self, prepared: dict):
+        # Backtests: a per-bar entry mask from aligned indicator arrays; None falls back to entry_gates
+        return None
+
+    def vector_size(self, prepared: dict):
+        # Backtests: per-bar position_pct mirroring position_size; None keeps the engine's fixed pct
+        return None
+
+    def _compute_features(self, market_context: dict) -> dict:
         return {}
 
+    def features(self, market_context: dict) -> dict:
+        # Computed once per bar snapshot and shared by build_user_content, position_size and inspect_features
+        key = (self.name, snapshot_key(market_context, self.feature_timeframes))
+        return feature_cache.get_or_compute(key, lambda: self._compute_features(market_context))
+
+    def inspect_features(self, market_context: dict) -> dict:
+        return self.features(market_context)
+
     def position_size(self, decision: dict, market_context: dict, portfolio_state: dict) -> float:
         return float(decision.get("amount_usd", 0))
@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+from src.data.candles import as_candles
+
+class FeatureCache:
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, fn):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+        value = fn()
+        with self.lock:
+            self.misses += 1
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+feature_cache = FeatureCache(256)
+primitive_cache = FeatureCache(1024)
+
+def bar_key(candles) -> tuple:
+    # The forming bar changes without a new timestamp, so its prices are part of the key
+    if not len(candles):
+        return (0,)
+    return (len(candles), candles.last_ts(), float(candles.high[-1]), float(candles.low[-1]), float(candles.close[-1]))
+
+def snapshot_key(market_context: dict, timeframes=None) -> tuple:
+    multi = market_context.get("multi", {})
+    tfs = timeframes or sorted(multi)
+    return (market_context.get("symbol"),) + tuple((tf, bar_key(as_candles(multi.get(tf, {}).get("candles")))) for tf in tfs)
+
+def primitive(name: str, symbol: str, timeframe: str, candles, params: tuple, fn):
+    # Primitives such as range levels and swing points are shared by every strategy on the same bar
+    key = (name, symbol, timeframe, params, bar_key(candles))
+    return primitive_cache.get_or_compute(key, lambda: fn(candles, *params))
@@ -1,18 +1,27 @@
+import numpy as np
+import pandas as pd
+from src.core.prompt import CANDLES_FORMAT
 from src.strategies.base import BaseStrategy
+from src.data.candles import as_candles
+from src.strategies.features import primitive
 from configs import settings
 
 def _range_levels(candles, n=20):
-    window = candles[-n:] if len(candles) >= n else candles
-    hi = max(x["high"] for x in window) if window else 0.0
-    lo = min(x["low"] for x in window) if window else 0.0
+    window = candles.tail(n)
+    hi = float(window.high.max()) if len(window) else 0.0
+    lo = float(window.low.min()) if len(window) else 0.0
     return hi, lo
 
 class PriceActionStrategy(BaseStrategy):
     name = "Price_Action"
     description = "Price action breakout strategy"
+    feature_timeframes = ("15m", "1h")
+    token_budget = 2000
+    # position_size knobs; overridden per run by the parameter sweep
+    sizing = {"base_pct": 0.12, "breakout_adj": 0.5, "no_breakout_adj": -0.3, "overbought_adj": -0.3, "oversold_adj": -0.2, "high_vol_pct": 0.03, "high_vol_adj": -0.5}
     system_prompt = (
         'You are a price action trader. '
-        'Use recent range levels, breakout state, and trend to decide. '
+        'Use recent range levels, breakout state, trend and the 15m candles to decide. ' + CANDLES_FORMAT +
         'Portfolio context is provided in "portfolio.equity" and "portfolio.cash"; use equity for sizing decisions. '
         'Rules: The order NOTIONAL after leverage (amount_usd * leverage) must be between 10% and 50% of account equity. NEVER exceed 50%; if your initial sizing would exceed, ADJUST DOWN to comply. Prefer 10–30% for normal conviction, only approach 50% on strong confirmation. Every order must include a stop_loss; take_profit is optional but preferred if you anticipate trend reversal; planned risk_reward must be >= 3; leverage must be between 20 and 50. Ensure amount_usd = equity * position_pct / leverage. '
         'Respond with valid JSON: {"action": "BUY"|"SELL"|"HOLD", "symbol": string, "position_pct": number, "amount_usd": number, "stop_loss": number, "take_profit": number|null, "leverage": number, "risk_reward": number, "entry_signal": boolean, "entry_reason": string, "news_analysis": string, "technical_conditions": string, "risk_assessment": string}. '
@@ -21,12 +30,11 @@ class PriceActionStrategy(BaseStrategy):
     def _compute_features(self, market_context: dict) -> dict:
         multi = market_context.get("multi", {})
         ctx15 = multi.get("15m", {})
-        candles = ctx15.get("candles", [])
-        candles = [{k: (float(v) if k in ("open","high","low","close","volume") else v) for k, v in c.items()} for c in candles]
-        rh, rl = _range_levels(candles)
-        last_close = candles[-1]["close"] if candles else 0.0
-        breakout_up = last_close > rh if candles else False
-        breakout_down = last_close < rl if candles else False
+        candles = as_candles(ctx15.get("candles"))
+        rh, rl = primitive("range_levels", market_context.get("symbol"), "15m", candles, (20,), _range_levels)
+        last_close = float(candles.close[-1]) if len(candles) else 0.0
+        breakout_up = last_close > rh if len(candles) else False
+        breakout_down = last_close < rl if len(candles) else False
         trend = multi.get("1h", {}).get("current", {}).get("trend", "down")
         return {
             "range_high": rh,
@@ -38,21 +46,28 @@ class PriceActionStrategy(BaseStrategy):
             "candles": candles
         }
 
+    def vector_signal(self, prepared: dict):
+        # Breakout above the prior 20-bar 15m range with the 1h trend up
+        if prepared["base_tf"] != "15m":
+            return None
+        base = prepared["base"]
+        prior_high = pd.Series(base.high).rolling(20).max().shift(1).to_numpy()
+        h1 = prepared["tf"].get("1h")
+        trend_ok = (h1["trend"] == "up") | ~h1["valid"] if h1 is not None else np.ones(len(base), dtype=bool)
+        return (base.close > np.nan_to_num(prior_high, nan=np.inf)) & trend_ok
+
     def build_user_content(self, market_context: dict, portfolio_state: dict, news_summary: str) -> str:
-        features = self._compute_features(market_context)
+        features = self.features(market_context)
         payload = {
             "market": {"features": features, "price": market_context.get("price")},
             "portfolio": portfolio_state,
             "news": news_summary
         }
-        return str(payload)
-
-    def inspect_features(self, market_context: dict) -> dict:
-        return self._compute_features(market_context)
+        return self.encode(payload, market_context.get("tick_size"))
 
     def position_size(self, decision: dict, market_context: dict, portfolio_state: dict) -> float:
         equity = float(portfolio_state.get("equity", 0))
-        feats = self._compute_features(market_context)
+        feats = self.features(market_context)
         last_close = float(feats.get("last_close", 0) or 0)
         rh = float(feats.get("range_high", 0) or 0)
         rl = float(feats.get("range_low", 0) or 0)
@@ -66,19 +81,42 @@ class PriceActionStrategy(BaseStrategy):
         vol = float(c1h.get("volatility", 0) or 0)
         price = float(c1h.get("price", last_close) or 0)
         vol_pct = (vol / price) if price else 0
-        base_pct = 0.12
+        sz = self.sizing
         adj = 1.0
         if breakout_up and trend == "up":
-            adj += 0.5
+            adj += sz["breakout_adj"]
         if breakout_down and trend == "down":
-            adj += 0.5
+            adj += sz["breakout_adj"]
         if not breakout_up and not breakout_down:
-            adj -= 0.3
+            adj += sz["no_breakout_adj"]
         if rsi > 70:
-            adj -= 0.3
+            adj += sz["overbought_adj"]
         if rsi < 30:
-            adj -= 0.2
-        if vol_pct > 0.03:
-            adj -= 0.5
-        pct = max(0.0, min(base_pct * adj, settings.risk.get("max_position_pct", 0.2)))
+            adj += sz["oversold_adj"]
+        if vol_pct > sz["high_vol_pct"]:
+            adj += sz["high_vol_adj"]
+        pct = max(0.0, min(sz["base_pct"] * adj, settings.risk.get("max_position_pct", 0.2)))
         return equity * pct
+
+    def vector_size(self, prepared: dict):
+        # position_size for every bar, from the same range/trend inputs as vector_signal
+        if prepared["base_tf"] != "15m":
+            return None
+        base = prepared["base"]
+        prior_high = pd.Series(base.high).rolling(20).max().shift(1).to_numpy()
+        prior_low = pd.Series(base.low).rolling(20).min().shift(1).to_numpy()
+        up = base.close > np.nan_to_num(prior_high, nan=np.inf)
+        down = base.close < np.nan_to_num(prior_low, nan=-np.inf)
+        h1 = prepared["tf"].get("1h")
+        trend_up = (h1["trend"] == "up") if h1 is not None else np.zeros(len(base), dtype=bool)
+        c1h = h1 if h1 is not None else prepared["tf"]["15m"]
+        sz = self.sizing
+        adj = np.ones(len(base))
+        adj += np.where(up & trend_up, sz["breakout_adj"], 0.0)
+        adj += np.where(down & ~trend_up, sz["breakout_adj"], 0.0)
+        adj += np.where(~up & ~down, sz["no_breakout_adj"], 0.0)
+        adj += np.where(c1h["rsi"] > 70, sz["overbought_adj"], 0.0)
+        adj += np.where(c1h["rsi"] < 30, sz["oversold_adj"], 0.0)
+        vol_pct = np.divide(c1h["volatility"], c1h["price"], out=np.zeros(len(base)), where=c1h["price"] != 0)
+        adj += np.where(vol_pct > sz["high_vol_pct"], sz["high_vol_adj"], 0.0)
+        return np.clip(sz["base_pct"] * adj, 0.0, settings.risk.get("max_position_pct", 0.2))
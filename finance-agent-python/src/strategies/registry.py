@@ -1,3 +1,4 @@
+from src.core.prompt import CANDLES_FORMAT
 from src.strategies.base import BaseStrategy
 from src.strategies.smc import SMCStrategy
 from src.strategies.price_action import PriceActionStrategy
@@ -6,9 +7,10 @@ from src.strategies.test_perp import TestPerpStrategy
 class ConservativeStrategy(BaseStrategy):
     name = "Conservative"
     description = "Low risk multi-timeframe confirmation"
+    entry_gates = (("4h", "trend", "==", "up"), ("1h", "momentum", "==", "bullish"), ("1h", "rsi", "<=", 70))
     system_prompt = (
         "You are a conservative crypto trader. "
-        "1. MARKET DATA: You have 'current' indicators and 'candles' (200 bars) for 15m, 1h, 4h, 1d. "
+        "1. MARKET DATA: You have 'current' indicators and recent 'candles' for 15m, 1h, 4h, 1d. " + CANDLES_FORMAT +
         "2. NEWS ANALYSIS: Read the provided news summaries. If headlines mention 'ban', 'hack', 'SEC lawsuit', or 'insolvency', treat sentiment as NEGATIVE. If headlines mention 'ETF approval', 'institutional adoption', or 'upgrade success', treat as POSITIVE. "
         "3. TECHNICAL RULES: "
         "   - ONLY BUY if 4h Trend is UP (price > SMA20) AND 1h Momentum is BULLISH (MACD > 0). "
@@ -27,9 +29,10 @@ class ConservativeStrategy(BaseStrategy):
 class AggressiveStrategy(BaseStrategy):
     name = "Aggressive"
     description = "High momentum breakout bias"
+    entry_gates = (("15m", "breakout", "==", True), ("1h", "trend", "==", "up"))
     system_prompt = (
         "You are an aggressive momentum trader. "
-        "1. MARKET DATA: You have 'current' indicators and 'candles' (200 bars) for 15m, 1h, 4h, 1d. "
+        "1. MARKET DATA: You have 'current' indicators and recent 'candles' for 15m, 1h, 4h, 1d. " + CANDLES_FORMAT +
         "2. NEWS ANALYSIS: Look for 'hype', 'launches', or 'partnerships'. Ignore minor FUD. "
         "3. TECHNICAL RULES: "
         "   - BUY if 15m shows a breakout candle (close > previous high) AND 1h Trend is UP. "
@@ -1,18 +1,44 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from src.core.prompt import CANDLES_FORMAT
 from src.strategies.base import BaseStrategy
+from src.data.candles import as_candles
+from src.strategies.features import primitive
 from configs import settings
 
+def swing_masks(high, low, n=3):
+    # Works on (..., bars) arrays so many symbols or long histories are handled in one call
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    hi_mask = np.zeros(high.shape, dtype=bool)
+    lo_mask = np.zeros(low.shape, dtype=bool)
+    bars = high.shape[-1]
+    if bars >= 2 * n + 1:
+        hw = sliding_window_view(high, 2 * n + 1, axis=-1).max(axis=-1)
+        lw = sliding_window_view(low, 2 * n + 1, axis=-1).min(axis=-1)
+        hi_mask[..., n:bars - n] = high[..., n:bars - n] == hw
+        lo_mask[..., n:bars - n] = low[..., n:bars - n] == lw
+    return hi_mask, lo_mask
+
 def _swing_points(candles, n=3):
-    highs = []
-    lows = []
-    for i in range(n, len(candles) - n):
-        window = candles[i - n:i + n + 1]
-        h = max(x["high"] for x in window)
-        l = min(x["low"] for x in window)
-        if candles[i]["high"] == h:
-            highs.append(candles[i]["high"])
-        if candles[i]["low"] == l:
-            lows.append(candles[i]["low"])
-    return highs[-3:], lows[-3:]
+    hi_mask, lo_mask = swing_masks(candles.high, candles.low, n)
+    return candles.high[hi_mask][-3:].tolist(), candles.low[lo_mask][-3:].tolist()
+
+def confirmed_swings(mask, values, n=3):
+    # Latest and previous swing value known at each bar; a swing at i is only confirmed at i + n
+    length = len(values)
+    idx = np.flatnonzero(mask)
+    conf = idx + n
+    keep = conf < length
+    conf, vals = conf[keep], values[idx[keep]]
+    last = np.full(length, np.nan)
+    prev = np.full(length, np.nan)
+    last[conf] = vals
+    prev[conf[1:]] = vals[:-1]
+    for arr in (last, prev):
+        filled = np.maximum.accumulate(np.where(np.isnan(arr), -1, np.arange(length)))
+        arr[:] = np.where(filled >= 0, arr[np.maximum(filled, 0)], np.nan)
+    return last, prev
 
 def _structure(highs, lows):
     if len(highs) < 2 or len(lows) < 2:
@@ -25,21 +51,36 @@ def _structure(highs, lows):
         return "Bearish"
     return "Neutral"
 
+def fvg_masks(high, low):
+    # Three-bar gap test on (..., bars) arrays; bullish wins where both would hold
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    bull = np.zeros(high.shape, dtype=bool)
+    bear = np.zeros(high.shape, dtype=bool)
+    bull[..., 2:] = low[..., 2:] > high[..., :-2]
+    bear[..., 2:] = (high[..., 2:] < low[..., :-2]) & ~bull[..., 2:]
+    return bull, bear
+
 def _fvgs(candles):
+    bull, bear = fvg_masks(candles.high, candles.low)
     out = []
-    for i in range(2, len(candles)):
-        if candles[i]["low"] > candles[i - 2]["high"]:
-            out.append({"type": "bullish", "top": float(candles[i]["low"]), "bottom": float(candles[i - 2]["high"])})
-        elif candles[i]["high"] < candles[i - 2]["low"]:
-            out.append({"type": "bearish", "top": float(candles[i - 2]["low"]), "bottom": float(candles[i]["high"])})
-    return out[-3:]
+    for i in np.flatnonzero(bull | bear)[-3:]:
+        if bull[i]:
+            out.append({"type": "bullish", "top": float(candles.low[i]), "bottom": float(candles.high[i - 2])})
+        else:
+            out.append({"type": "bearish", "top": float(candles.low[i - 2]), "bottom": float(candles.high[i])})
+    return out
 
 class SMCStrategy(BaseStrategy):
     name = "SMC_Price_Action"
     description = "Smart Money Concepts strategy"
+    feature_timeframes = ("15m", "1h")
+    token_budget = 3000
+    # position_size knobs; overridden per run by the parameter sweep
+    sizing = {"base_pct": 0.15, "bullish_adj": 0.25, "bearish_adj": -0.5, "overbought_adj": -0.3, "oversold_adj": -0.2, "high_vol_pct": 0.03, "high_vol_adj": -0.5}
     system_prompt = (
         'You are an expert SMC trader. '
-        'Use provided features: structure, swing points, and FVGs across 15m and 1h. '
+        'Use provided features: structure, swing points, FVGs and recent candles across 15m and 1h. ' + CANDLES_FORMAT +
         'Portfolio context is provided in "portfolio.equity" and "portfolio.cash"; use equity for sizing decisions. '
         'Rules: The order NOTIONAL after leverage (amount_usd * leverage) must be between 10% and 50% of account equity. NEVER exceed 50%; if your initial sizing would exceed, ADJUST DOWN to comply. Prefer 10–30% for normal conviction, only approach 50% on strong confirmation. Every order must include a stop_loss; take_profit is optional but preferred if you anticipate trend reversal; planned risk_reward must be >= 3; leverage must be between 20 and 50. Ensure amount_usd = equity * position_pct / leverage. '
         'Respond with valid JSON: {"action": "BUY"|"SELL"|"HOLD", "symbol": string, "position_pct": number, "amount_usd": number, "stop_loss": number, "take_profit": number|null, "leverage": number, "risk_reward": number, "entry_signal": boolean, "entry_reason": string, "news_analysis": string, "technical_conditions": string, "risk_assessment": string}. '
@@ -49,30 +90,27 @@ class SMCStrategy(BaseStrategy):
         multi = market_context.get("multi", {})
         def tf_features(tf):
             ctx = multi.get(tf, {})
-            candles = ctx.get("candles", [])
-            candles = [{k: (float(v) if k in ("open","high","low","close","volume") else v) for k, v in c.items()} for c in candles]
-            highs, lows = _swing_points(candles)
+            candles = as_candles(ctx.get("candles"))
+            symbol = market_context.get("symbol")
+            highs, lows = primitive("swing_points", symbol, tf, candles, (3,), _swing_points)
             struct = _structure(highs, lows)
-            gaps = _fvgs(candles)
+            gaps = primitive("fvgs", symbol, tf, candles, (), _fvgs)
             current = ctx.get("current", {})
             return {"structure": struct, "swing_highs": highs, "swing_lows": lows, "fvgs": gaps, "current": current, "candles": candles}
         return {"15m": tf_features("15m"), "1h": tf_features("1h")}
 
     def build_user_content(self, market_context: dict, portfolio_state: dict, news_summary: str) -> str:
-        features = self._compute_features(market_context)
+        features = self.features(market_context)
         payload = {
             "market": {"features": features, "price": market_context.get("price")},
             "portfolio": portfolio_state,
             "news": news_summary
         }
-        return str(payload)
-
-    def inspect_features(self, market_context: dict) -> dict:
-        return self._compute_features(market_context)
+        return self.encode(payload, market_context.get("tick_size"))
 
     def position_size(self, decision: dict, market_context: dict, portfolio_state: dict) -> float:
         equity = float(portfolio_state.get("equity", 0))
-        feats = self._compute_features(market_context)
+        feats = self.features(market_context)
         f15 = feats.get("15m", {})
         current = f15.get("current", {})
         price = float(current.get("price", 0) or 0)
@@ -80,17 +118,36 @@ class SMCStrategy(BaseStrategy):
         vol = float(current.get("volatility", 0) or 0)
         vol_pct = (vol / price) if price else 0
         structure = f15.get("structure", "Neutral")
-        base_pct = 0.15
+        sz = self.sizing
         adj = 1.0
         if structure == "Bullish":
-            adj += 0.25
+            adj += sz["bullish_adj"]
         elif structure == "Bearish":
-            adj -= 0.5
+            adj += sz["bearish_adj"]
         if rsi > 70:
-            adj -= 0.3
+            adj += sz["overbought_adj"]
         if rsi < 30:
-            adj -= 0.2
-        if vol_pct > 0.03:
-            adj -= 0.5
-        pct = max(0.0, min(base_pct * adj, settings.risk.get("max_position_pct", 0.2)))
+            adj += sz["oversold_adj"]
+        if vol_pct > sz["high_vol_pct"]:
+            adj += sz["high_vol_adj"]
+        pct = max(0.0, min(sz["base_pct"] * adj, settings.risk.get("max_position_pct", 0.2)))
         return equity * pct
+
+    def vector_size(self, prepared: dict):
+        # position_size for every bar; 15m structure uses swings only once they are confirmed n bars later
+        if prepared["base_tf"] != "15m":
+            return None
+        base = prepared["base"]
+        ind = prepared["tf"]["15m"]
+        hi_mask, lo_mask = swing_masks(base.high, base.low, 3)
+        last_h, prev_h = confirmed_swings(hi_mask, base.high, 3)
+        last_l, prev_l = confirmed_swings(lo_mask, base.low, 3)
+        sz = self.sizing
+        adj = np.ones(len(base))
+        adj += np.where((last_h > prev_h) & (last_l > prev_l), sz["bullish_adj"], 0.0)
+        adj += np.where((last_h < prev_h) & (last_l < prev_l), sz["bearish_adj"], 0.0)
+        adj += np.where(ind["rsi"] > 70, sz["overbought_adj"], 0.0)
+        adj += np.where(ind["rsi"] < 30, sz["oversold_adj"], 0.0)
+        vol_pct = np.divide(ind["volatility"], base.close, out=np.zeros(len(base)), where=base.close != 0)
+        adj += np.where(vol_pct > sz["high_vol_pct"], sz["high_vol_adj"], 0.0)
+        return np.clip(sz["base_pct"] * adj, 0.0, settings.risk.get("max_position_pct", 0.2))
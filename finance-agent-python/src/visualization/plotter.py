@@ -2,8 +2,11 @@ import os
 import json
 from typing import Dict
 from src.data.aggregator import sma, rsi, macd
+from src.data.candles import Candles
 
 def _arrays_from_candles(candles):
+    if isinstance(candles, Candles):
+        return candles.timestamps_str(), candles.open.tolist(), candles.high.tolist(), candles.low.tolist(), candles.close.tolist()
     x = [c.get("timestamp") for c in candles]
     o = [float(c.get("open", 0)) for c in candles]
     h = [float(c.get("high", 0)) for c in candles]
@@ -11,22 +14,32 @@ def _arrays_from_candles(candles):
     c_ = [float(c.get("close", 0)) for c in candles]
     return x, o, h, l, c_
 
-def plot_chart(symbol: str, tf: str, tf_context: Dict, features: Dict, out_path: str):
+def _align(values, n):
+    values = [None if v is None or v != v else v for v in values[-n:]]
+    return [None] * (n - len(values)) + values
+
+def plot_chart(symbol: str, tf: str, tf_context: Dict, features: Dict, out_path: str, indicators: Dict = None):
     candles = features.get("candles", tf_context.get("candles", []))
-    if not candles:
+    if candles is None or not len(candles):
         return False, "No candle data"
     x, o, h, l, c_ = _arrays_from_candles(candles)
     # Indicators
-    try:
-        import pandas as pd
-        series_close = pd.Series(c_)
-        s20 = sma(series_close, 20).fillna(method="bfill").fillna(method="ffill").tolist()
-        r = rsi(series_close).fillna(method="bfill").fillna(method="ffill").tolist()
-        m = macd(series_close).fillna(method="bfill").fillna(method="ffill").tolist()
-    except Exception:
-        s20 = []
-        r = []
-        m = []
+    if indicators:
+        # Series kept by IndicatorEngine; no recomputation needed
+        s20 = _align(indicators.get("sma20", []), len(c_))
+        r = _align(indicators.get("rsi", []), len(c_))
+        m = _align(indicators.get("macd", []), len(c_))
+    else:
+        try:
+            import pandas as pd
+            series_close = pd.Series(c_)
+            s20 = sma(series_close, 20).fillna(method="bfill").fillna(method="ffill").tolist()
+            r = rsi(series_close).fillna(method="bfill").fillna(method="ffill").tolist()
+            m = macd(series_close).fillna(method="bfill").fillna(method="ffill").tolist()
+        except Exception:
+            s20 = []
+            r = []
+            m = []
 
     fvgs = features.get("fvgs", [])
     rh = features.get("range_high")
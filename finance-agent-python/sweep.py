@@ -0,0 +1,32 @@
+import json
+import os
+import sys
+from configs import settings
+from src.backtest.sweep import sweep, score
+from src.data.candle_store import CandleStore
+
+DEFAULT_GRID = {
+    "risk.min_position_pct": [0.05, 0.10],
+    "risk.max_position_pct": [0.3, 0.5],
+    "risk.leverage_min": [20, 30],
+    "risk.min_rrr": [2, 3, 4],
+    "risk.cooldown_minutes": [0, 15, 60],
+    "sizing.base_pct": [0.10, 0.15, 0.20]
+}
+
+def run():
+    # python sweep.py [grid.json]; rerunning with the same RESULTS file resumes where it stopped
+    grid = DEFAULT_GRID
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            grid = json.load(f)
+    strategy_key = os.getenv("STRATEGY", "price_action")
+    symbols = [s.strip() for s in os.getenv("SYMBOLS", ",".join(settings.symbols)).split(",") if s.strip()]
+    results_path = os.getenv("RESULTS", f"logs/sweep_{strategy_key}.jsonl")
+    ranked = sweep(CandleStore(settings.data["candle_store_dir"]), strategy_key, grid, symbols, settings.timeframes, results_path)
+    for row in ranked[:10]:
+        r = row["result"]
+        print(f"score={score(r):+.3f} return={r['return_pct'] * 100:+.1f}% maxDD={r['max_drawdown_pct'] * 100:.1f}% trades={r['trades']} {row['params']}")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,71 @@
+import pytest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.core.agent import decide_all
+
+class SlowAgent:
+    def __init__(self, action, fail=False):
+        self.action = action
+        self.fail = fail
+
+    def decide(self, market_context, portfolio_state, news_summary):
+        time.sleep(0.2)
+        if self.fail:
+            raise RuntimeError("boom")
+        return {"action": self.action, "symbol": market_context["symbol"], "amount_usd": 1.0}
+
+def test_decide_all_is_concurrent_and_ordered():
+    agents = {"a": SlowAgent("BUY"), "b": SlowAgent("SELL"), "c": SlowAgent("BUY", fail=True)}
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        out = decide_all(pool, agents, {"symbol": "ETH/USDT"}, {"equity": 1}, "")
+    assert time.monotonic() - start < 0.5
+    assert list(out) == ["a", "b", "c"]
+    assert out["b"]["action"] == "SELL" and out["c"]["action"] == "HOLD"
+
+def test_registry_shares_clients(monkeypatch):
+    from src.core.agent import Agent
+    from src.core.llm import ClientRegistry
+    from src.strategies.registry import available_strategies
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test")
+    reg = ClientRegistry(pool_size=4)
+    a = Agent(strategy=available_strategies["smc"], model="m", registry=reg)
+    b = Agent(strategy=available_strategies["smc"], model="m", registry=reg)
+    assert a.client is b.client and a.client.client is reg.openai
+    a.set_strategy(available_strategies["price_action"])
+    assert a.client.model == "m" and a.client.client is reg.openai and len(reg.clients) == 2
+    reg.close()
+
+def test_entry_gates_skip_llm_only_without_position():
+    from src.core.agent import Agent
+    from src.strategies.registry import available_strategies
+    class Boom:
+        def complete_json_with_meta(self, content):
+            raise AssertionError("LLM should not be called")
+    agent = Agent(strategy=available_strategies["conservative"])
+    agent.client = Boom()
+    mc = {"symbol": "BTC/USDT", "multi": {"4h": {"current": {"trend": "down"}}, "1h": {"current": {"momentum": "bullish", "rsi": 55}}}}
+    d = agent.decide(mc, {"equity": 100, "positions": {}}, "")
+    assert d["action"] == "HOLD" and d["gated"] and "4h trend" in d["entry_reason"]
+    assert agent.stats() == {"decisions": 1, "gated": 1, "llm_calls": 0}
+    with pytest.raises(AssertionError, match="LLM should not be called"):
+        agent.decide(mc, {"equity": 100, "positions": {"BTC/USDT": 1}}, "")
+
+def test_missing_gate_data_fails_open():
+    from src.strategies.registry import available_strategies
+    assert available_strategies["conservative"].failed_gates({"multi": {}}) == []
+    assert available_strategies["smc"].failed_gates({"multi": {}}) == []
+
+def test_paper_position_in_open_orders_bypasses_gates():
+    from src.core.agent import Agent
+    from src.strategies.registry import available_strategies
+    class Sell:
+        def complete_json_with_meta(self, content):
+            return {"action": "SELL", "amount_usd": 50}, {}
+    agent = Agent(strategy=available_strategies["conservative"])
+    agent.client = Sell()
+    mc = {"symbol": "BTC/USDT", "multi": {"4h": {"current": {"trend": "down"}}, "1h": {"current": {"momentum": "bullish", "rsi": 55}}}}
+    other = {"aggressive:BTC/USDT": {"strategy": "Aggressive", "symbol": "BTC/USDT"}}
+    assert agent.decide(mc, {"equity": 100, "positions": {}}, "", other)["gated"]
+    mine = {"conservative:BTC/USDT": {"strategy": agent.strategy.name, "symbol": "BTC/USDT"}}
+    assert agent.decide(mc, {"equity": 100, "positions": {}}, "", mine)["action"] == "SELL"
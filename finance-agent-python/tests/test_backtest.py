@@ -0,0 +1,57 @@
+import numpy as np
+from src.backtest.engine import BacktestEngine, align, tf_ms
+from src.data.candles import Candles
+from src.execution.risk import RiskManager
+
+M15 = tf_ms("15m")
+
+def bars(opens, highs, lows, closes, step=M15):
+    n = len(opens)
+    return Candles(np.arange(n, dtype=np.int64) * step, opens, highs, lows, closes, np.ones(n))
+
+def risk():
+    return RiskManager(0.1, 0.5, 0.05, 15, 0.2, 20, 50, 3)
+
+def signals(n, entry_at, sl, tp):
+    entry = np.zeros(n, dtype=bool)
+    entry[entry_at] = True
+    return {"entry": entry, "stop_loss": np.full(n, sl), "take_profit": np.full(n, tp), "leverage": np.full(n, 20.0), "position_pct": np.full(n, 0.2), "risk_reward": np.full(n, 3.0)}
+
+def test_higher_timeframe_alignment_has_no_lookahead():
+    base = bars(*[np.ones(8)] * 4)
+    h1 = bars(*[np.ones(2)] * 4, step=tf_ms("1h"))
+    idx, valid = align(base, "15m", h1, "1h")
+    # The first 1h bar only closes with the 4th 15m bar
+    assert valid.tolist() == [False, False, False, True, True, True, True, True]
+    assert idx[3:].tolist() == [0, 0, 0, 0, 1]
+
+def test_stop_fills_first_when_both_hit_in_one_bar():
+    c = bars([100, 100, 100, 100], [101, 101, 120, 101], [99, 99, 90, 99], [100, 100, 100, 100])
+    r = BacktestEngine(risk=risk(), fee=0, slippage=0).simulate(c, signals(4, 0, 98, 103))
+    t = r["trades"][0]
+    assert t["exit_reason"] == "stop_loss" and t["exit_price"] == 98
+    assert r["equity"][-1] == 10000 + t["pnl_usd"]
+
+def test_gap_through_stop_fills_at_open_and_cooldown_uses_bar_time():
+    c = bars([100, 100, 95, 95, 95], [101, 101, 96, 96, 96], [99, 99, 94, 94, 94], [100, 100, 95, 95, 95])
+    sig = signals(5, [0, 2], 98, 106)
+    r = BacktestEngine(risk=risk(), fee=0, slippage=0).simulate(c, sig)
+    assert len(r["trades"]) == 1 and r["trades"][0]["exit_price"] == 95
+    assert r["rejected"] == {"cooldown": 1}
+
+def test_take_profit_and_risk_rejection():
+    c = bars([100, 100, 104], [101, 101, 110], [99, 99, 103], [100, 100, 108])
+    r = BacktestEngine(risk=risk(), fee=0, slippage=0).simulate(c, signals(3, 0, 98, 106))
+    assert r["trades"][0]["exit_reason"] == "take_profit" and r["trades"][0]["exit_price"] == 106
+    sig = signals(3, 0, 98, 106)
+    sig["risk_reward"][:] = 1.0
+    assert BacktestEngine(risk=risk()).simulate(c, sig)["rejected"] == {"risk_reward_too_low": 1}
+
+def test_cash_buffer_applies_in_backtest():
+    # Unlevered 90% of equity leaves 10% cash, under the 20% buffer
+    c = bars(*[np.full(4, 100.0)] * 4)
+    sig = signals(4, 0, 98, 106)
+    sig["leverage"][:] = 1.0
+    sig["position_pct"][:] = 0.9
+    r = BacktestEngine(risk=RiskManager(0.1, 1.0, 0.05, 15, 0.2, 1, 50, 3), fee=0, slippage=0).simulate(c, sig)
+    assert r["trades"] == [] and r["rejected"] == {"cash_buffer": 1}
@@ -0,0 +1,11 @@
+from benchmarks.suite import compare, points
+
+def test_regressions_need_relative_and_absolute_slowdown():
+    baseline = {"a": {"median": 0.010}, "b": {"median": 0.0001}, "c": {"median": 0.010, "bytes": 1000}}
+    results = {"a": {"median": 0.020}, "b": {"median": 0.0004}, "c": {"median": 0.010, "bytes": 2000}, "new": {"median": 1.0}}
+    assert compare(results, baseline, 0.25) == ["a", "c"]
+
+def test_scaling_points_follow_the_case_axis():
+    assert points("bars", [200, 10000], [1, 10]) == [(200, 1), (10000, 1)]
+    assert points("symbols", [200, 10000], [1, 10]) == [(200, 1), (200, 10)]
+    assert points(None, [200], [1]) == [(200, 1)]
@@ -0,0 +1,58 @@
+from src.data.okx_client import OKXClient
+
+def _bars(start, n, step=60000):
+    return [[start + i * step, 100 + i, 101 + i, 99 + i, 100 + i, 10] for i in range(n)]
+
+class FakeExchange:
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=200):
+        self.calls.append(since)
+        if since is None:
+            return self.bars[-limit:]
+        return [b for b in self.bars if b[0] >= since][:limit]
+
+def test_fetch_ohlcv_incremental():
+    ex = FakeExchange(_bars(0, 300))
+    okx = OKXClient()
+    okx.exchange = ex
+    df = okx.fetch_ohlcv("BTC/USDT", "1m", limit=200)
+    assert len(df) == 200 and ex.calls == [None]
+    # Forming bar updated and one new bar closed
+    ex.bars[-1] = [ex.bars[-1][0], 1, 2, 0.5, 1.5, 3]
+    ex.bars.append([ex.bars[-1][0] + 60000, 2, 3, 1, 2.5, 4])
+    df = okx.fetch_ohlcv("BTC/USDT", "1m", limit=200)
+    assert ex.calls[-1] == 299 * 60000
+    assert len(df) == 200
+    assert df["close"].iloc[-2] == 1.5 and df["close"].iloc[-1] == 2.5
+    assert df["timestamp"].is_monotonic_increasing
+
+def test_frame_is_a_copy_of_the_ring():
+    from src.data.candle_cache import CandleRing
+    ring = CandleRing(4)
+    ring.merge(_bars(0, 4))
+    df = ring.frame()
+    # Overwrites the slot the frame was built from; the frame already handed out must not change
+    ring.merge([[3 * 60000, 7, 7, 7, 7, 7], [4 * 60000, 8, 8, 8, 8, 8]])
+    assert df["close"].tolist() == [100, 101, 102, 103]
+    assert ring.frame()["close"].tolist() == [101, 102, 7, 8]
+
+def test_cached_read_does_not_wait_for_a_slow_fetch():
+    import threading, time
+    ex = FakeExchange(_bars(0, 300))
+    okx = OKXClient()
+    okx.exchange = ex
+    okx.fetch_ohlcv("BTC/USDT", "1m", limit=200)
+    release = threading.Event()
+    fetch = ex.fetch_ohlcv
+    ex.fetch_ohlcv = lambda *a, **k: release.wait(5) and fetch(*a, **k)
+    t = threading.Thread(target=okx.fetch_ohlcv, args=("BTC/USDT", "1m", 200))
+    t.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    assert len(okx.cached_ohlcv("BTC/USDT", "1m", 200)) == 200
+    assert time.monotonic() - start < 1
+    release.set()
+    t.join()
@@ -0,0 +1,106 @@
+import functools
+import numpy as np
+from src.data.candle_store import CandleStore
+from src.data.okx_client import OKXClient
+
+def _rows(start, n):
+    ts = np.arange(start, start + n, dtype=np.int64) * 60000
+    values = np.column_stack([np.arange(n, dtype=float) + start] * 5)
+    return ts, values
+
+def test_append_range_and_reopen(tmp_path):
+    store = CandleStore(str(tmp_path), segment_rows=7)
+    ts, values = _rows(0, 20)
+    assert store.append("BTC/USDT", "1m", ts, values) == 20
+    # Overlapping rows are ignored
+    ts2, values2 = _rows(15, 10)
+    assert store.append("BTC/USDT", "1m", ts2, values2) == 5
+    reopened = CandleStore(str(tmp_path), segment_rows=7)
+    rows = reopened.read("BTC/USDT", "1m", start=5 * 60000, end=17 * 60000)
+    assert list(rows["timestamp"] // 60000) == list(range(5, 18))
+    assert list(reopened.tail("BTC/USDT", "1m", 9)["close"]) == [float(i) for i in range(16, 25)]
+    assert reopened.last_ts("BTC/USDT", "1m") == 24 * 60000
+
+def test_okx_client_warm_start(tmp_path):
+    store = CandleStore(str(tmp_path))
+    ts, values = _rows(0, 50)
+    store.append("BTC/USDT", "1m", ts, values)
+
+    class Exchange:
+        calls = []
+        def fetch_ohlcv(self, symbol, timeframe, since=None, limit=200):
+            self.calls.append(since)
+            return [[since, 1, 1, 1, 1, 1], [since + 60000, 2, 2, 2, 2, 2]]
+
+    okx = OKXClient(store=store)
+    okx.exchange = Exchange()
+    df = okx.fetch_ohlcv("BTC/USDT", "1m", limit=200)
+    assert okx.exchange.calls == [49 * 60000]
+    assert len(df) == 51
+    assert store.last_ts("BTC/USDT", "1m") == 49 * 60000
+
+def test_okx_client_backfills_gap_into_store(tmp_path):
+    store = CandleStore(str(tmp_path))
+    ts, values = _rows(0, 50)
+    store.append("BTC/USDT", "1m", ts, values)
+    # 500 bars went by while the agent was down, more than one 200-bar page
+    bars = [[i * 60000, i, i, i, i, i] for i in range(550)]
+
+    class Exchange:
+        calls = []
+        def fetch_ohlcv(self, symbol, timeframe, since=None, limit=200):
+            self.calls.append(since)
+            if since is None:
+                return bars[-limit:]
+            return [b for b in bars if b[0] >= since][:limit]
+
+    okx = OKXClient(store=store)
+    okx.exchange = Exchange()
+    df = okx.fetch_ohlcv("BTC/USDT", "1m", limit=200)
+    assert None not in okx.exchange.calls
+    assert len(df) == 200 and df["close"].iloc[-1] == 549
+    stored = store.read("BTC/USDT", "1m")["timestamp"] // 60000
+    assert list(stored) == list(range(549))
+    assert okx.history("BTC/USDT", "1m")["close"].tolist() == [float(i) for i in range(50)] + [float(i) for i in range(50, 549)]
+
+def test_capped_backfill_still_serves_current_bars(tmp_path):
+    store = CandleStore(str(tmp_path))
+    ts, values = _rows(0, 50)
+    store.append("BTC/USDT", "1m", ts, values)
+    bars = [[i * 60000, i, i, i, i, i] for i in range(2000)]
+
+    class Exchange:
+        def fetch_ohlcv(self, symbol, timeframe, since=None, limit=200):
+            if since is None:
+                return bars[-limit:]
+            return [b for b in bars if b[0] >= since][:limit]
+
+    okx = OKXClient(store=store)
+    okx.exchange = Exchange()
+    okx._page_forward = functools.partial(okx._page_forward, max_pages=2)
+    df = okx.fetch_ohlcv("BTC/USDT", "1m", limit=200)
+    assert len(df) == 200 and df["close"].iloc[-1] == 1999
+    stored = list(store.read("BTC/USDT", "1m")["timestamp"] // 60000)
+    # The paged bars are kept, then the store jumps to the latest page
+    assert stored[:600] == list(range(600)) and stored[-1] == 1998
+
+def test_exchange_gap_refills_instead_of_paging(tmp_path):
+    store = CandleStore(str(tmp_path))
+    ts, values = _rows(0, 50)
+    store.append("BTC/USDT", "1m", ts, values)
+    # The exchange no longer has the cached bar; its history starts later
+    bars = [[i * 60000, i, i, i, i, i] for i in range(1000, 1500)]
+
+    class Exchange:
+        calls = []
+        def fetch_ohlcv(self, symbol, timeframe, since=None, limit=200):
+            self.calls.append(since)
+            if since is None:
+                return bars[-limit:]
+            return [b for b in bars if b[0] >= since][:limit]
+
+    okx = OKXClient(store=store)
+    okx.exchange = Exchange()
+    df = okx.fetch_ohlcv("BTC/USDT", "1m", limit=200)
+    assert okx.exchange.calls == [49 * 60000, None]
+    assert df["close"].iloc[-1] == 1499
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+from src.data.aggregator import summarize
+from src.strategies.features import feature_cache
+from src.strategies.smc import SMCStrategy
+
+def _context(seed):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, 200))
+    df = pd.DataFrame({
+        "timestamp": pd.date_range(start="2024-01-01", periods=200, freq="15min"),
+        "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": np.ones(200)
+    })
+    return {"multi": {"15m": summarize(df), "1h": summarize(df)}, "price": float(close[-1]), "symbol": "BTC/USDT"}
+
+def test_features_computed_once_per_bar():
+    feature_cache.clear()
+    s = SMCStrategy()
+    mc = _context(1)
+    portfolio = {"cash": 100, "positions": {}, "equity": 100}
+    misses = feature_cache.misses
+    s.build_user_content(mc, portfolio, "")
+    s.position_size({}, mc, portfolio)
+    s.inspect_features(mc)
+    assert feature_cache.misses == misses + 1
+    # A different forming bar is a new snapshot
+    s.inspect_features(_context(2))
+    assert feature_cache.misses == misses + 2
@@ -0,0 +1,84 @@
+import time
+from src.data.fetch_pool import FetchPool
+
+def test_gather_runs_concurrently_with_deadlines():
+    pool = FetchPool(max_workers=4, rate_per_sec=100, burst=10, timeout=0.5)
+    calls = {k: (time.sleep, 0.2) for k in ("a", "b", "c")}
+    calls["slow"] = (time.sleep, 2)
+    start = time.monotonic()
+    out = pool.gather(calls, defaults={"slow": lambda: "stale"})
+    assert time.monotonic() - start < 1.0
+    assert out["slow"] == "stale" and out["a"] is None
+    pool.shutdown()
+
+def test_multi_snapshot_falls_back_for_slow_symbol():
+    import pandas as pd
+    from src.data.aggregator import build_multi_snapshot
+
+    def frame(px):
+        return pd.DataFrame({"timestamp": pd.date_range("2024-01-01", periods=30, freq="15min"), "open": px, "high": px + 1, "low": px - 1, "close": px, "volume": 1.0})
+
+    class FakeOKX:
+        last_price = {"ETH/USDT": 2000.0}
+        def fetch_price(self, s):
+            if s == "ETH/USDT":
+                time.sleep(2)
+            return 60000.0
+        def fetch_balance(self):
+            return {"free": {"USDT": 100.0}, "total": {"USDT": 100.0}}
+        def fetch_perp_position_qty(self, s):
+            return 0.0
+        def fetch_ohlcv(self, s, tf, limit):
+            if s == "ETH/USDT":
+                time.sleep(2)
+            return frame(60000.0)
+        def cached_ohlcv(self, s, tf, limit):
+            return frame(2000.0)
+        def account_state_from_balance(self, bal, s, price):
+            return {"cash": bal["free"]["USDT"], "qty": 0.0, "equity": bal["free"]["USDT"]}
+
+    pool = FetchPool(max_workers=8, rate_per_sec=100, burst=20, timeout=0.5)
+    start = time.monotonic()
+    snaps = build_multi_snapshot(FakeOKX(), ["BTC/USDT", "ETH/USDT"], ["15m"], pool)
+    assert time.monotonic() - start < 1.5
+    assert snaps["BTC/USDT"]["prices"] == {"BTC/USDT": 60000.0, "ETH/USDT": 2000.0}
+    assert snaps["ETH/USDT"]["multi"]["15m"]["current"]["price"] == 2000.0
+    pool.shutdown()
+
+def test_multi_snapshot_skips_symbol_with_empty_cache():
+    import pandas as pd
+    from src.data.aggregator import build_multi_snapshot
+    from src.data.candle_cache import empty_frame
+
+    class ColdOKX:
+        last_price = {}
+        def fetch_price(self, s):
+            return 100.0
+        def fetch_balance(self):
+            return {}
+        def fetch_perp_position_qty(self, s):
+            return 0.0
+        def fetch_ohlcv(self, s, tf, limit):
+            if s == "ETH/USDT":
+                time.sleep(2)
+            return pd.DataFrame({"timestamp": pd.date_range("2024-01-01", periods=30, freq="15min"), "open": 100.0, "high": 101.0, "low": 99.0, "close": 100.0, "volume": 1.0})
+        def cached_ohlcv(self, s, tf, limit):
+            return empty_frame()
+        def account_state_from_balance(self, bal, s, price):
+            return {"cash": 0.0, "qty": 0.0, "equity": 0.0}
+
+    pool = FetchPool(max_workers=8, rate_per_sec=100, burst=20, timeout=0.5)
+    snaps = build_multi_snapshot(ColdOKX(), ["BTC/USDT", "ETH/USDT"], ["15m", "1h"], pool)
+    assert list(snaps) == ["BTC/USDT"]
+    assert snaps["BTC/USDT"]["multi"]["1h"]["current"]["price"] == 100.0
+    pool.shutdown()
+
+def test_throttled_calls_past_deadline_take_default_without_holding_workers():
+    pool = FetchPool(max_workers=1, rate_per_sec=2, burst=1, timeout=0.3)
+    start = time.monotonic()
+    out = pool.gather({k: (lambda k=k: k,) for k in ("a", "b", "c")}, defaults={"b": "late", "c": "late"})
+    assert time.monotonic() - start < 0.5
+    assert out == {"a": "a", "b": "late", "c": "late"}
+    # Nothing queued behind the limiter, so the single worker is free straight away
+    assert pool.executor.submit(lambda: 1).result(timeout=0.1) == 1
+    pool.shutdown()
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from src.data.aggregator import summarize
+from src.data.indicators import IndicatorEngine
+
+def _frame(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start="2024-01-01", periods=n, freq="15min"),
+        "open": close,
+        "high": close + rng.random(n),
+        "low": close - rng.random(n),
+        "close": close,
+        "volume": np.ones(n)
+    })
+
+def test_engine_matches_summarize():
+    df = _frame(400)
+    engine = IndicatorEngine(window=200)
+    for end in list(range(200, 400, 7)) + [400]:
+        window = df.iloc[end - 200:end].reset_index(drop=True)
+        # Forming bar moves between ticks without a new bar closing
+        forming = window.copy()
+        forming.loc[199, "close"] += 0.5
+        for w in (window, forming):
+            got = engine.update("BTC/USDT", "15m", w)
+            want = summarize(w)["current"]
+            for k in ("price", "sma20", "volatility", "high_200", "low_200"):
+                assert abs(got[k] - want[k]) < 1e-6, k
+            for k in ("rsi", "macd"):
+                assert abs(got[k] - want[k]) < 1e-3, k
+            assert got["trend"] == want["trend"] and got["momentum"] == want["momentum"]
+
+def test_update_reads_only_bars_after_the_last_commit():
+    df = _frame(300)
+    engine = IndicatorEngine(window=200)
+    engine.update("BTC/USDT", "15m", df.iloc[:250])
+    want = engine.update("BTC/USDT", "15m", df)
+    # Older rows are not looked at again, so changing them leaves the result alone
+    engine = IndicatorEngine(window=200)
+    engine.update("BTC/USDT", "15m", df.iloc[:250])
+    stale = df.copy()
+    stale.loc[:247, "close"] = np.nan
+    assert engine.update("BTC/USDT", "15m", stale) == want
@@ -0,0 +1,69 @@
+import ccxt
+from src.data.okx_client import OKXClient
+
+class Exchange:
+    precisionMode = ccxt.TICK_SIZE
+
+    def __init__(self):
+        self.loads = 0
+        self.markets = {}
+        self.algo = None
+
+    def load_markets(self, reload=False):
+        self.loads += 1
+        self.markets = {
+            "BTC/USDT": {"symbol": "BTC/USDT", "id": "BTC-USDT", "contract": False},
+            "BTC/USDT:USDT": {
+                "symbol": "BTC/USDT:USDT", "id": "BTC-USDT-SWAP", "contract": True, "contractSize": 0.01,
+                "precision": {"amount": 0.01, "price": 0.1}, "limits": {"amount": {"min": 0.01}}
+            }
+        }
+        return self.markets
+
+    def privatePostTradeOrderAlgo(self, payload):
+        self.algo = payload
+        return {"code": "0"}
+
+def test_specs_loaded_once_and_used_for_rounding():
+    okx = OKXClient()
+    okx.exchange = Exchange()
+    assert okx.get_perp_min_amount("BTC/USDT") == 0.01
+    assert okx.get_perp_min_base_qty("BTC/USDT") == 0.0001
+    spec = okx.instrument_spec("BTC/USDT")
+    assert okx.exchange.loads == 1
+    assert spec.inst_id == "BTC-USDT-SWAP"
+    assert spec.round_contracts(1.239) == 1.23 and spec.round_contracts(1.231, up=True) == 1.24
+    ok, _ = okx.place_perp_tp_sl_algo("BTC/USDT", "long", tp_px=101.234, sl_px=98.96, qty=0.01234)
+    assert ok and okx.exchange.algo["sz"] == "1.24" and okx.exchange.algo["tpTriggerPx"] == 101.2
+    assert okx.exchange.loads == 1
+
+def test_failed_load_backs_off_and_refreshes_once():
+    import threading
+    import time
+
+    class Flaky(Exchange):
+        fail = True
+        def load_markets(self, reload=False):
+            if self.fail:
+                self.loads += 1
+                raise RuntimeError("down")
+            time.sleep(0.1)
+            return super().load_markets(reload)
+
+    okx = OKXClient()
+    okx.exchange = Flaky()
+    assert okx.instrument_spec("BTC/USDT") is None
+    ok, msg = okx.place_perp_tp_sl_algo("BTC/USDT", "long", sl_px=99)
+    assert not ok and msg == "instrument_unknown"
+    # Inside the retry window nothing reloads on the caller's thread
+    assert okx.exchange.loads == 1
+    okx.exchange.fail = False
+    okx.instruments_loaded_at -= okx.instrument_retry + 1
+    threads = [threading.Thread(target=okx.instrument_spec, args=("BTC/USDT",)) for _ in range(8)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    deadline = time.time() + 5
+    while okx.instrument_spec("BTC/USDT") is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert okx.instrument_spec("BTC/USDT").inst_id == "BTC-USDT-SWAP"
+    assert okx.exchange.loads == 2
@@ -0,0 +1,42 @@
+import time
+from src.core.llm import DeepSeekClient
+
+class ScriptedCompletions:
+    # Each call pops (delay, content); content None raises
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        delay, content = self.script.pop(0) if self.script else (0, '{"action": "HOLD"}')
+        time.sleep(delay)
+        if content is None:
+            raise RuntimeError("api error")
+        msg = type("M", (), {"content": content})
+        return type("R", (), {"choices": [type("C", (), {"message": msg})]})
+
+def make_client(script, **kwargs):
+    c = DeepSeekClient(system_prompt="sys", **kwargs)
+    completions = ScriptedCompletions(script)
+    c.client = type("O", (), {"chat": type("Ch", (), {"completions": completions})})
+    return c, completions
+
+def test_retries_after_error():
+    client, completions = make_client([(0, None), (0, "not json"), (0, '{"action": "BUY"}')], retries=2)
+    decision, meta = client.complete_json_with_meta("x")
+    assert decision["action"] == "BUY" and meta["attempts"] == 3 and meta["retried"]
+
+def test_hedge_wins_over_slow_primary():
+    client, completions = make_client([(1.0, '{"action": "SELL"}'), (0, '{"action": "BUY"}')], hedge=True, hedge_after=0.1)
+    start = time.monotonic()
+    decision, meta = client.complete_json_with_meta("x")
+    assert time.monotonic() - start < 0.8
+    assert decision["action"] == "BUY" and meta["hedged"] and completions.calls == 2
+
+def test_deadline_returns_hold():
+    client, _ = make_client([(1.0, '{"action": "BUY"}')], deadline=0.2)
+    start = time.monotonic()
+    decision, meta = client.complete_json_with_meta("x")
+    assert time.monotonic() - start < 0.6
+    assert decision["action"] == "HOLD" and decision["reasoning"] == "LLM timeout" and meta["timed_out"]
@@ -0,0 +1,46 @@
+import time
+from src.core.llm import DeepSeekClient
+from src.core.llm_cache import LLMCache, cache_key
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        msg = type("M", (), {"content": '{"action": "BUY", "amount_usd": 10}'})
+        return type("R", (), {"choices": [type("C", (), {"message": msg})]})
+
+def make_client(cache):
+    c = DeepSeekClient(system_prompt="sys", cache=cache)
+    completions = FakeCompletions()
+    c.client = type("O", (), {"chat": type("Ch", (), {"completions": completions})})
+    return c, completions
+
+def test_key_normalizes_whitespace():
+    assert cache_key("m", "s", '{"a": 1}') == cache_key("m", "s", ' {"a":  1}\n')
+    assert cache_key("m", "s", "x") != cache_key("m", "t", "x")
+
+def test_client_hits_cache_on_identical_prompt():
+    cache = LLMCache(ttl=60)
+    client, completions = make_client(cache)
+    a = client.complete_json("payload")
+    a["action"] = "mutated"
+    b = client.complete_json("payload")
+    assert completions.calls == 1 and b["action"] == "BUY"
+    assert cache.hits == 1 and cache.misses == 1
+
+def test_ttl_and_lru():
+    cache = LLMCache(ttl=0.05, maxsize=2)
+    for k in ("a", "b", "c"):
+        cache.set(k, {"k": k})
+    assert cache.get("a") is None and cache.get("c") == {"k": "c"}
+    time.sleep(0.06)
+    assert cache.get("c") is None
+
+def test_disk_backend_survives_restart(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    first = LLMCache(ttl=60, path=path)
+    first.set("k", {"action": "HOLD"})
+    first.close()
+    assert LLMCache(ttl=60, path=path).get("k") == {"action": "HOLD"}
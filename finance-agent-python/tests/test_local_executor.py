@@ -0,0 +1,114 @@
+import threading
+import time
+from src.data.okx_client import OKXClient
+from src.execution.local_executor import LocalExecutor
+from src.execution.order_queue import MemoryOrderStore, IN_FLIGHT, STALE
+from src.sim.exchange import SimExchange
+
+def _wait(cond, timeout=5):
+    end = time.time() + timeout
+    while time.time() < end and not cond():
+        time.sleep(0.01)
+    return cond()
+
+def okx_client():
+    sim = SimExchange(["BTC/USDT", "ETH/USDT"], balance=10000, fee=0)
+    sim.set_price("BTC/USDT", 100)
+    sim.set_price("ETH/USDT", 10)
+    return OKXClient(exchange=sim)
+
+def test_claims_are_exclusive_across_executors():
+    store = MemoryOrderStore()
+    ids = [store.insert({"symbol": "BTC/USDT", "side": "buy", "quantity": 10}) for _ in range(50)]
+    claimed = []
+    def claim(worker):
+        while True:
+            batch = store.claim(worker, 3)
+            if not batch:
+                return
+            claimed.extend((worker, o["id"]) for o in batch)
+    threads = [threading.Thread(target=claim, args=(f"w{i}",)) for i in range(4)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert sorted(i for _, i in claimed) == sorted(ids)
+    worker, oid = claimed[0]
+    assert not store.complete(oid, "someone-else", "EXECUTED")
+    assert store.complete(oid, worker, "EXECUTED") and store.get(oid)["status"] == "EXECUTED"
+
+def test_stale_in_flight_orders_are_parked_not_resent():
+    store = MemoryOrderStore(stale_seconds=0)
+    oid = store.insert({"symbol": "BTC/USDT", "side": "buy", "quantity": 10})
+    assert store.claim("slow", 10)[0]["id"] == oid
+    time.sleep(0.01)
+    assert store.claim("w2", 10) == []
+    assert store.get(oid)["status"] == STALE and "slow" in store.get(oid)["error"]
+    assert not store.complete(oid, "w2", "EXECUTED")
+    # The original owner finishing late still records what actually happened
+    assert store.complete(oid, "slow", "EXECUTED") and store.get(oid)["status"] == "EXECUTED"
+
+def test_notification_wakes_executor_without_polling():
+    okx = okx_client()
+    store = MemoryOrderStore()
+    executor = LocalExecutor(store, okx, poll_seconds=60)
+    store.wake = executor.wake
+    stop = threading.Event()
+    t = threading.Thread(target=executor.process_orders, args=(stop,), daemon=True)
+    t.start()
+    try:
+        time.sleep(0.1)
+        start = time.time()
+        buy = store.insert({"symbol": "BTC/USDT", "side": "buy", "quantity": 500})
+        eth = store.insert({"symbol": "ETH/USDT", "side": "buy", "quantity": 100})
+        sell = store.insert({"symbol": "BTC/USDT", "side": "sell", "quantity": 200})
+        big = store.insert({"symbol": "ETH/USDT", "side": "sell", "quantity": 5000})
+        empty = store.insert({"symbol": "ETH/USDT", "side": "sell", "quantity": 10})
+        assert _wait(lambda: all(store.get(i)["status"] not in ("PENDING_EXECUTION", IN_FLIGHT) for i in (buy, eth, sell, big, empty)))
+        assert time.time() - start < 2
+        assert [store.get(i)["status"] for i in (buy, eth, sell)] == ["EXECUTED"] * 3
+        # Sell of 5000 USD caps at the 10 ETH held; a sell with nothing held fails with the reason stored
+        assert store.get(big)["status"] == "EXECUTED"
+        assert store.get(empty)["status"] == "FAILED" and store.get(empty)["error"] == "no_position"
+        assert okx.get_account_state("BTC/USDT", 100)["qty"] == 3
+    finally:
+        stop.set()
+        executor.wake.set()
+        t.join(5)
+
+def test_realtime_drop_falls_back_to_polling_and_recovers(monkeypatch):
+    import asyncio
+    import sys
+    import types
+    from src.execution.order_queue import listen_realtime
+    clients = []
+
+    class FakeChannel:
+        def __init__(self, client):
+            self.client = client
+        def on_postgres_changes(self, *args, **kwargs):
+            pass
+        async def subscribe(self, callback):
+            callback("SUBSCRIBED", None)
+            if len(clients) == 1:
+                # The first socket drops shortly after subscribing
+                asyncio.get_running_loop().call_later(0.05, callback, "CLOSED", None)
+
+    class FakeClient:
+        is_connected = True
+        def __init__(self, url, key):
+            clients.append(self)
+        async def connect(self):
+            pass
+        def channel(self, name):
+            return FakeChannel(self)
+        async def close(self):
+            pass
+
+    monkeypatch.setitem(sys.modules, "realtime", types.SimpleNamespace(AsyncRealtimeClient=FakeClient))
+    executor = LocalExecutor(MemoryOrderStore(), okx_client(), poll_seconds=30)
+    seen = []
+    def on_error():
+        executor.fallback_to_polling()
+        seen.append(executor.poll_seconds)
+    listen_realtime("http://x", "k", executor.wake, on_error=on_error, on_ready=executor.restore_polling, check_seconds=0.05)
+    assert _wait(lambda: len(clients) == 2)
+    assert seen == [2] and _wait(lambda: executor.poll_seconds == 30)
@@ -0,0 +1,68 @@
+import json
+import urllib.request
+import pytest
+from src.core.metrics import Metrics, metered, record_decision
+
+class Exchange:
+    def fetch_price(self, symbol):
+        return 100.0
+
+    def fetch_balance(self):
+        raise RuntimeError("down")
+
+def test_rolling_percentiles_and_tick_totals(tmp_path):
+    m = Metrics(window=100)
+    for i in range(200):
+        m.observe("stage.decide", i / 1000)
+    h = m.histograms()["stage.decide"]
+    # Only the last 100 samples are in the window; count and sum cover everything
+    assert h["p50"] == 0.15 and h["p99"] == 0.199 and h["count"] == 200
+    snap = m.flush(str(tmp_path / "m.jsonl"), tick=1)
+    assert snap["tick"] == 1 and snap["tick_totals"]["stage.decide"] == pytest.approx(sum(range(200)) / 1000)
+    assert m.snapshot()["tick_totals"] == {}
+    assert json.loads(open(tmp_path / "m.jsonl").readline())["tick"] == 1
+
+def test_metered_client_counts_calls_and_errors():
+    m = Metrics()
+    okx = metered(Exchange(), m, "okx", ("fetch_price", "fetch_balance"))
+    assert okx.fetch_price("BTC/USDT") == 100.0
+    with pytest.raises(RuntimeError):
+        okx.fetch_balance()
+    record_decision(m, {"gated": True})
+    record_decision(m, {"llm": {"cached": True, "attempts": 0}})
+    record_decision(m, {"llm": {"attempts": 1, "latency": 0.3}})
+    c = m.snapshot()["counters"]
+    assert c["okx.fetch_price.calls"] == 1 and c["okx.fetch_balance.errors"] == 1
+    # The cache hit is not billed, so only the real request counts as a call
+    assert c["llm.gated"] == 1 and c["llm.calls"] == 1 and c["llm.cached"] == 1
+
+def test_sample_profiler_sees_worker_threads(tmp_path):
+    import threading
+    from src.core.metrics import TickProfiler
+    with pytest.raises(ValueError):
+        TickProfiler("cprofile", str(tmp_path))
+    p = TickProfiler("sample", str(tmp_path), interval=0.001)
+    done = threading.Event()
+    worker = threading.Thread(target=done.wait, args=(1,), name="symbol_0")
+    worker.start()
+    p.start()
+    try:
+        threading.Event().wait(0.05)
+    finally:
+        path = p.stop(1)
+        done.set()
+        worker.join()
+    assert path.endswith("tick-000001.folded")
+    assert any(l.startswith("symbol_0;") for l in open(path))
+
+def test_prometheus_endpoint():
+    m = Metrics()
+    m.observe("okx.fetch_ohlcv", 0.2)
+    m.incr("llm.calls", 3)
+    server = m.serve(0)
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5).read().decode()
+    finally:
+        server.shutdown()
+    assert 'finance_agent_span_seconds{name="okx.fetch_ohlcv",quantile="0.95"} 0.200000' in body
+    assert 'finance_agent_events_total{name="llm.calls"} 3' in body
@@ -0,0 +1,46 @@
+import time
+import threading
+from src.data.okx_client import OKXClient
+from src.data.okx_stream import OKXStream
+from src.sim.fake_ws import FakeOKXWebSocket
+
+class Exchange:
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=200):
+        return [[i * 900000, 1, 2, 0.5, 1.5, 1] for i in range(limit)]
+
+    def fetch_ticker(self, symbol):
+        raise AssertionError("REST ticker should not be called while the stream is fresh")
+
+    def parse_timeframe(self, tf):
+        return 900
+
+def _wait(cond, timeout=5):
+    end = time.time() + timeout
+    while time.time() < end and not cond():
+        time.sleep(0.01)
+    return cond()
+
+def test_stream_keeps_price_and_candles_hot():
+    server = FakeOKXWebSocket()
+    url = server.start()
+    okx = OKXClient()
+    okx.exchange = Exchange()
+    okx.fetch_ohlcv("BTC/USDT", "15m", limit=200)
+    seen = []
+    got = threading.Event()
+    stream = OKXStream(okx, ["BTC/USDT"], ["15m"], public_url=url, business_url=url)
+    stream.on(lambda ev: (seen.append(ev), got.set()))
+    stream.start()
+    try:
+        assert server.subscribed.wait(5)
+        server.publish_ticker("BTC-USDT", 101.5)
+        assert _wait(lambda: okx.last_price.get("BTC/USDT") == 101.5)
+        assert okx.fetch_price("BTC/USDT") == 101.5
+        server.publish_candle("BTC-USDT", "candle15m", [200 * 900000, 1.5, 3, 1, 2.5, 4])
+        assert _wait(lambda: okx.candles.get("BTC/USDT", "15m").last_ts() == 200 * 900000)
+        df = okx.fetch_ohlcv("BTC/USDT", "15m", limit=200)
+        assert df["close"].iloc[-1] == 2.5
+        assert [e["type"] for e in seen] == ["ticker", "candle"]
+    finally:
+        stream.stop()
+        server.stop()
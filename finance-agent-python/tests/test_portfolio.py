@@ -0,0 +1,38 @@
+import numpy as np
+from src.execution.portfolio import Portfolio
+from src.execution.wallet import Wallet
+
+def test_wallet_view_keeps_spot_semantics():
+    w = Wallet(initial_balance=1000)
+    assert w.buy("BTC/USDT", 100, 2000) == (False, "insufficient")
+    ok, _ = w.buy("BTC/USDT", 100, 500)
+    assert ok and w.positions == {"BTC/USDT": 5.0}
+    assert w.equity({"BTC/USDT": 120}) == 500 + 5 * 120
+    ok, _ = w.sell("BTC/USDT", 120, 10000)
+    assert ok and w.positions == {} and w.balance["USDT"] == 1100
+    assert w.sell("BTC/USDT", 120, 10) == (False, "no_position")
+
+def test_perp_long_short_fees_and_flip():
+    p = Portfolio(2, ["BTC"], initial_balance=1000, fee=0.001)
+    assert p.fill_perp([[1.0], [-1.0]], [100], leverage=10).all()
+    p.step([110])
+    assert np.allclose(p.equity(), [1000 - 0.1 + 10, 1000 - 0.1 - 10])
+    # Flip the long to a short of 1: closes 1 at 110, opens 1 at 110
+    p.fill_perp([[-2.0], [0.0]], [110])
+    assert p.qty[0, 0] == -1 and p.entry[0, 0] == 110
+    assert np.isclose(p.cash[0], 1000 - 0.1 + 10 - 0.22)
+
+def test_initial_margin_rejects_only_that_account():
+    p = Portfolio(2, ["BTC"], initial_balance=[1000, 10], fee=0)
+    ok = p.fill_perp([[5.0], [5.0]], [100], leverage=10)
+    assert ok.tolist() == [True, False] and p.qty[:, 0].tolist() == [5.0, 0.0]
+
+def test_liquidation_price_and_step():
+    p = Portfolio(1000, ["BTC", "ETH"], initial_balance=100, fee=0, maintenance_margin=0.005)
+    p.fill_perp(np.tile([[10.0, 0.0]], (1000, 1)), [100, 10], leverage=10)
+    p.step([100, 10])
+    liq = p.liquidation_price()[0, 0]
+    assert 90 < liq < 91
+    assert not p.step([liq + 0.01, 10]).any()
+    assert p.step([liq - 0.01, 10]).all()
+    assert (p.qty == 0).all() and (p.cash >= 0).all() and (p.liquidations == 1).all()
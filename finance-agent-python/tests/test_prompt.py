@@ -0,0 +1,41 @@
+import json
+import numpy as np
+from src.core.prompt import encode_candles, encode_prompt, estimate_tokens
+from src.data.candles import Candles
+
+def make(n=100, step=900000):
+    ts = np.arange(n, dtype=np.int64) * step + 1704067200000
+    close = 100.0 + np.arange(n) * 0.5
+    return Candles(ts, close, close + 1, close - 1, close, np.full(n, 12.3456789))
+
+def test_regular_candles_are_csv_rows():
+    out = encode_candles(make(3))
+    assert out["interval_min"] == 15 and out["columns"] == "o,h,l,c,v"
+    assert out["rows"].split(";")[1] == "100.5,101.5,99.5,100.5,12.35"
+
+def test_irregular_candles_carry_minute_offsets():
+    c = make(3)
+    c.timestamp[2] += 900000
+    out = encode_candles(c)
+    assert out["columns"].startswith("t,") and out["rows"].split(";")[2].startswith("45,")
+
+def test_delta_prices():
+    rows = encode_candles(make(3), delta=True)["rows"].split(";")
+    assert rows[0].startswith("100,") and rows[1].startswith("0.5,1.5,-0.5,0.5")
+
+def test_prompt_is_json_and_fits_budget():
+    payload = {"market": {"multi": {"15m": {"candles": make(200), "current": {"rsi": np.float64(55.123456789)}}}}, "news": "quiet"}
+    full = encode_prompt(payload)
+    trimmed = encode_prompt(payload, token_budget=600)
+    assert json.loads(full)["market"]["multi"]["15m"]["current"]["rsi"] == 55.1235
+    assert estimate_tokens(trimmed) <= 600 < estimate_tokens(full)
+    assert 20 <= json.loads(trimmed)["market"]["multi"]["15m"]["candles"]["bars"] < 200
+
+def test_prices_round_to_tick_not_significant_figures():
+    from src.core.prompt import compact
+    c = make(2)
+    c.close[:] = c.open[:] = [100000.3, 100000.75]
+    assert compact({"price": 100000.25}) == {"price": 100000.25}
+    assert compact({"price": 100000.27, "rsi": 55.123456789}, tick=0.1) == {"price": 100000.3, "rsi": 55.1235}
+    assert encode_candles(c, tick=0.5)["rows"].split(";")[0].split(",")[3] == "100000.5"
+    assert encode_candles(c)["rows"].split(";")[1].split(",")[3] == "100000.75"
@@ -0,0 +1,58 @@
+import json
+import threading
+from src.core.reflection import ReflectionWorker
+
+class FakeReviewer:
+    def __init__(self):
+        self.requests = []
+        self.release = threading.Event()
+
+    def complete_json(self, content):
+        self.release.wait(5)
+        req = json.loads(content)
+        self.requests.append(req)
+        if req["type"] == "batch_reflection":
+            return {"reflections": [{"id": e["id"], "reflection": f"r{e['id']}"} for e in req["events"]]}
+        return {"reflection": "single"}
+
+def test_batches_and_journals_in_order(tmp_path):
+    path = tmp_path / "journal.md"
+    reviewer = FakeReviewer()
+    worker = ReflectionWorker(reviewer, str(path), batch_size=8, batch_wait=0.2)
+    for i in range(3):
+        worker.submit("exit_reflection", f"CLOSE s{i}", {"n": i}, {"n": i})
+    reviewer.release.set()
+    worker.close()
+    assert [r["type"] for r in reviewer.requests] == ["batch_reflection"]
+    lines = path.read_text().strip().split("\n")
+    assert [l for l in lines if l.startswith("## ")] == ["## CLOSE s0", "## CLOSE s1", "## CLOSE s2"]
+    assert [json.loads(l) for l in lines if l.startswith("{")][2] == {"n": 2, "reflection": "r2"}
+
+def test_submit_after_close_still_journals(tmp_path):
+    path = tmp_path / "journal.md"
+    worker = ReflectionWorker(FakeReviewer(), str(path))
+    worker.close()
+    worker.submit("entry_reflection", "OPEN x", {"entry": 1}, {})
+    assert "## OPEN x" in path.read_text()
+
+def test_backlog_skips_reflections_but_keeps_every_record(tmp_path):
+    import time
+    from src.core.metrics import Metrics
+    path = tmp_path / "journal.md"
+    reviewer = FakeReviewer()
+    metrics = Metrics()
+    worker = ReflectionWorker(reviewer, str(path), max_backlog=2, batch_size=1, metrics=metrics)
+    start = time.monotonic()
+    for i in range(6):
+        worker.submit("entry_reflection", f"OPEN s{i}", {"n": i}, {})
+    assert time.monotonic() - start < 0.5
+    # Nothing is written from the trading thread, so the journal stays in submission order
+    assert not path.exists() or path.read_text() == ""
+    reviewer.release.set()
+    worker.close()
+    lines = path.read_text().split("\n")
+    assert [l for l in lines if l.startswith("## ")] == [f"## OPEN s{i}" for i in range(6)]
+    records = [json.loads(l) for l in lines if l.startswith("{")]
+    assert [r["n"] for r in records] == list(range(6))
+    assert worker.skipped >= 3 and metrics.counters["reflection.skipped"] == worker.skipped
+    assert sum(r["reflection"] == "" for r in records) == worker.skipped
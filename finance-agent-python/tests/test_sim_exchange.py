@@ -0,0 +1,86 @@
+import ccxt
+import numpy as np
+import pytest
+from src.data.candle_store import DTYPE
+from src.data.okx_client import OKXClient
+from src.sim.exchange import SimExchange
+
+M15 = 900000
+
+def rows(closes, highs=None, lows=None, step=M15):
+    n = len(closes)
+    r = np.zeros(n, dtype=DTYPE)
+    r["timestamp"] = np.arange(n) * step
+    r["open"] = r["close"] = closes
+    r["high"] = highs if highs is not None else closes
+    r["low"] = lows if lows is not None else closes
+    r["volume"] = 1
+    return r
+
+def test_perp_order_path_with_tp_sl_algo():
+    sim = SimExchange(["BTC/USDT"], balance=1000, fee=0)
+    sim.load_candles("BTC/USDT", "15m", rows([100, 100, 100], highs=[100, 100, 106], lows=[100, 99, 100]))
+    sim.advance()
+    okx = OKXClient(exchange=sim)
+    okx.set_perp_leverage("BTC/USDT", 20)
+    ok, _ = okx.place_perp_market_order("BTC/USDT", "buy", 1000, 100, 20)
+    assert ok and okx.fetch_perp_position_qty("BTC/USDT") == pytest.approx(1000)
+    ok, res = okx.place_perp_tp_sl_algo("BTC/USDT", "long", tp_px=105, sl_px=95, qty=10)
+    assert ok and res["data"][0]["sCode"] == "0"
+    sim.advance()
+    assert sim.algos and okx.fetch_perp_position_qty("BTC/USDT") > 0
+    sim.advance()
+    assert not sim.algos and okx.fetch_perp_position_qty("BTC/USDT") == 0
+    assert okx.get_account_state("BTC/USDT", 106)["cash"] == pytest.approx(1000 + 10 * 5, rel=1e-3)
+
+def test_spot_orders_and_insufficient_funds():
+    sim = SimExchange(["BTC/USDT"], balance=1000, fee=0)
+    sim.set_price("BTC/USDT", 100)
+    okx = OKXClient(exchange=sim)
+    assert okx.place_spot_market_buy("BTC/USDT", 500, 100)[0]
+    assert okx.get_account_state("BTC/USDT", 100)["qty"] == pytest.approx(5)
+    ok, msg = okx.place_spot_market_buy("BTC/USDT", 5000, 100)
+    assert not ok and "insufficient" in msg
+    assert okx.place_spot_market_sell("BTC/USDT", 10000, 100, 5)[0]
+    assert okx.get_account_state("BTC/USDT", 100)["qty"] == 0
+
+def test_forming_higher_timeframe_bar_has_no_lookahead():
+    sim = SimExchange(["BTC/USDT"])
+    sim.load_candles("BTC/USDT", "15m", rows([1, 2, 3, 4, 5, 6, 7, 8], highs=[1, 2, 3, 4, 5, 6, 7, 8]))
+    sim.load_candles("BTC/USDT", "1h", rows([4, 8], highs=[4, 8], step=4 * M15))
+    for _ in range(6):
+        sim.advance()
+    bars = sim.fetch_ohlcv("BTC/USDT", "1h")
+    assert [b[4] for b in bars] == [4, 6] and bars[-1][2] == 6
+
+def test_rate_limit_rejects():
+    sim = SimExchange(["BTC/USDT"], rate_per_sec=1, burst=2)
+    sim.set_price("BTC/USDT", 100)
+    sim.fetch_ticker("BTC/USDT")
+    sim.fetch_ticker("BTC/USDT")
+    with pytest.raises(ccxt.RateLimitExceeded):
+        sim.fetch_ticker("BTC/USDT")
+
+def test_stop_inside_bar_fires_before_liquidation():
+    # 100 BTC long filled at 100.1 on 1000 USDT liquidates near 90.55; the bar closes at 90 but the stop at 97 is hit on the way down
+    sim = SimExchange(["BTC/USDT"], balance=1000, fee=0)
+    sim.load_candles("BTC/USDT", "15m", rows([100, 90], highs=[100, 100], lows=[100, 90]))
+    sim.advance()
+    okx = OKXClient(exchange=sim)
+    okx.set_perp_leverage("BTC/USDT", 20)
+    assert okx.place_perp_market_order("BTC/USDT", "buy", 20000, 100, 20)[0]
+    assert okx.place_perp_tp_sl_algo("BTC/USDT", "long", sl_px=97, qty=100)[0]
+    sim.advance()
+    assert sim.portfolio.liquidations[0] == 0 and sim.stats["algo_triggered"] == 1
+    assert okx.get_account_state("BTC/USDT", 90)["cash"] == pytest.approx(1000 - 100 * 3.1, rel=1e-3)
+
+def test_liquidation_uses_bar_worst_price():
+    # The close at 99 is safe but the low of 90 is through the liquidation price
+    sim = SimExchange(["BTC/USDT"], balance=1000, fee=0)
+    sim.load_candles("BTC/USDT", "15m", rows([100, 99], highs=[100, 100], lows=[100, 90]))
+    sim.advance()
+    okx = OKXClient(exchange=sim)
+    okx.set_perp_leverage("BTC/USDT", 20)
+    assert okx.place_perp_market_order("BTC/USDT", "buy", 20000, 100, 20)[0]
+    sim.advance()
+    assert sim.portfolio.liquidations[0] == 1 and okx.fetch_perp_position_qty("BTC/USDT") == 0
@@ -0,0 +1,38 @@
+import numpy as np
+from src.data.candles import Candles
+from src.strategies.smc import _swing_points, _fvgs, swing_masks
+
+def _reference(candles, n=3):
+    rows = [{"high": h, "low": l} for h, l in zip(candles.high.tolist(), candles.low.tolist())]
+    highs, lows, gaps = [], [], []
+    for i in range(n, len(rows) - n):
+        window = rows[i - n:i + n + 1]
+        if rows[i]["high"] == max(x["high"] for x in window):
+            highs.append(rows[i]["high"])
+        if rows[i]["low"] == min(x["low"] for x in window):
+            lows.append(rows[i]["low"])
+    for i in range(2, len(rows)):
+        if rows[i]["low"] > rows[i - 2]["high"]:
+            gaps.append({"type": "bullish", "top": rows[i]["low"], "bottom": rows[i - 2]["high"]})
+        elif rows[i]["high"] < rows[i - 2]["low"]:
+            gaps.append({"type": "bearish", "top": rows[i - 2]["low"], "bottom": rows[i]["high"]})
+    return highs[-3:], lows[-3:], gaps[-3:]
+
+def test_vectorized_matches_loops():
+    rng = np.random.default_rng(3)
+    for n_bars in (0, 5, 7, 60, 500):
+        # Rounded prices so equal highs/lows (ties) occur
+        close = np.round(100 + np.cumsum(rng.normal(0, 1, n_bars)))
+        c = Candles(np.arange(n_bars), close, close + rng.integers(0, 3, n_bars), close - rng.integers(0, 3, n_bars), close, np.ones(n_bars))
+        highs, lows, gaps = _reference(c)
+        assert _swing_points(c) == (highs, lows)
+        assert _fvgs(c) == gaps
+
+def test_swing_masks_batched():
+    rng = np.random.default_rng(4)
+    high = rng.random((4, 300))
+    low = high - 0.1
+    hi, lo = swing_masks(high, low)
+    for row in range(4):
+        h1, l1 = swing_masks(high[row], low[row])
+        assert (hi[row] == h1).all() and (lo[row] == l1).all()
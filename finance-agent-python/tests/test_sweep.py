@@ -0,0 +1,32 @@
+import json
+import numpy as np
+from src.backtest.sweep import sweep, expand_grid, rank
+from src.data.candle_store import CandleStore
+
+def fill_store(root):
+    store = CandleStore(str(root))
+    rng = np.random.default_rng(3)
+    n = 4000
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    opens = np.concatenate([[close[0]], close[:-1]])
+    values = np.column_stack([opens, np.maximum(opens, close) * 1.002, np.minimum(opens, close) * 0.998, close, np.ones(n)])
+    ts = np.arange(n, dtype=np.int64) * 900000
+    store.append("BTC/USDT", "15m", ts, values)
+    k = 4
+    store.append("BTC/USDT", "1h", ts[::k], np.column_stack([values[::k, 0], values.reshape(-1, k, 5)[:, :, 1].max(1), values.reshape(-1, k, 5)[:, :, 2].min(1), values[k - 1::k, 3], np.full(n // k, 4.0)]))
+    return store
+
+def test_sweep_is_parallel_resumable_and_ranked(tmp_path):
+    store = fill_store(tmp_path / "candles")
+    grid = {"risk.min_rrr": [2, 3], "sizing.base_pct": [0.1, 0.2]}
+    assert len(expand_grid(grid)) == 4
+    path = str(tmp_path / "sweep.jsonl")
+    ranked = sweep(store, "price_action", grid, ["BTC/USDT"], ["15m", "1h"], path, workers=2)
+    assert len(ranked) == 4 and rank(ranked) == ranked
+    assert all(r["result"]["trades"] > 0 for r in ranked)
+    with open(path, "a") as f:
+        f.write('{"key": "torn')
+    again = sweep(store, "price_action", dict(grid, **{"sizing.base_pct": [0.1, 0.2, 0.3]}), ["BTC/USDT"], ["15m", "1h"], path, workers=2)
+    assert len(again) == 6 and {r["key"] for r in ranked} < {r["key"] for r in again}
+    rows = [json.loads(l) for l in open(path) if l.strip().endswith("}")]
+    assert len(rows) == 6
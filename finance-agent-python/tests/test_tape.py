@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+from src.core.tape import Tape, TapeProxy, TapeMiss
+from src.data.instruments import InstrumentSpec
+
+class FakeExchange:
+    def __init__(self):
+        self.calls = 0
+        self.stream_max_age = 0
+
+    def fetch_ohlcv(self, symbol, tf, limit=200):
+        self.calls += 1
+        return pd.DataFrame({"timestamp": pd.date_range("2024-01-01", periods=3, freq="15min"), "close": [1.0, 2.0, 3.0 + self.calls]})
+
+    def place(self, side):
+        self.calls += 1
+        if side == "bad":
+            raise ValueError("rejected")
+        return True, f"id-{self.calls}"
+
+    def spec(self):
+        return InstrumentSpec("BTC/USDT:USDT", "BTC-USDT-SWAP", 0.01, 0.01, 0.01, 0.1)
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "tape.jsonl.gz")
+    tape = Tape(path, "record")
+    live = TapeProxy(FakeExchange(), tape, "okx", ("fetch_ohlcv", "place", "spec"))
+    recorded = [live.fetch_ohlcv("BTC/USDT", "15m"), live.fetch_ohlcv("BTC/USDT", "15m")]
+    assert live.place("buy") == (True, "id-3")
+    with pytest.raises(ValueError):
+        live.place("bad")
+    spec = live.spec()
+    tape.tick()
+    tape.close()
+
+    replay = Tape(path, "replay")
+    target = FakeExchange()
+    offline = TapeProxy(target, replay, "okx", ("fetch_ohlcv", "place", "spec"))
+    for df in recorded:
+        assert offline.fetch_ohlcv("BTC/USDT", "15m")["close"].tolist() == df["close"].tolist()
+    assert offline.place("buy") == (True, "id-3")
+    with pytest.raises(RuntimeError, match="rejected"):
+        offline.place("bad")
+    assert offline.spec() == spec
+    assert target.calls == 0
+    with pytest.raises(TapeMiss):
+        offline.fetch_ohlcv("ETH/USDT", "15m")
+    offline.stream_max_age = 5
+    assert target.stream_max_age == 5
+    assert replay.tick() is False
+
+def test_replay_takes_recorded_fetch_fallbacks(tmp_path):
+    import time
+    from src.core.tape import TapePool
+    from src.data.fetch_pool import FetchPool
+    from src.data.candle_cache import empty_frame
+
+    class Exchange:
+        def fetch_ohlcv(self, symbol, tf, limit=200):
+            if symbol == "ETH/USDT":
+                time.sleep(0.5)
+            return pd.DataFrame({"timestamp": pd.date_range("2024-01-01", periods=2, freq="15min"), "close": [1.0, 2.0]})
+
+        def cached_ohlcv(self, symbol, tf, limit=200):
+            return empty_frame() if symbol == "ETH/USDT" else None
+
+    path = str(tmp_path / "tape.jsonl")
+    calls = lambda okx: {(s, "15m"): (okx.fetch_ohlcv, s, "15m") for s in ("BTC/USDT", "ETH/USDT")}
+    defaults = lambda okx: {(s, "15m"): (lambda s=s: okx.cached_ohlcv(s, "15m")) for s in ("BTC/USDT", "ETH/USDT")}
+    tape = Tape(path, "record")
+    okx = TapeProxy(Exchange(), tape, "okx", ("fetch_ohlcv",))
+    pool = TapePool(FetchPool(max_workers=4, rate_per_sec=100, burst=10, timeout=0.2), tape)
+    recorded = pool.gather(calls(okx), defaults=defaults(okx))
+    time.sleep(0.5)
+    tape.close()
+    assert recorded[("ETH/USDT", "15m")].empty and len(recorded[("BTC/USDT", "15m")]) == 2
+
+    replay = Tape(path, "replay")
+    okx = TapeProxy(Exchange(), replay, "okx", ("fetch_ohlcv",))
+    pool = TapePool(FetchPool(max_workers=4, rate_per_sec=100, burst=10, timeout=0.2), replay)
+    out = pool.gather(calls(okx), defaults=defaults(okx))
+    assert out[("ETH/USDT", "15m")].empty and out[("BTC/USDT", "15m")]["close"].tolist() == [1.0, 2.0]
+    assert replay.remaining() == 0
@@ -0,0 +1,64 @@
+-- Atomic order claiming for local executors
+alter table public.orders add column if not exists claimed_by text;
+alter table public.orders add column if not exists claimed_at timestamptz;
+alter table public.orders add column if not exists error text;
+
+create index if not exists orders_pending_idx on public.orders (created_at) where status = 'PENDING_EXECUTION';
+create index if not exists orders_in_flight_idx on public.orders (claimed_at) where status = 'IN_FLIGHT';
+
+-- Moves up to p_limit pending orders to IN_FLIGHT for one worker; SKIP LOCKED keeps concurrent executors off each other's rows.
+-- Orders left IN_FLIGHT longer than p_stale_seconds are never re-sent: the first executor may have filled them on the exchange
+-- before it crashed, or may still be waiting on the call. They move to STALE for someone to check against the exchange.
+create or replace function public.claim_orders(p_worker text, p_limit int default 10, p_stale_seconds int default 300)
+returns setof public.orders
+language sql
+security definer
+set search_path = public
+as $$
+  with stale as (
+    update public.orders
+       set status = 'STALE', error = 'claim by ' || claimed_by || ' expired; check the exchange before resubmitting', updated_at = now()
+     where status = 'IN_FLIGHT' and claimed_at < now() - make_interval(secs => p_stale_seconds)
+  )
+  update public.orders o
+     set status = 'IN_FLIGHT', claimed_by = p_worker, claimed_at = now(), updated_at = now()
+   where o.id in (
+     select id from public.orders
+      where status = 'PENDING_EXECUTION'
+      order by created_at
+      limit p_limit
+      for update skip locked
+   )
+  returning o.*;
+$$;
+
+revoke execute on function public.claim_orders(text, int, int) from public, anon, authenticated;
+grant execute on function public.claim_orders(text, int, int) to service_role;
+
+-- Wake LISTENing executors whenever an order becomes pending
+create or replace function public.notify_order_pending()
+returns trigger
+language plpgsql
+as $$
+begin
+  if new.status = 'PENDING_EXECUTION' then
+    perform pg_notify('orders_pending', new.id::text);
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists orders_pending_notify on public.orders;
+create trigger orders_pending_notify
+  after insert or update of status on public.orders
+  for each row execute function public.notify_order_pending();
+
+-- Realtime subscribers (ORDER_WAKE=realtime) need the table in the publication
+do $$
+begin
+  if exists (select 1 from pg_publication where pubname = 'supabase_realtime')
+     and not exists (select 1 from pg_publication_tables where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'orders') then
+    alter publication supabase_realtime add table public.orders;
+  end if;
+end;
+$$;